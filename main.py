@@ -2,25 +2,19 @@ from Repo.purchase_order_repo import PurchaseOrderRepo
 from Repo.reservation_repo import ReservationRepo
 from Service import activity_service
 from model.menus import Menus
-from Repo.product_repo import ProductRepo
 from Service.product_service import ProductService
-from Repo.user_repo import UserRepo
-from Repo.stock_repo import StockRepo
+from Repo.repo_registry import PRODUCT_OPTIONS, RepoRegistry, set_default_registry
 from Service.auth_service import AuthService
 from Service.stock_service import StockService
 from Service.purchase_order_service import PurchaseOrderService
-from Repo.favourite_repo import FavouriteRepo
 from Service.favourite_service import FavouriteService
-from Repo.return_repo import ReturnRepo
 from Service.return_service import ReturnService
-from Repo.budget_repo import BudgetRepo
 from Service.budget_service import BudgetService
-from Repo.supplier_repo import SupplierRepo
 from Service.supplier_service import SupplierService
-from Repo.supplier_product_repo import SupplierProductRepo
 from Service.supplier_catalogue_service import SupplierCatalogueService
 from Service.dashboard_chart_service import DashboardChartService
 from Service.activity_service import ActivityService
+from Service.audit_sink import AuditSink, set_audit_sink
 from Service.confirm_service import ConfirmService
 
 from Repo.reservation_repo import ReservationRepo
@@ -46,6 +40,13 @@ def show_products_and_favourite(products, favourite_service):
         print(favourite_service.favourite_product(sku))
 
 
+def print_sku_suggestions(product_repo, sku):
+    # mistyped / partial SKU -> show the nearest existing SKUs
+    suggestions = product_repo.suggest_skus(sku)
+    if suggestions:
+        print("Did you mean: " + ", ".join(suggestions))
+
+
 def stock_menu(menus, auth_service, stock_service, confirm_service):
     while True:
         choice = menus.view_stock_menu()
@@ -56,6 +57,7 @@ def stock_menu(menus, auth_service, stock_service, confirm_service):
             product = stock_service.product_repo.find_by_sku(sku)
             if product is None:
                 print("Invalid SKU")
+                print_sku_suggestions(stock_service.product_repo, sku)
                 continue
 
             print(f"Current quantity for {sku}: {product.quantity}")
@@ -75,6 +77,7 @@ def stock_menu(menus, auth_service, stock_service, confirm_service):
             product = stock_service.product_repo.find_by_sku(sku)
             if product is None:
                 print("Invalid SKU")
+                print_sku_suggestions(stock_service.product_repo, sku)
                 continue
 
             print(f"Current quantity for {sku}: {product.quantity}")
@@ -97,13 +100,74 @@ def stock_menu(menus, auth_service, stock_service, confirm_service):
             except (ValueError, PermissionError) as e:
                 print(f"Error: {e}")
 
-
+        elif choice == "3":
+            bulk_adjustments_menu(auth_service, stock_service, confirm_service)
 
         elif choice == "0":
             break
         else:
             print("Invalid choice. Try again.")
 
+# rejected lines printed one by one; the rest are only counted
+MAX_REJECTED_SHOWN = 20
+
+
+def bulk_adjustments_menu(auth_service, stock_service, confirm_service):
+    # File format: one "SKU,delta" per line (e.g. SKU1,-3 or SKU2,10)
+    path = input("Adjustments file (SKU,delta per line): ").strip()
+    if path == "":
+        return
+
+    adjustments = []
+    try:
+        with open(path, "r") as file:
+            for line in file:
+                line = line.strip()
+                if line == "":
+                    continue
+                sku, _, delta = line.partition(",")
+                try:
+                    adjustments.append((sku.strip(), int(delta.strip())))
+                except ValueError:
+                    adjustments.append((sku.strip(), delta.strip()))
+    except FileNotFoundError:
+        print("File not found.")
+        return
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error: could not read {path}: {e}")
+        return
+
+    # same rule as a single decrease, asked once for the whole file
+    risky = [r for r in stock_service.check_adjustments(adjustments)
+             if r["ok"] and (r["delta"] <= -10 or r["new_qty"] <= 0)]
+    if risky:
+        try:
+            confirm_service.require_confirm(
+                f"HIGH RISK: {len(risky)} adjustment(s) decrease stock by 10 or more "
+                f"or leave it at 0 (first: {risky[0]['sku']} {risky[0]['delta']}, "
+                f"new qty: {risky[0]['new_qty']}). Confirm"
+            )
+        except PermissionError as e:
+            print(f"Error: {e}")
+            return
+
+    user = auth_service.current_user.username if auth_service.current_user else None
+    results = stock_service.apply_adjustments(adjustments, user=user)
+
+    applied = 0
+    rejected = 0
+    for r in results:
+        if r["ok"]:
+            applied += 1
+            continue
+        rejected += 1
+        if rejected <= MAX_REJECTED_SHOWN:
+            print(f"Rejected {r['sku']} ({r['delta']}): {r['error']}")
+    if rejected > MAX_REJECTED_SHOWN:
+        print(f"... and {rejected - MAX_REJECTED_SHOWN} more rejected.")
+    print(f"{applied} of {len(results)} adjustments applied.")
+
+
 def add_product_menu(product_service):
     while True:
         sku = input("Enter SKU (or press Enter to go back): ").strip()
@@ -147,6 +211,7 @@ def update_product_menu(product_service):
         product = product_service.product_repo.find_by_sku(sku)
         if product == None:
             print("Product not found")
+            print_sku_suggestions(product_service.product_repo, sku)
             return
 
         print("Press Enter to keep the current value.")
@@ -187,6 +252,49 @@ def favourite_prompt(favourite_service):
         print(favourite_service.favourite_product(sku))
 
 
+def advanced_search_menu(product_service, favourite_service):
+    print("Leave any field blank to skip it.")
+    filters = {
+        "category": input("Category: ").strip(),
+        "min_qty": input("Min quantity: ").strip(),
+        "max_qty": input("Max quantity: ").strip(),
+        "min_price": input("Min price: ").strip(),
+        "max_price": input("Max price: ").strip(),
+        "text": input("Text in SKU / Name / Description: ").strip(),
+    }
+    if product_service.supplier_product_repo is not None:
+        filters["supplier_id"] = input("Supplier ID: ").strip()
+
+    status = input("Status [active/inactive]: ").strip().lower()
+    if status == "active":
+        filters["active"] = True
+    elif status == "inactive":
+        filters["active"] = False
+
+    order_by = input("Order by [sku/name/quantity/price]: ").strip().lower()
+    descending = input("Descending? (y/n): ").strip().lower() == "y"
+    limit = input("Max results: ").strip()
+
+    try:
+        results = product_service.query_products(
+            order_by=order_by or None, descending=descending, limit=limit or None, **filters
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    if not results:
+        print("No products match those filters.")
+        return
+
+    print("\n--- Query Results ---")
+    for p in results:
+        print(f"{p.sku} | {p.name} | {p.description} | Qty: {p.quantity} | £{p.price} | {p.category}")
+
+    print("\n--- Add Favourite Products ---")
+    favourite_prompt(favourite_service)
+
+
 def low_stock_alerts_menu(product_service, low_stock_threshold):
     low_stock = product_service.get_low_stock_products(low_stock_threshold)
 
@@ -255,6 +363,11 @@ def products_menu(menus, product_service,favourite_service, auth_service, low_st
 
             if not results:
                 print("No matching products found.")
+                suggestions = product_service.fuzzy_search_products(query, limit=5)
+                if suggestions:
+                    print("\nDid you mean:")
+                    for p, score in suggestions:
+                        print(f"{p.sku} | {p.name} | Qty: {p.quantity} | match {int(score * 100)}%")
             else:
                 print("\n--- Search Results ---")
                 for p in results:
@@ -266,6 +379,8 @@ def products_menu(menus, product_service,favourite_service, auth_service, low_st
         elif choice == "3":
             category = input("Category (leave blank for all categories): ").strip()
             max_qty = input("Max quantity (leave blank for no limit): ").strip()
+            min_price = input("Min price (leave blank for no limit): ").strip()
+            max_price = input("Max price (leave blank for no limit): ").strip()
             sort_by = input("Sort by [name/quantity/price] (leave blank for none): ").strip().lower()
 
             if sort_by == "":
@@ -275,7 +390,8 @@ def products_menu(menus, product_service,favourite_service, auth_service, low_st
             if max_qty == "":
                 max_qty = None
 
-            results = product_service.filter_products(category=category, max_qty=max_qty, sort_by=sort_by)
+            results = product_service.filter_products(category=category, max_qty=max_qty, sort_by=sort_by,
+                                                      min_price=min_price or None, max_price=max_price or None)
 
             if not results:
                 print("No products match that filter.")
@@ -287,6 +403,8 @@ def products_menu(menus, product_service,favourite_service, auth_service, low_st
                 print("\n--- Add Favourite Products ---")
                 favourite_prompt(favourite_service)
 
+        elif choice == "11":
+            advanced_search_menu(product_service, favourite_service)
 
         elif choice == "4":
             add_product_menu(product_service)
@@ -364,6 +482,10 @@ def reserve_stock_menu(menus, auth_service, reservation_service):
 
             order_id = input("Order ID: ").strip()
             sku = input("SKU: ").strip()
+            if sku != "" and reservation_service.product_repo.find_by_sku(sku) is None:
+                print("Invalid SKU")
+                print_sku_suggestions(reservation_service.product_repo, sku)
+                continue
 
             try:
                 qty = int(input("Quantity to reserve: ").strip())
@@ -426,6 +548,10 @@ def purchase_orders_menu(menus, auth_service, purchase_order_service, budget_ser
             for i in range(count):
                 print(f"\nLine {i+1}")
                 sku = input("SKU: ").strip()
+                if sku != "" and purchase_order_service.product_repo.find_by_sku(sku) is None:
+                    print("Invalid SKU. Line skipped.")
+                    print_sku_suggestions(purchase_order_service.product_repo, sku)
+                    continue
                 try:
                     qty = int(input("Quantity: ").strip())
                 except ValueError:
@@ -464,9 +590,7 @@ def purchase_orders_menu(menus, auth_service, purchase_order_service, budget_ser
         else:
             print("Invalid choice. Try again.")
 
-def summary_dashboard_menu(product_service, low_stock_threshold):
-
-    summary = product_service.get_dashboard_summary(low_stock_threshold)
+def summary_dashboard_menu(summary):
 
     print("\n==============================")
     print("       [ DASHBOARD ]")
@@ -495,6 +619,8 @@ def returns_menu(return_service):
 
         result = return_service.process_return(sku, qty, condition)
         print(result)
+        if result == "Return rejected: Product not found":
+            print_sku_suggestions(return_service.product_repo, sku)
 
 def budget_menu(menus, budget_service, product_service):
     while True:
@@ -635,18 +761,20 @@ def suppliers_menu(menus, supplier_service, supplier_catalogue_service):
         else:
             print("Invalid choice.")
 
-def dashboard_charts_menu(dashboard_chart_service, low_stock_threshold):
-    lines = dashboard_chart_service.build_dashboard_chart_lines(low_stock_threshold)
+def dashboard_charts_menu(dashboard_chart_service, low_stock_threshold, stats=None):
+    lines = dashboard_chart_service.build_dashboard_chart_lines(low_stock_threshold, stats)
 
     for line in lines:
         print(line)
 
 
 def dashboard_menu( product_service,dashboard_chart_service,low_stock_threshold):
+    # one aggregation pass feeds both screens
+    stats = dashboard_chart_service.get_dashboard_stats(low_stock_threshold)
     # Show summary first
-    summary_dashboard_menu(product_service, low_stock_threshold)
+    summary_dashboard_menu(stats["summary"])
     # Then show charts
-    dashboard_charts_menu(dashboard_chart_service, low_stock_threshold)
+    dashboard_charts_menu(dashboard_chart_service, low_stock_threshold, stats)
     # one pause at the end
     input("\nPress Enter to go back...")
 
@@ -751,16 +879,22 @@ def view_activity_menu(menus,auth_service, activity_service):
 
 def main():
     menus = Menus()
-    user_repo = UserRepo("src/data/users.txt")
-    stock_repo = StockRepo("src/data/stocks.txt")
-    product_repo = ProductRepo("src/data/products.txt")
-    favourite_repo = FavouriteRepo("src/data/favourites.txt")
-    return_repo = ReturnRepo("src/data/returns.txt")
-    supplier_repo = SupplierRepo("src/data/suppliers.txt")
-    supplier_product_repo = SupplierProductRepo("src/data/supplier_products.txt")
-    activity_service = ActivityService("src/data/audit_log.txt")
+    # one shared repo per data file; the catalogue's storage engine comes from $STOCK_STORAGE
+    # (text / memory / binary / sqlite; unset -> journalled products.txt)
+    registry = RepoRegistry(product_options=PRODUCT_OPTIONS)
+    set_default_registry(registry)
+    user_repo = registry.user_repo()
+    product_repo = registry.product_repo()
+    favourite_repo = registry.favourite_repo()
+    return_repo = registry.return_repo()
+    supplier_repo = registry.supplier_repo()
+    supplier_product_repo = registry.supplier_product_repo()
+    # stats read only what was logged since the last call; counters saved next to the log
+    activity_service = ActivityService("src/data/audit_log.txt", "src/data/audit_log.checkpoint")
+    # audit lines are queued and appended by a background thread (written out at exit)
+    set_audit_sink(AuditSink())
 
-    reservation_service = ReservationService(product_repo)
+    reservation_service = ReservationService(product_repo, registry.reservation_repo())
 
 
 
@@ -768,18 +902,18 @@ def main():
     supplier_service = SupplierService(supplier_repo)
     auth_service = AuthService(user_repo)
     category_repo = None
-    product_service = ProductService(product_repo, category_repo)
+    product_service = ProductService(product_repo, category_repo, supplier_product_repo)
     stock_service = StockService(product_repo)
     favourite_service = FavouriteService(favourite_repo, product_repo, auth_service)
     #stock_service = StockService(stock_repo)
     confirm_service = ConfirmService()
     return_service = ReturnService(product_repo, stock_service, return_repo)
     dashboard_chart_service = DashboardChartService(product_repo)
-    budget_repo = BudgetRepo("src/data/budgets.txt")
+    budget_repo = registry.budget_repo()
     budget_service = BudgetService(budget_repo)
 
 
-    purchase_order_service = PurchaseOrderService()
+    purchase_order_service = PurchaseOrderService(product_repo, registry.purchase_order_repo())
 
     menus.auth_menu(auth_service, activity_service)
     low_stock_threshold = 5
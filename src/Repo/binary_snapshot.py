@@ -0,0 +1,84 @@
+import struct
+import zlib
+from array import array
+
+from model.product import Product
+from Repo.file_cache import replace_file, stamp_matches
+
+# magic, format version, the products.txt it mirrors (mtime_ns, size, inode, whether its
+# crc32 is kept + that crc32: see FileStamp.state()), product count, length + crc32 of
+# everything after the header (catches truncated / corrupted files)
+HEADER = struct.Struct("<4sIqQQBIIQI")
+MAGIC = b"PRBN"
+VERSION = 2
+
+
+def write_snapshot(filename, products, text_state):
+    """Write products as packed columns + one string table.
+
+    products must hold the values exactly as parsed from the text file (int quantity,
+    float price, None for no category) so a binary load gives the same catalogue.
+    text_state is the FileStamp.state() of products.txt taken before it was read (or
+    right after it was written).
+    """
+    count = len(products)
+    quantities = array("q", [p.quantity for p in products])
+    prices = array("d", [p.price for p in products])
+    active = bytes(1 if p.active else 0 for p in products)
+
+    # text fields never contain "\n" (the text format is one product per line)
+    strings = []
+    for p in products:
+        strings.append(p.sku)
+        strings.append(p.name)
+        strings.append(p.description)
+        strings.append("" if p.category is None else p.category)
+    table = "\n".join(strings).encode("utf-8")
+
+    mtime_ns, size, inode, text_crc = text_state
+    payload = b"".join([quantities.tobytes(), prices.tobytes(), active, table])
+    header = HEADER.pack(MAGIC, VERSION, mtime_ns, size, inode, text_crc is not None, text_crc or 0,
+                         count, len(payload), zlib.crc32(payload))
+    replace_file(filename, header + payload)
+
+
+def read_snapshot(filename, text_filename):
+    # list of Products, or None when the snapshot is missing, damaged or not of text_filename as it is now
+    try:
+        with open(filename, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+
+    if len(data) < HEADER.size:
+        return None
+    magic, version, mtime_ns, size, inode, has_crc, text_crc, count, payload_size, crc = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        return None
+    if len(data) - HEADER.size != payload_size or zlib.crc32(memoryview(data)[HEADER.size:]) != crc:
+        return None
+    if not stamp_matches(text_filename, (mtime_ns, size, inode, text_crc if has_crc else None)):
+        return None
+
+    offset = HEADER.size
+    quantities = array("q")
+    prices = array("d")
+    try:
+        quantities.frombytes(data[offset:offset + 8 * count])
+        offset += 8 * count
+        prices.frombytes(data[offset:offset + 8 * count])
+        offset += 8 * count
+        active = data[offset:offset + count]
+        offset += count
+        strings = data[offset:].decode("utf-8").split("\n") if count else []
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+    if len(quantities) != count or len(prices) != count or len(active) != count or len(strings) != 4 * count:
+        return None
+
+    # column-at-a-time: no per-line split/int()/float(), just one constructor call per product
+    categories = [category or None for category in strings[3::4]]
+    flags = [flag == 1 for flag in active]
+    return list(map(Product, strings[0::4], strings[1::4], strings[2::4],
+                    quantities.tolist(), prices.tolist(), categories, flags))
@@ -1,3 +1,14 @@
+from Repo.file_cache import FileCache, append_line
+
+
+def parse_favourite_line(line):
+    line = line.strip()
+    if not line:
+        return None
+    username, sku = line.split(",", 1)
+    return username.strip(), sku.strip()
+
+
 class FavouriteRepo:
 
     def __init__(self, filename="src/data/favourites.txt"):
@@ -6,40 +17,42 @@ class FavouriteRepo:
             open(self.filename, "r").close()
         except FileNotFoundError:
             open(self.filename, "w").close()
+        # re-parsed only when favourites.txt changes; adds append, so only the new line is read
+        self._cache = FileCache(self.filename, parse_favourite_line, append_only=True)
+        self._by_user = {}
+        self._by_user_version = None
 
     def load_all(self):
-        favourites = []
-        with open(self.filename, "r") as file:
-            for line in file:
-                line = line.strip()
-                if line:
-                    username, sku = line.split(",", 1)
-                    favourites.append((username.strip(), sku.strip()))
-        return favourites
+        return list(self._cache.records())
 
     def save_all(self, favourites):
         with open(self.filename, "w") as file:
             for username, sku in favourites:
                 file.write(f"{username},{sku}\n")
+        self._cache.invalidate()
+
+    def _favourites_by_user(self):
+        # username -> SKUs in file order, rebuilt when the file changed
+        records = self._cache.records()
+        if self._by_user_version != self._cache.version:
+            self._by_user = {}
+            for username, sku in records:
+                self._by_user.setdefault(username, []).append(sku)
+            self._by_user_version = self._cache.version
+        return self._by_user
 
     def is_favourite(self, username, sku):
-        if (username, sku) in self.load_all():
+        if sku in self._favourites_by_user().get(username, []):
             return True
         else:
             return False
 
     def add_favourite(self, username, sku):
-        favourites = self.load_all()
-        if (username, sku) not in favourites:
-            favourites.append((username, sku))
-            self.save_all(favourites)
+        if not self.is_favourite(username, sku):
+            append_line(self.filename, f"{username},{sku}")
 
     def get_favourites(self, username):
-        favourites = []
-        for u, sku in self.load_all():
-            if u == username:
-                favourites.append(sku)
-        return favourites
+        return list(self._favourites_by_user().get(username, []))
 
     def remove_favourite(self, username, sku):
         favourites = self.load_all()
@@ -0,0 +1,259 @@
+import locale
+import os
+import tempfile
+import time
+import zlib
+
+# a file modified this close to when we read it may be changed again without its
+# (mtime, size, inode) changing (filesystem timestamps are coarse), so it isn't trusted yet
+RACY_WINDOW_NS = 100 * 1000 * 1000
+
+# bytes kept from just before the read position, to check a grown file still starts the same
+TAIL_CHECK_BYTES = 64
+
+
+def file_signature(filename):
+    # (mtime_ns, size, inode) of a file, or None if it doesn't exist
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def racy(signature, seen_ns):
+    # was the file modified too close to seen_ns (when we looked) to trust its signature?
+    return signature is not None and signature[0] + RACY_WINDOW_NS > seen_ns
+
+
+def file_crc(filename):
+    # crc32 of the file's bytes, or None if it doesn't exist
+    try:
+        with open(filename, "rb") as file:
+            return zlib.crc32(file.read())
+    except FileNotFoundError:
+        return None
+
+
+# read once: files written through a temp file get the permissions open() would give them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def replace_file(filename, data, encoding=None):
+    """Write data (str or bytes) to a temp file of our own next to filename, then rename it over.
+
+    Readers see the old file or the new one, never half of it, and two processes writing
+    the same file at once each use their own temp file. Returns the bytes written (a str
+    is encoded the way open(filename, "w") would).
+    """
+    if isinstance(data, str):
+        if os.linesep != "\n":
+            data = data.replace("\n", os.linesep)
+        data = data.encode(encoding or locale.getpreferredencoding(False))
+    directory, name = os.path.split(filename)
+    fd, tmp_filename = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=directory or ".")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.chmod(tmp_filename, 0o666 & ~_UMASK)
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        try:
+            os.remove(tmp_filename)
+        except OSError:
+            pass
+        raise
+    return data
+
+
+class FileStamp:
+    """What a file looked like when we last read or wrote it, to tell whether it changed since.
+
+    (mtime, size, inode) decides, unless the file had been modified within RACY_WINDOW_NS
+    of when we looked: then a same-size rewrite could keep all three, so the crc32 of its
+    bytes is kept as well and compared instead.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.signature = False   # never looked (None = the file didn't exist)
+        self._seen_ns = 0
+        self._crc = None
+
+    def take(self, data=None):
+        # call before reading the file (a change made while reading shows up as a change),
+        # or after writing it with data = the bytes written (saves reading them back)
+        seen_ns = time.time_ns()
+        self.signature = file_signature(self.filename)
+        self._seen_ns = seen_ns
+        self._crc = None
+        if racy(self.signature, seen_ns):
+            self._crc = zlib.crc32(data) if data is not None else file_crc(self.filename)
+
+    def state(self):
+        # (mtime_ns, size, inode, crc32 or None) to store with a copy made from the file,
+        # checked later by stamp_matches(); None if the file didn't exist / was never stamped
+        if not self.signature:
+            return None
+        return self.signature + (self._crc,)
+
+    def changed(self):
+        seen_ns = time.time_ns()
+        signature = file_signature(self.filename)
+        if signature != self.signature:
+            return True
+        if not racy(signature, self._seen_ns):
+            return False
+        if file_crc(self.filename) != self._crc:
+            return True
+        if not racy(signature, seen_ns):
+            # same bytes and old enough now: the signature alone decides from here on
+            self._seen_ns = seen_ns
+            self._crc = None
+        return False
+
+
+def stamp_matches(filename, state):
+    # is the file still the one FileStamp.state() was taken of? (the crc, kept when the
+    # stamp was racy, is compared as well)
+    if state is None:
+        return False
+    mtime_ns, size, inode, crc = state
+    if file_signature(filename) != (mtime_ns, size, inode):
+        return False
+    return crc is None or file_crc(filename) == crc
+
+
+def append_line(filename, line, encoding=None):
+    # append one line, starting a new one first if the file doesn't end with "\n"
+    prefix = ""
+    try:
+        with open(filename, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    prefix = "\n"
+    except FileNotFoundError:
+        pass
+    with open(filename, "a", encoding=encoding) as file:
+        file.write(prefix + line + "\n")
+
+
+class FileCache:
+    """Parsed lines of a text file, re-read only when the file changes.
+
+    records() stats the file and returns the cached records while its (mtime, size, inode)
+    is unchanged. parse_line(line) returns a record, or None to skip the line.
+
+    With append_only=True a file that only grew is read from where the last read stopped,
+    so appending a line costs one parse instead of the whole file. Anything else (shrunk,
+    replaced, rewritten in place) is a full re-read; `resets` counts the full re-reads that
+    changed records already returned, so callers holding derived state know to rebuild.
+    """
+
+    def __init__(self, filename, parse_line, append_only=False, encoding=None, partial_lines=True):
+        self.filename = filename
+        self.parse_line = parse_line
+        self.append_only = append_only
+        # False: a last line without its "\n" is treated as cut off mid-write and left out
+        self.partial_lines = partial_lines
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.resets = 0
+        self.version = 0   # bumped whenever records() would return something different
+        self._clear()
+        self._signature = None
+        self._read_ns = 0
+        self._loaded = False
+
+    def _clear(self):
+        self._complete = []   # records from lines ending in "\n"
+        self._partial = []    # record from a last line still being written (if any)
+        self._records = []
+        self._offset = 0      # bytes of complete lines consumed
+        self._crc = 0         # crc32 of those bytes
+        self._tail = b""      # last TAIL_CHECK_BYTES of them
+
+    def invalidate(self):
+        # the owner rewrote the file: re-read it on the next call
+        self._loaded = False
+
+    @property
+    def size(self):
+        # bytes of complete lines read so far
+        return self._offset
+
+    def records(self):
+        # the list is shared (and grows in place on appends) -> copy it before handing it out
+        signature = file_signature(self.filename)
+        if self._loaded and signature == self._signature and not racy(signature, self._read_ns):
+            return self._records
+
+        if signature is None:
+            if self._offset > 0 or self._records:
+                self.resets += 1
+                self.version += 1
+            self._clear()
+        else:
+            with open(self.filename, "rb") as file:
+                if self._can_read_tail(file, signature):
+                    file.seek(self._offset)
+                    self._consume(file.read())
+                else:
+                    file.seek(0)
+                    self._reread(file.read())
+
+        self._signature = signature
+        self._read_ns = time.time_ns()
+        self._loaded = True
+        return self._records
+
+    def _can_read_tail(self, file, signature):
+        # same file, grown past what we read, and the bytes before our position unchanged
+        if not (self.append_only and self._loaded and self._signature is not None and self._offset > 0):
+            return False
+        if signature[2] != self._signature[2] or signature[1] <= self._offset:
+            return False
+        file.seek(self._offset - len(self._tail))
+        return file.read(len(self._tail)) == self._tail
+
+    def _reread(self, data):
+        # full read; if the part we already parsed is unchanged, only parse what follows it
+        if self._offset > 0 and len(data) >= self._offset and zlib.crc32(data[:self._offset]) == self._crc:
+            self._consume(data[self._offset:])
+            return
+        if self._offset > 0 or self._records:
+            self.resets += 1
+            self.version += 1
+        self._clear()
+        self._consume(data)
+
+    def _consume(self, data):
+        # data = the file from self._offset on
+        end = data.rfind(b"\n") + 1
+        complete = data[:end]
+        if complete:
+            # parsed in full before anything is kept, so a parse error leaves the cache as it was
+            parsed = []
+            for line in complete.decode(self.encoding).split("\n")[:-1]:
+                record = self.parse_line(line)
+                if record is not None:
+                    parsed.append(record)
+            self._complete.extend(parsed)
+            self._offset += end
+            self._crc = zlib.crc32(complete, self._crc)
+            self._tail = (self._tail + complete)[-TAIL_CHECK_BYTES:]
+
+        # the unfinished last line is parsed every time until its "\n" arrives
+        partial = data[end:]
+        old_partial = self._partial
+        self._partial = []
+        if partial and self.partial_lines:
+            record = self.parse_line(partial.decode(self.encoding))
+            if record is not None:
+                self._partial.append(record)
+
+        if complete or old_partial or self._partial:
+            self._records = self._complete + self._partial if self._partial else self._complete
+            self.version += 1
@@ -0,0 +1,136 @@
+from collections import Counter
+
+from Repo.product_columns import _to_int, _to_float
+
+
+def counters_for(product_repo):
+    # Live dashboard counters, or None for repos (and test doubles) that don't keep them
+    if getattr(product_repo, "supports_indexes", False) is True:
+        return product_repo.get_counters()
+    return None
+
+
+class InventoryCounters:
+    """Dashboard totals kept up to date by ProductRepo change events.
+
+    Quantities are kept as qty -> count histograms so any low-stock threshold can be
+    answered without touching the products; cost is O(distinct quantities).
+    """
+
+    def __init__(self):
+        self.on_reset([])
+
+    # ---- listener callbacks (called by ProductRepo) ----
+
+    def on_reset(self, products):
+        self._state = {}                 # sku -> (qty, price, active, category) last counted
+        self.total_products = 0
+        self.total_units = 0
+        self.total_value = 0.0
+        self.all_qty = Counter()         # qty -> products (all)
+        self.active_qty = Counter()      # qty -> products (ACTIVE only)
+        self.active_products = 0
+        self.buckets = [0, 0, 0, 0]      # ACTIVE: 0, 1-5, 6-20, 21+
+        self.categories = Counter()      # ACTIVE: category text -> products
+
+        for product in products:
+            self.on_add(product)
+
+    def on_add(self, product):
+        if product.sku in self._state:
+            return  # duplicate SKU, the repo only exposes the first one
+        state = self._state_of(product)
+        self._state[product.sku] = state
+        self._apply(state, 1)
+
+    def on_change(self, product):
+        old = self._state.get(product.sku)
+        new = self._state_of(product)
+        if old == new:
+            return
+        if old is not None:
+            self._apply(old, -1)
+        self._state[product.sku] = new
+        self._apply(new, 1)
+
+    def on_remove(self, product):
+        old = self._state.pop(product.sku, None)
+        if old is not None:
+            self._apply(old, -1)
+
+    def _state_of(self, product):
+        category = "" if product.category is None else str(product.category).strip()
+        return (_to_int(product.quantity), _to_float(product.price),
+                getattr(product, "active", True) is not False, category)
+
+    def _bucket(self, qty):
+        if qty == 0:
+            return 0
+        if qty <= 5:
+            return 1
+        if qty <= 20:
+            return 2
+        return 3
+
+    def _apply(self, state, sign):
+        qty, price, active, category = state
+        self.total_products += sign
+        self.total_units += sign * qty
+        self.total_value += sign * qty * price
+        self._bump(self.all_qty, qty, sign)
+
+        if active:
+            self.active_products += sign
+            self._bump(self.active_qty, qty, sign)
+            self.buckets[self._bucket(qty)] += sign
+            self._bump(self.categories, category, sign)
+
+    def _bump(self, counter, key, sign):
+        counter[key] += sign
+        if counter[key] == 0:
+            del counter[key]  # keep the histograms as small as the distinct values
+
+    # ---- queries (DashboardChartService turns these into its stats dict) ----
+
+    def status_counts(self, threshold):
+        # ACTIVE products: qty == 0 -> out, qty <= threshold -> low, else in
+        out_of_stock = self.active_qty.get(0, 0)
+        low_stock = 0
+        for qty, n in self.active_qty.items():
+            if qty != 0 and qty <= threshold:
+                low_stock += n
+        return {
+            "in_stock": self.active_products - out_of_stock - low_stock,
+            "low_stock": low_stock,
+            "out_of_stock": out_of_stock
+        }
+
+    def bucket_counts(self):
+        return {"0": self.buckets[0], "1-5": self.buckets[1], "6-20": self.buckets[2], "21+": self.buckets[3]}
+
+    def summary_counts(self, threshold):
+        # ALL products: (qty < threshold but not 0, qty == 0)
+        low_stock = 0
+        for qty, n in self.all_qty.items():
+            if qty != 0 and qty < threshold:
+                low_stock += n
+        return low_stock, self.all_qty.get(0, 0)
+
+    def verify(self, products):
+        # Recount from scratch and report every counter that drifted:
+        # {name: (incremental value, recomputed value)}; empty dict = consistent
+        fresh = InventoryCounters()
+        fresh.on_reset(products)
+
+        drift = {}
+        for name in ["total_products", "total_units", "active_products", "buckets",
+                     "all_qty", "active_qty", "categories"]:
+            mine = getattr(self, name)
+            theirs = getattr(fresh, name)
+            if mine != theirs:
+                drift[name] = (mine, theirs)
+
+        # float sums pick up rounding noise from +/- updates
+        if abs(self.total_value - fresh.total_value) > 1e-6 * max(1.0, abs(fresh.total_value)):
+            drift["total_value"] = (self.total_value, fresh.total_value)
+        return drift
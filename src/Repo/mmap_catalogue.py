@@ -0,0 +1,199 @@
+import mmap
+import struct
+import zlib
+
+from model.product import Product
+from Repo.file_cache import replace_file
+
+# magic, format version, the products.txt it mirrors (FileStamp.state(): mtime_ns, size,
+# inode, whether its crc32 is kept + that crc32), product count, where the record table,
+# the SKU index and the string heap start, crc32 of everything after the header
+HEADER = struct.Struct("<4sIqQQBIIQQQI")
+MAGIC = b"PRCM"
+VERSION = 2
+
+# one fixed-size record per product, in catalogue order:
+# quantity, price, active, then (offset, length) in the string heap for sku, name,
+# description and category (length 0 = no category)
+RECORD = struct.Struct("<qdB3x8I")
+
+# SKU index: record numbers sorted by SKU bytes (ties keep catalogue order)
+INDEX_ENTRY = struct.Struct("<I")
+
+
+def build_catalogue(products, text_state):
+    """Catalogue file contents for products (values as parsed from products.txt).
+
+    text_state is the FileStamp.state() of products.txt taken before it was read (or
+    right after it was written).
+    """
+    count = len(products)
+    heap = bytearray()
+    records = bytearray()
+    sku_bytes = []
+
+    for p in products:
+        fields = []
+        for text in (p.sku, p.name, p.description, "" if p.category is None else p.category):
+            data = text.encode("utf-8")
+            fields.append(len(heap))
+            fields.append(len(data))
+            heap += data
+        sku_bytes.append(p.sku.encode("utf-8"))
+        records += RECORD.pack(p.quantity, p.price, 1 if p.active else 0, *fields)
+
+    order = sorted(range(count), key=sku_bytes.__getitem__)
+    index = b"".join(INDEX_ENTRY.pack(i) for i in order)
+
+    records_offset = HEADER.size
+    index_offset = records_offset + len(records)
+    strings_offset = index_offset + len(index)
+    payload = bytes(records) + index + bytes(heap)
+    mtime_ns, size, inode, text_crc = text_state
+    header = HEADER.pack(MAGIC, VERSION, mtime_ns, size, inode, text_crc is not None, text_crc or 0,
+                         count, records_offset, index_offset, strings_offset, zlib.crc32(payload))
+    return header + payload
+
+
+def _header_state(fields):
+    # the products.txt state from unpacked header fields
+    mtime_ns, size, inode, has_crc, text_crc = fields[2:7]
+    return mtime_ns, size, inode, text_crc if has_crc else None
+
+
+def catalogue_state(filename):
+    # the products.txt state (see build_catalogue) a catalogue file was built from, or None
+    try:
+        with open(filename, "rb") as file:
+            header = file.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < HEADER.size:
+        return None
+    fields = HEADER.unpack(header)
+    if fields[0] != MAGIC or fields[1] != VERSION:
+        return None
+    return _header_state(fields)
+
+
+def write_catalogue(filename, products, text_state):
+    # readers that still map the old file keep their pages; new readers get this one
+    replace_file(filename, build_catalogue(products, text_state))
+
+
+class MappedCatalogue:
+    """Read-only view over a catalogue file (or bytes) without turning it into Products.
+
+    Records are read straight out of the mapping, so processes mapping the same file
+    share its pages through the OS cache.
+    """
+
+    def __init__(self, buffer, close=None):
+        self._buf = buffer
+        self._close = close
+
+        if len(buffer) < HEADER.size:
+            raise ValueError("Catalogue file is too short")
+        fields = HEADER.unpack_from(buffer)
+        if fields[0] != MAGIC or fields[1] != VERSION:
+            raise ValueError("Not a catalogue file")
+        self.count, self._records, self._index, self._strings, crc = fields[7:]
+        if (self._index != self._records + self.count * RECORD.size
+                or self._strings != self._index + self.count * INDEX_ENTRY.size
+                or self._strings > len(buffer)):
+            raise ValueError("Catalogue file is damaged")
+        # read through once: a truncated / corrupted file must not hand out wrong records
+        with memoryview(buffer) as view, view[HEADER.size:] as payload:
+            if zlib.crc32(payload) != crc:
+                raise ValueError("Catalogue file is damaged")
+        self.state = _header_state(fields)
+
+    @classmethod
+    def open(cls, filename):
+        # None when the file doesn't exist or isn't a valid catalogue
+        try:
+            with open(filename, "rb") as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError, OSError):
+            return None  # missing or empty file
+        try:
+            return cls(mapped, mapped.close)
+        except ValueError:
+            mapped.close()
+            return None
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+    def __len__(self):
+        return self.count
+
+    # ---- records ----
+
+    def _record(self, i):
+        return RECORD.unpack_from(self._buf, self._records + i * RECORD.size)
+
+    def _text(self, offset, length):
+        start = self._strings + offset
+        return bytes(self._buf[start:start + length]).decode("utf-8")
+
+    def product(self, i):
+        quantity, price, active, *fields = self._record(i)
+        sku, name, description, category = [self._text(fields[j], fields[j + 1]) for j in range(0, 8, 2)]
+        return Product(sku, name, description, quantity, price, category or None, active == 1)
+
+    def quantity(self, i):
+        return self._record(i)[0]
+
+    def active(self, i):
+        return self._record(i)[2] == 1
+
+    def sku(self, i):
+        record = self._record(i)
+        return self._text(record[3], record[4])
+
+    def products(self):
+        return [self.product(i) for i in range(self.count)]
+
+    # ---- SKU index (binary search over the mapping) ----
+
+    def _sku_bytes_at(self, j):
+        i = INDEX_ENTRY.unpack_from(self._buf, self._index + j * INDEX_ENTRY.size)[0]
+        record = self._record(i)
+        start = self._strings + record[3]
+        return i, bytes(self._buf[start:start + record[4]])
+
+    def _lower_bound(self, key):
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._sku_bytes_at(mid)[1] < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def find(self, sku):
+        # record number of the first product with this SKU, or None
+        key = str(sku).encode("utf-8")
+        j = self._lower_bound(key)
+        if j < self.count:
+            i, found = self._sku_bytes_at(j)
+            if found == key:
+                return i
+        return None
+
+    def prefix(self, prefix, limit=None):
+        # record numbers whose SKU starts with prefix, in SKU order
+        key = str(prefix).encode("utf-8")
+        results = []
+        j = self._lower_bound(key)
+        while j < self.count and (limit is None or len(results) < limit):
+            i, found = self._sku_bytes_at(j)
+            if not found.startswith(key):
+                break
+            results.append(i)
+            j += 1
+        return results
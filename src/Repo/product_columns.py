@@ -0,0 +1,132 @@
+from array import array
+from collections import Counter
+from itertools import compress
+
+
+def _to_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def columns_for(product_repo):
+    # Packed view of the catalogue, or None for repos (and test doubles) that don't keep one
+    if getattr(product_repo, "supports_indexes", False) is True:
+        return product_repo.get_columns()
+    return None
+
+
+class ProductColumns:
+    """Column-per-field copy of the catalogue, kept in step by ProductRepo.
+
+    Rows are not in catalogue order (removal swaps the last row in), which is fine for
+    the aggregations this is meant for.
+    """
+
+    def __init__(self):
+        self.on_reset([])
+
+    def __len__(self):
+        return len(self.skus)
+
+    # ---- listener callbacks (called by ProductRepo) ----
+
+    def on_reset(self, products):
+        self.skus = []
+        self.rows = {}                    # sku -> row number
+        self.quantities = array("q")
+        self.prices = array("d")
+        self.category_codes = array("l")
+        self.active = bytearray()         # 1 = ACTIVE, 0 = INACTIVE
+        self.category_names = []          # code -> category text ("" = uncategorised)
+        self._category_codes = {}         # category text -> code
+
+        for product in products:
+            self.on_add(product)
+
+    def on_add(self, product):
+        if product.sku in self.rows:
+            return  # duplicate SKU, the repo only exposes the first one
+
+        self.rows[product.sku] = len(self.skus)
+        self.skus.append(product.sku)
+        self.quantities.append(_to_int(product.quantity))
+        self.prices.append(_to_float(product.price))
+        self.category_codes.append(self._code_for(product.category))
+        self.active.append(1 if getattr(product, "active", True) else 0)
+
+    def on_change(self, product):
+        row = self.rows.get(product.sku)
+        if row is None:
+            self.on_add(product)
+            return
+
+        self.quantities[row] = _to_int(product.quantity)
+        self.prices[row] = _to_float(product.price)
+        self.category_codes[row] = self._code_for(product.category)
+        self.active[row] = 1 if getattr(product, "active", True) else 0
+
+    def on_remove(self, product):
+        row = self.rows.pop(product.sku, None)
+        if row is None:
+            return
+
+        # move the last row into the gap so removal stays O(1)
+        last = len(self.skus) - 1
+        if row != last:
+            moved_sku = self.skus[last]
+            self.skus[row] = moved_sku
+            self.quantities[row] = self.quantities[last]
+            self.prices[row] = self.prices[last]
+            self.category_codes[row] = self.category_codes[last]
+            self.active[row] = self.active[last]
+            self.rows[moved_sku] = row
+
+        self.skus.pop()
+        self.quantities.pop()
+        self.prices.pop()
+        self.category_codes.pop()
+        self.active.pop()
+
+    def _code_for(self, category):
+        name = "" if category is None else str(category).strip()
+        code = self._category_codes.get(name)
+        if code is None:
+            code = len(self.category_names)
+            self._category_codes[name] = code
+            self.category_names.append(name)
+        return code
+
+    # ---- aggregations ----
+
+    def active_quantities(self):
+        return compress(self.quantities, self.active)
+
+    def category_code_counts(self, active_only=True):
+        # Counter of category code -> number of products
+        codes = compress(self.category_codes, self.active) if active_only else self.category_codes
+        return Counter(codes)
+
+    def category_counts(self, active_only=True):
+        # {category text: count}, "" for uncategorised
+        counts = self.category_code_counts(active_only)
+        return {self.category_names[code]: n for code, n in counts.items()}
+
+    def total_units(self):
+        return sum(self.quantities)
+
+    def total_value(self, active_only=False):
+        rows = range(len(self.skus))
+        if active_only:
+            rows = compress(rows, self.active)
+        q = self.quantities
+        p = self.prices
+        return sum(q[i] * p[i] for i in rows)
@@ -0,0 +1,111 @@
+def indexes_for(product_repo):
+    # Secondary indexes, or None for repos (and test doubles) that don't keep them
+    if getattr(product_repo, "supports_indexes", False) is True:
+        return product_repo.get_indexes()
+    return None
+
+
+def sorted_index_for(product_repo, name):
+    # SortedIndex by name (see Repo.sorted_index.SORTED_INDEXES), or None without index support
+    if getattr(product_repo, "supports_indexes", False) is True:
+        return product_repo.get_sorted_index(name)
+    return None
+
+
+def search_index_for(product_repo):
+    # TrigramIndex for search_products, or None without index support
+    if getattr(product_repo, "supports_indexes", False) is True:
+        return product_repo.get_search_index()
+    return None
+
+
+def fuzzy_index_for(product_repo):
+    # TrigramIndex for fuzzy_search_products, or None without index support
+    if getattr(product_repo, "supports_indexes", False) is True:
+        return product_repo.get_fuzzy_index()
+    return None
+
+
+def category_key(category):
+    # same normalisation filter_products uses: trimmed + lowercase, None = no category
+    if category is None:
+        return None
+    return str(category).strip().lower()
+
+
+class ProductIndexes:
+    """Secondary indexes over the catalogue, kept in step by ProductRepo.
+
+    category key -> SKUs and the ACTIVE / INACTIVE SKU sets, so filters only touch
+    the products that match.
+    """
+
+    def __init__(self):
+        self.on_reset([])
+
+    # ---- listener callbacks (called by ProductRepo) ----
+
+    def on_reset(self, products):
+        self._keys = {}          # sku -> (category key, active) last indexed
+        self.by_category = {}    # category key -> set of SKUs
+        self.active = set()
+        self.inactive = set()
+
+        for product in products:
+            self.on_add(product)
+
+    def on_add(self, product):
+        if product.sku in self._keys:
+            return  # duplicate SKU, the repo only exposes the first one
+        self._insert(product.sku, self._key_of(product))
+
+    def on_change(self, product):
+        old = self._keys.get(product.sku)
+        new = self._key_of(product)
+        if old == new:
+            return
+        if old is not None:
+            self._discard(product.sku, old)
+        self._insert(product.sku, new)
+
+    def on_remove(self, product):
+        old = self._keys.get(product.sku)
+        if old is not None:
+            self._discard(product.sku, old)
+
+    def _key_of(self, product):
+        return category_key(product.category), getattr(product, "active", True) is not False
+
+    def _insert(self, sku, key):
+        category, active = key
+        self._keys[sku] = key
+        if category is not None:
+            self.by_category.setdefault(category, set()).add(sku)
+        if active:
+            self.active.add(sku)
+        else:
+            self.inactive.add(sku)
+
+    def _discard(self, sku, key):
+        category, active = key
+        del self._keys[sku]
+        if category is not None:
+            skus = self.by_category[category]
+            skus.discard(sku)
+            if not skus:
+                del self.by_category[category]
+        if active:
+            self.active.discard(sku)
+        else:
+            self.inactive.discard(sku)
+
+    # ---- lookups ----
+
+    def category_skus(self, category):
+        return self.by_category.get(category_key(category), set())
+
+    def active_skus(self):
+        return self.active
+
+    def inactive_skus(self):
+        return self.inactive
@@ -1,64 +1,658 @@
+import os
+import time
+from contextlib import contextmanager
+
 from model.product import Product
+from Repo.product_columns import ProductColumns
+from Repo.inventory_counters import InventoryCounters
+from Repo.product_indexes import ProductIndexes
+from Repo.sorted_index import SortedIndex, SORTED_INDEXES
+from Repo.trigram_index import TrigramIndex, fuzzy_fields, word_trigrams
+from Repo.binary_snapshot import read_snapshot, write_snapshot
+from Repo.mmap_catalogue import catalogue_state, write_catalogue
+from Repo.file_cache import FileCache, FileStamp, replace_file, stamp_matches
+
+# journal is folded back into products.txt once it grows past this many bytes
+JOURNAL_COMPACT_BYTES = 256 * 1024
+
+STALE_CATALOGUE_MESSAGE = ("The catalogue was rewritten by another process since it was loaded; "
+                           "refresh() and redo the changes before saving the whole catalogue")
+
+
+def parse_product_line(line):
+    # one products.txt line: sku,name,description,quantity,price[,category[,ACTIVE|INACTIVE]]
+    parts = line.split(",")
+
+    sku = parts[0].strip()
+    name = parts[1].strip()
+    description = parts[2].strip()
+    quantity = int(parts[3].strip())
+    price = float(parts[4].strip())
+
+    category = parts[5].strip() if len(parts) > 5 and parts[5].strip() else None
+    active = parts[6].strip().upper() == "ACTIVE" if len(parts) > 6 else True
+
+    return Product(sku, name, description, quantity, price, category, active)
+
+
+def format_product_line(product):
+    category = product.category if product.category is not None else ""
+    status = "ACTIVE" if getattr(product, "active", True) else "INACTIVE"
+
+    return (
+        f"{product.sku},{product.name},{product.description},"
+        f"{product.quantity},{product.price},{category},{status}"
+    )
+
+
+def read_products_text(filename):
+    products = []  # reset to avoid duplicates
+
+    try:
+        with open(filename, "r") as file:
+            for line in file:
+                line = line.strip()
+                if line == "":
+                    continue
+
+                products.append(parse_product_line(line))
+
+    except FileNotFoundError:
+        pass  # file doesn't exist yet -> start empty
+
+    return products
+
+
+def parse_journal_line(line):
+    # Journal records: "U,<product line>" (upsert) or "D,<sku>" (delete); None if unreadable
+    op, _, rest = line.strip().partition(",")
+    if op == "U":
+        try:
+            return "U", parse_product_line(rest)
+        except (ValueError, IndexError):
+            return None
+    if op == "D":
+        return "D", rest.strip()
+    return None
+
+
+def read_journal_records(journal_filename):
+    # ([("U", Product) or ("D", sku)], characters read); cut-off and unreadable records are skipped
+    records = []
+    size = 0
+    try:
+        with open(journal_filename, "r") as file:
+            lines = file.readlines()
+    except FileNotFoundError:
+        return records, size
+
+    for line in lines:
+        size += len(line)
+
+        # a record without its newline was cut off mid-write -> ignore it
+        if not line.endswith("\n"):
+            continue
+
+        record = parse_journal_line(line)
+        if record is not None:
+            records.append(record)
+
+    return records, size
 
 
 class ProductRepo:
-    def __init__(self, filename="src/data/products.txt"):
+    # services check this before using the index/column helpers (test doubles don't have them)
+    supports_indexes = True
+
+    def __init__(self, filename="src/data/products.txt", journal=False,
+                 compact_threshold=JOURNAL_COMPACT_BYTES, binary_snapshot=False, mapped_catalogue=False,
+                 storage=None, reload_interval=1.0):
         self.filename = filename
-        self.products = []
+        # optional storage engine (Repo.stock_repo); replaces the built-in products.txt handling,
+        # so journal / binary_snapshot / mapped_catalogue only apply when it is None
+        self.storage = storage
+        # optional packed copy of products.txt that loads without parsing every line
+        self.binary_snapshot = binary_snapshot
+        self.binary_filename = filename + ".bin"
+        # optional fixed-layout copy for ReadOnlyProductRepo readers (mmap'd, shared between processes)
+        self.mapped_catalogue = mapped_catalogue
+        self.catalogue_filename = filename + ".cat"
+        # journal mode appends one record per change instead of rewriting the file
+        self.journal = journal
+        self.journal_filename = filename + ".journal"
+        self.compact_threshold = compact_threshold
+        self._journal_size = 0
+        # another terminal / batch job may change products.txt or append to the journal;
+        # the read methods check for that at most every reload_interval seconds (None = never)
+        self.reload_interval = reload_interval
+        self._last_reload_check = time.monotonic()
+        self._text_stamp = FileStamp(filename)   # products.txt as last loaded / written by us
+        self._journal_cache = FileCache(self.journal_filename, parse_journal_line,
+                                        append_only=True, partial_lines=False)
+        self._journal_applied = 0     # journal records already reflected in self.products
+        self._journal_resets = 0
+        self._batch = None     # pending writes while inside batch()
+        self._listeners = []   # derived views (columns, indexes, counters) kept in step
+        self._columns = None
+        self._counters = None
+        self._indexes = None
+        self._sorted_indexes = {}   # name -> SortedIndex
+        self._search_index = None
+        self._fuzzy_index = None
+        # bumped on every change so caches (e.g. the dashboard) can tell they're stale
+        self.version = 0
+        self._products = []
+        self._by_sku = {}      # sku -> Product
+        self._positions = {}   # sku -> index in self.products
         self.load_products()
 
+    @property
+    def products(self):
+        return self._products
+
+    @products.setter
+    def products(self, products):
+        # replacing the whole list (e.g. tests resetting the repo) must rebuild the index
+        self._products = products
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        self._by_sku = {}
+        self._positions = {}
+        for i in range(len(self._products)):
+            sku = self._products[i].sku
+            # first occurrence wins, same as the old linear scan
+            if sku not in self._positions:
+                self._positions[sku] = i
+                self._by_sku[sku] = self._products[i]
+        self._notify_reset()
+
+    # ---- listeners: on_reset(products), on_add(p), on_change(p), on_remove(p) ----
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+        listener.on_reset(list(self._by_sku.values()))
+        return listener
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify_reset(self):
+        self.version += 1
+        if self._listeners:
+            products = list(self._by_sku.values())
+            for listener in self._listeners:
+                listener.on_reset(products)
+
+    def _notify(self, event, product):
+        self.version += 1
+        for listener in self._listeners:
+            getattr(listener, event)(product)
+
+    # ---- picking up changes made by other processes ----
+
+    def refresh(self):
+        """Reload if products.txt changed on disk, or apply what was appended to the journal.
+
+        Journal records are applied one at a time, so listeners get the usual incremental
+        events. With a storage engine, reloads when the engine says another process changed
+        it. Returns True when anything changed.
+        """
+        if self._batch is not None:
+            return False
+        if self.storage is not None:
+            if not self.storage.changed():
+                return False
+            self.load_products()
+            return True
+        if self._text_stamp.changed():
+            self.load_products()
+            return True
+
+        records = self._journal_cache.records()
+        if self._journal_cache.resets != self._journal_resets:
+            # journal truncated / rewritten (e.g. compacted by the other process)
+            self.load_products()
+            return True
+        if len(records) == self._journal_applied:
+            return False
+
+        new_records = records[self._journal_applied:]
+        self._journal_applied = len(records)
+        self._journal_size = self._journal_cache.size
+        self._apply_journal_records(new_records)
+        return True
+
+    def _maybe_refresh(self):
+        if self.reload_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._last_reload_check >= self.reload_interval:
+            self._last_reload_check = now
+            self.refresh()
+
+    def check_for_changes(self):
+        # what the read methods do first: refresh() if reload_interval has passed since the last check
+        # (for callers that cache on `version` without reading through the repo)
+        self._maybe_refresh()
+
+    def _sync_journal(self):
+        # everything in the journal right now is reflected in self.products
+        records = self._journal_cache.records()
+        self._journal_applied = len(records)
+        self._journal_resets = self._journal_cache.resets
+        self._journal_size = self._journal_cache.size
+        return records
+
+    def _apply_journal_records(self, records, skip=()):
+        # records for SKUs in skip are left out (we have newer changes of our own for them)
+        for op, value in records:
+            if op == "U":
+                if value.sku not in skip:
+                    self._apply_upsert(value)
+            elif value not in skip:
+                self._remove_from_memory(value)
+
+    def _catch_up(self, ours):
+        """Bring memory up to date with what other processes wrote, before we write.
+
+        ours: the (op, sku, product) changes already made in memory that are about to be
+        written after theirs, so they win for those SKUs; None when they aren't known
+        (save_products: the caller may have changed any product in place). If products.txt
+        or the journal was rewritten (e.g. compacted by the other process), or the storage
+        engine was changed, we reload and re-apply ours; with ours=None that isn't possible,
+        so ValueError is raised instead of writing a stale catalogue over theirs.
+        """
+        if self.storage is not None:
+            if self.storage.changed():
+                self._reload_and_redo(ours)
+            return
+        records = self._journal_cache.records()
+        if self._journal_cache.resets != self._journal_resets or self._text_stamp.changed():
+            self._reload_and_redo(ours)
+            return
+        if len(records) > self._journal_applied:
+            skip = {sku for _op, sku, _product in ours} if ours is not None else ()
+            self._apply_journal_records(records[self._journal_applied:], skip)
+            self._journal_applied = len(records)
+            self._journal_size = self._journal_cache.size
+
+    def _reload_and_redo(self, ours):
+        if ours is None:
+            raise ValueError(STALE_CATALOGUE_MESSAGE)
+        self.load_products()
+        for op, sku, product in ours:
+            if op == "U":
+                self._apply_upsert(product)
+            else:
+                self._remove_from_memory(sku)
+
+    def _apply_upsert(self, product):
+        i = self._positions.get(product.sku)
+        if i is None:
+            self._products.append(product)
+            self._positions[product.sku] = len(self._products) - 1
+            self._by_sku[product.sku] = product
+            self._notify("on_add", product)
+        else:
+            self._products[i] = product
+            self._by_sku[product.sku] = product
+            self._notify("on_change", product)
+
+    def get_columns(self):
+        # packed array view of the catalogue, built on first use then maintained incrementally
+        self._maybe_refresh()
+        if self._columns is None:
+            self._columns = self.add_listener(ProductColumns())
+        return self._columns
+
+    def get_counters(self):
+        # live dashboard counters, built on first use then maintained incrementally
+        self._maybe_refresh()
+        if self._counters is None:
+            self._counters = self.add_listener(InventoryCounters())
+        return self._counters
+
+    def get_indexes(self):
+        # category / active secondary indexes, built on first use then maintained incrementally
+        self._maybe_refresh()
+        if self._indexes is None:
+            self._indexes = self.add_listener(ProductIndexes())
+        return self._indexes
+
+    def get_sorted_index(self, name):
+        # one of SORTED_INDEXES, built on first use then maintained incrementally
+        self._maybe_refresh()
+        index = self._sorted_indexes.get(name)
+        if index is None:
+            key, where = SORTED_INDEXES[name]
+            index = self.add_listener(SortedIndex(key, where))
+            self._sorted_indexes[name] = index
+        return index
+
+    def get_search_index(self):
+        # trigram index over SKU/name/description, built on first use then maintained incrementally
+        self._maybe_refresh()
+        if self._search_index is None:
+            self._search_index = self.add_listener(TrigramIndex())
+        return self._search_index
+
+    def get_fuzzy_index(self):
+        # padded word trigrams of the name (see fuzzy_fields) for ranked fuzzy search
+        self._maybe_refresh()
+        if self._fuzzy_index is None:
+            self._fuzzy_index = self.add_listener(TrigramIndex(fuzzy_fields, word_trigrams))
+        return self._fuzzy_index
+
+    def products_for_skus(self, skus):
+        # the products for a set of SKUs, in catalogue order (unknown SKUs are skipped)
+        positions = self._positions
+        found = [sku for sku in skus if sku in positions]
+        found.sort(key=positions.__getitem__)
+        products = [self._by_sku[sku] for sku in found]
+        if self._batch is not None:
+            for product in products:
+                self._touch(product)
+        return products
+
+    def verify_counters(self):
+        # {} when the live counters match a full recount, otherwise the drifted values
+        return self.get_counters().verify(list(self._by_sku.values()))
+
+    def _reindex_from(self, start):
+        # positions after a deleted row shift down by one
+        for i in range(start, len(self._products)):
+            sku = self._products[i].sku
+            if self._positions.get(sku, len(self._products)) > i:
+                self._positions[sku] = i
+                self._by_sku[sku] = self._products[i]
+
+    def _parse_line(self, line):
+        return parse_product_line(line)
+
+    def _format_line(self, product):
+        return format_product_line(product)
+
     def load_products(self):
-        self.products = []  # reset to avoid duplicates
+        if self.storage is not None:
+            self.products = self.storage.load_products()
+            return
 
-        try:
-            with open(self.filename, "r") as file:
-                for line in file:
-                    line = line.strip()
-                    if line == "":
-                        continue
+        # taken before reading, so a change made while we read is picked up by the next refresh()
+        self._text_stamp.take()
+        products = None
+        if self.binary_snapshot:
+            # only trusted while products.txt is still the file it was written for
+            products = read_snapshot(self.binary_filename, self.filename)
+
+        if products is None:
+            products = self._load_text()
+            if self.binary_snapshot:
+                self._write_binary(products)
+
+        if self.mapped_catalogue:
+            state = self._text_stamp.state()
+            if state is not None and not stamp_matches(self.filename, catalogue_state(self.catalogue_filename)):
+                try:
+                    write_catalogue(self.catalogue_filename, products, state)
+                except OSError:
+                    pass  # readers rebuild a stale catalogue themselves
+
+        # changes made since the last snapshot live in the journal
+        self.products = self._replay_journal(products)
 
-                    parts = line.split(",")
+    def _load_text(self):
+        return read_products_text(self.filename)
 
-                    sku = parts[0].strip()
-                    name = parts[1].strip()
-                    description = parts[2].strip()
-                    quantity = int(parts[3].strip())
-                    price = float(parts[4].strip())
+    def _write_copies(self, parsed):
+        # refresh the binary snapshot / mapped catalogue after products.txt was rewritten
+        # (and _text_stamp taken of what we wrote)
+        state = self._text_stamp.state()
+        for enabled, filename, write in [(self.binary_snapshot, self.binary_filename, write_snapshot),
+                                         (self.mapped_catalogue, self.catalogue_filename, write_catalogue)]:
+            if not enabled:
+                continue
+            if parsed is not None and state is not None:
+                try:
+                    write(filename, parsed, state)
+                except OSError:
+                    pass  # e.g. a reader has the catalogue mapped on Windows; readers rebuild stale copies
+            elif os.path.exists(filename):
+                os.remove(filename)  # products.txt can't be parsed -> no stale copy
 
-                    category = parts[5].strip() if len(parts) > 5 and parts[5].strip() else None
-                    active = parts[6].strip().upper() == "ACTIVE" if len(parts) > 6 else True
+    def _write_binary(self, parsed_products):
+        # parsed_products must be what _load_text() returned for products.txt as _text_stamp saw it
+        state = self._text_stamp.state()
+        if state is None:
+            return
+        write_snapshot(self.binary_filename, parsed_products, state)
 
-                    self.products.append(Product(sku, name, description, quantity, price, category, active))
+    def _replay_journal(self, products):
+        records = self._sync_journal()
+        if not records:
+            return products
 
-        except FileNotFoundError:
-            pass  # file doesn't exist yet -> start empty
+        positions = {}
+        for i in range(len(products)):
+            positions.setdefault(products[i].sku, i)
+
+        removed = False
+        for op, value in records:
+            if op == "U":
+                i = positions.get(value.sku)
+                if i is None:
+                    positions[value.sku] = len(products)
+                    products.append(value)
+                else:
+                    products[i] = value
+            else:
+                i = positions.pop(value, None)
+                if i is not None:
+                    products[i] = None
+                    removed = True
+
+        if removed:
+            products = [p for p in products if p is not None]
+        return products
 
     def save_products(self):
-        with open(self.filename, "w") as file:
-            for product in self.products:
-                category = product.category if product.category is not None else ""
-                status = "ACTIVE" if getattr(product, "active", True) else "INACTIVE"
+        # callers may have changed any product in place -> refresh derived views
+        self._notify_reset()
+        if self._batch is not None:
+            # inside batch(): one snapshot is written when the batch ends
+            self._batch["full"] = True
+            return
+        self._write_snapshot()
+
+    def _write_snapshot(self, ours=None):
+        # ours: the changes this write is for, as in _catch_up (None = the whole catalogue)
+        # the journal is folded in below: what other processes wrote must be in memory first
+        self._catch_up(ours)
+        if self.storage is not None:
+            self.storage.save_products(self.products)
+            return
+
+        # full snapshot: written to a temp file first so a crash never leaves half a catalogue
+        lines = [self._format_line(product) for product in self.products]
+        data = replace_file(self.filename, "".join(line + "\n" for line in lines))
+        self._text_stamp.take(data)
+
+        if self.binary_snapshot or self.mapped_catalogue:
+            try:
+                # read the lines back the way load_products would, so every copy agrees exactly
+                parsed = [self._parse_line(line.strip()) for line in lines if line.strip() != ""]
+            except (ValueError, IndexError):
+                parsed = None
+            self._write_copies(parsed)
+
+        # everything in the journal is now part of the snapshot
+        if self._journal_size > 0 or os.path.exists(self.journal_filename):
+            open(self.journal_filename, "w").close()
+        self._sync_journal()
+
+    def compact(self):
+        # fold the journal into a fresh products.txt snapshot; every change is journalled
+        # already, so if another process rewrote products.txt meanwhile we reload, not fail
+        if self._batch is not None:
+            self._batch["full"] = True
+            return
+        self._write_snapshot([])
+
+    def _append_journal(self, ours):
+        # ours: (op, sku, product) changes already in memory
+        self._catch_up(ours)
+        lines = []
+        for op, sku, product in ours:
+            if op == "U":
+                lines.append("U," + self._format_line(product))
+            else:
+                lines.append("D," + sku)
+        with open(self.journal_filename, "a") as file:
+            file.write("".join(line + "\n" for line in lines))
+
+        # only our own records count as applied; if another process appended (or compacted)
+        # in between, the next refresh() replays from before ours (re-applying them is harmless)
+        applied = self._journal_applied
+        records = self._journal_cache.records()
+        self._journal_size = self._journal_cache.size
+        if self._journal_cache.resets == self._journal_resets and len(records) == applied + len(lines):
+            self._journal_applied = len(records)
+
+        if self._journal_size >= self.compact_threshold:
+            self.compact()
+
+    def _persist_upsert(self, product):
+        if self._batch is not None:
+            self._defer("U", product.sku, product)
+        elif self.storage is not None:
+            self._catch_up([("U", product.sku, product)])
+            self.storage.save_product(product)
+        elif self.journal:
+            self._append_journal([("U", product.sku, product)])
+        else:
+            # listeners already got the change event -> just rewrite the file
+            self._write_snapshot([("U", product.sku, product)])
+
+    def _persist_delete(self, sku):
+        if self._batch is not None:
+            self._defer("D", sku, None)
+        elif self.storage is not None:
+            self._catch_up([("D", sku, None)])
+            self.storage.delete_product(sku)
+        elif self.journal:
+            self._append_journal([("D", sku, None)])
+        else:
+            self._write_snapshot([("D", sku, None)])
 
-                line = (
-                    f"{product.sku},{product.name},{product.description},"
-                    f"{product.quantity},{product.price},{category},{status}"
-                )
-                file.write(line + "\n")
+    def _defer(self, op, sku, product):
+        records = self._batch["records"]
+        last_upsert = self._batch["last_upsert"]
+
+        if op == "U" and sku in last_upsert:
+            # already queued -> the record is formatted from the final state at flush
+            records[last_upsert[sku]][2] = product
+            return
+
+        last_upsert.pop(sku, None)
+        if op == "U":
+            last_upsert[sku] = len(records)
+        records.append([op, sku, product])
+
+    def _touch(self, product):
+        # inside batch(): remember the product's fields the first time the batch hands it out
+        # or changes it (services change Product objects in place), so rollback can restore it
+        saved = self._batch["saved"]
+        if id(product) not in saved:
+            saved[id(product)] = (product, dict(product.__dict__))
+
+    @contextmanager
+    def batch(self):
+        """Unit of work: persist once when the block exits, or undo in-memory changes on error."""
+        if self._batch is not None:
+            # nested batch -> joins the outer one
+            yield self
+            return
+
+        # the fields of each product are saved by _touch() when the batch first reaches it
+        saved_products = list(self._products)
+        self._batch = {"records": [], "last_upsert": {}, "full": False, "saved": {}}
+
+        try:
+            yield self
+        except BaseException:
+            saved = self._batch["saved"]
+            self._batch = None
+            for p, state in saved.values():
+                p.__dict__.clear()
+                p.__dict__.update(state)
+            self.products = saved_products
+            raise
+
+        pending = self._batch
+        self._batch = None
+        self._flush_batch(pending)
+
+    def _flush_batch(self, pending):
+        if self.storage is not None:
+            self._catch_up(None if pending["full"] else pending["records"])
+            with self.storage.batch():
+                if pending["full"]:
+                    self.storage.save_products(self.products)
+                    return
+                for op, sku, product in pending["records"]:
+                    if op == "U":
+                        self.storage.save_product(product)
+                    else:
+                        self.storage.delete_product(sku)
+            return
+
+        if pending["full"]:
+            self._write_snapshot()
+        elif pending["records"] and not self.journal:
+            self._write_snapshot(pending["records"])
+        elif pending["records"]:
+            self._append_journal(pending["records"])
 
     def add_product(self, product: Product):
         self.products.append(product)
-        self.save_products()
+        if product.sku not in self._positions:
+            self._positions[product.sku] = len(self.products) - 1
+            self._by_sku[product.sku] = product
+            self._notify("on_add", product)
+            self._persist_upsert(product)
+        elif self._batch is not None:
+            self._batch["full"] = True
+        else:
+            # a second product with the SKU stays hidden behind the first, but a journal record
+            # or storage upsert would replace the first one -> write the whole catalogue instead
+            self._write_snapshot()
 
     def remove_by_sku(self, sku):
-        for i in range(len(self.products)):
-            if self.products[i].sku == sku:
-                del self.products[i]
-                self.save_products()
-                return True
-        return False
+        if not self._remove_from_memory(sku):
+            return False
+        self._persist_delete(sku)
+        return True
+
+    def _remove_from_memory(self, sku):
+        i = self._positions.get(sku)
+        if i is None:
+            return False
+
+        removed = self.products[i]
+        del self.products[i]
+        del self._positions[sku]
+        del self._by_sku[sku]
+        self._reindex_from(i)
+
+        self._notify("on_remove", removed)
+        if sku in self._by_sku:
+            # a later duplicate of the SKU is visible now
+            self._notify("on_add", self._by_sku[sku])
+        return True
 
     def update_product(self, sku, name, description, quantity, price, category):
-        p = self.find_by_sku(sku)
+        p = self.find_by_sku(sku)   # touched for batch() rollback
         if p is None:
             return False
 
@@ -68,22 +662,58 @@ class ProductRepo:
         p.price = price
         p.category = category
 
-        self.save_products()
+        self._notify("on_change", p)
+        self._persist_upsert(p)
         return True
 
     def find_by_sku(self, sku):
-        for product in self.products:
-            if product.sku == sku:
-                return product
-        return None
+        self._maybe_refresh()
+        product = self._by_sku.get(sku)
+        if product is not None and self._batch is not None:
+            self._touch(product)
+        return product
+
+    def complete_sku(self, prefix, limit=10):
+        # up to `limit` SKUs starting with prefix, sorted (autocomplete / suggestions)
+        if limit <= 0:
+            return []
+        return self.get_sorted_index("sku").prefix(prefix, limit)
+
+    def skus_with_prefix(self, prefix):
+        # every SKU starting with prefix, sorted (e.g. all "ELEC-" products)
+        return self.get_sorted_index("sku").prefix(prefix)
+
+    def suggest_skus(self, sku, limit=5):
+        # closest SKUs for a mistyped one: completions of the longest prefix that still matches
+        prefix = str(sku or "").strip()
+        while prefix != "":
+            suggestions = self.complete_sku(prefix, limit)
+            if suggestions:
+                return suggestions
+            prefix = prefix[:-1]
+        return []
+
+    def position_of(self, sku):
+        # index of the product in get_all_products(), or None
+        return self._positions.get(sku)
+
+    def catalogue_key(self, sku):
+        # sorts SKUs into catalogue order (here simply the position), or None
+        return self._positions.get(sku)
 
     def save_product(self, product: Product):
-        for i in range(len(self.products)):
-            if self.products[i].sku == product.sku:
-                self.products[i] = product
-                self.save_products()
-                return True
-        return False
+        i = self._positions.get(product.sku)
+        if i is None:
+            return False
+
+        if self._batch is not None:
+            self._touch(self.products[i])
+            self._touch(product)
+        self.products[i] = product
+        self._by_sku[product.sku] = product
+        self._notify("on_change", product)
+        self._persist_upsert(product)
+        return True
 
     def get_product_quantity(self, sku):
         p = self.find_by_sku(sku)
@@ -99,4 +729,9 @@ class ProductRepo:
         return getattr(p, "active", True)
 
     def get_all_products(self):
+        self._maybe_refresh()
+        if self._batch is not None:
+            # the caller may change any of them
+            for product in self.products:
+                self._touch(product)
         return self.products
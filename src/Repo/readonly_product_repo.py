@@ -0,0 +1,172 @@
+from Repo.file_cache import FileStamp, stamp_matches
+from Repo.mmap_catalogue import MappedCatalogue, build_catalogue, write_catalogue
+from Repo.product_repo import read_products_text, read_journal_records
+
+READ_ONLY_MESSAGE = "Catalogue is read-only"
+
+
+class ReadOnlyProductRepo:
+    """ProductRepo lookalike for reporting processes, backed by a memory-mapped catalogue.
+
+    Reads products.txt.cat (kept by ProductRepo(mapped_catalogue=True)) instead of parsing
+    products.txt, and layers the journal on top so it sees the same products as the
+    writer. Nothing is turned into Product objects until it is asked for.
+    """
+
+    # no incremental index/column views here; services fall back to plain scans
+    supports_indexes = False
+
+    def __init__(self, filename="src/data/products.txt"):
+        self.filename = filename
+        self.catalogue_filename = filename + ".cat"
+        self.journal_filename = filename + ".journal"
+        self._catalogue = None
+        self._text_stamp = FileStamp(self.filename)   # products.txt the catalogue was matched against
+        self._journal_stamp = FileStamp(self.journal_filename)
+        self.refresh()
+
+    def close(self):
+        if self._catalogue is not None:
+            self._catalogue.close()
+            self._catalogue = None
+
+    # ---- keeping up with the writer ----
+
+    def refresh(self):
+        # re-map the catalogue if products.txt moved on, re-read the journal if it changed
+        # (the overlay refers to catalogue record numbers, so a new catalogue re-reads it too)
+        reopened = False
+        if self._catalogue is None or self._text_stamp.changed():
+            self._text_stamp.take()
+            self._open_catalogue(self._text_stamp.state())
+            reopened = True
+
+        if reopened or self._journal_stamp.changed():
+            self._journal_stamp.take()
+            self._load_journal()
+
+    def _open_catalogue(self, state):
+        # state: FileStamp.state() of products.txt, taken just before this
+        self.close()
+        catalogue = MappedCatalogue.open(self.catalogue_filename)
+        if catalogue is not None and stamp_matches(self.filename, catalogue.state):
+            self._catalogue = catalogue
+            return
+        if catalogue is not None:
+            catalogue.close()
+
+        # missing / stale: build it once from the text file so the next reader can map it
+        products = read_products_text(self.filename)
+        if state is None:
+            state = (0, 0, 0, None)   # no products.txt: an empty catalogue nobody else will match
+        try:
+            write_catalogue(self.catalogue_filename, products, state)
+            catalogue = MappedCatalogue.open(self.catalogue_filename)
+        except OSError:
+            catalogue = None  # e.g. read-only data folder, or the file is mapped on Windows
+        if catalogue is None or catalogue.state != state:
+            # private in-memory copy; same layout, just not shared
+            if catalogue is not None:
+                catalogue.close()
+            catalogue = MappedCatalogue(build_catalogue(products, state))
+        self._catalogue = catalogue
+
+    def _load_journal(self):
+        # same rules as ProductRepo._replay_journal, kept as an overlay on the catalogue:
+        # replaced / deleted catalogue rows by record number, new products in append order
+        self._replaced = {}
+        self._deleted = set()
+        self._appended = {}
+
+        records, _size = read_journal_records(self.journal_filename)
+        for op, value in records:
+            sku = value.sku if op == "U" else value
+            i = self._catalogue.find(sku)
+            in_catalogue = i is not None and i not in self._deleted
+
+            if op == "U":
+                if sku in self._appended or not in_catalogue:
+                    self._appended[sku] = value
+                else:
+                    self._replaced[i] = value
+            elif sku in self._appended:
+                del self._appended[sku]
+            elif in_catalogue:
+                self._deleted.add(i)
+                self._replaced.pop(i, None)
+
+    # ---- reads ----
+
+    def find_by_sku(self, sku):
+        # lookups use the state as of the last refresh() (get_all_products refreshes itself)
+        i = self._catalogue.find(sku)
+        if i is not None and i not in self._deleted:
+            product = self._replaced.get(i)
+            return product if product is not None else self._catalogue.product(i)
+        return self._appended.get(sku)
+
+    def get_product_quantity(self, sku):
+        i = self._catalogue.find(sku)
+        if i is not None and i not in self._deleted and i not in self._replaced:
+            return self._catalogue.quantity(i)  # straight from the mapping, no Product built
+        p = self.find_by_sku(sku)
+        if p is None:
+            return None
+        return int(p.quantity)
+
+    def product_active(self, sku):
+        i = self._catalogue.find(sku)
+        if i is not None and i not in self._deleted and i not in self._replaced:
+            return self._catalogue.active(i)
+        p = self.find_by_sku(sku)
+        if p is None:
+            return False
+        return getattr(p, "active", True)
+
+    def get_all_products(self):
+        # materialised on demand (reports); same order ProductRepo.get_all_products() gives
+        self.refresh()
+        products = []
+        for i in range(len(self._catalogue)):
+            if i in self._deleted:
+                continue
+            product = self._replaced.get(i)
+            products.append(product if product is not None else self._catalogue.product(i))
+        products.extend(self._appended.values())
+        return products
+
+    def complete_sku(self, prefix, limit=10):
+        if limit <= 0:
+            return []
+        # deleted rows may use up some of the matches -> read that many extra
+        return self._prefix_skus(prefix, limit + len(self._deleted))[:limit]
+
+    def skus_with_prefix(self, prefix):
+        return self._prefix_skus(prefix, None)
+
+    def _prefix_skus(self, prefix, limit):
+        skus = set()
+        for i in self._catalogue.prefix(prefix, limit):
+            if i not in self._deleted:
+                skus.add(self._catalogue.sku(i))
+        for sku in self._appended:
+            if sku.startswith(prefix):
+                skus.add(sku)
+        return sorted(skus)
+
+    # ---- writes are not allowed ----
+
+    def add_product(self, product):
+        raise ValueError(READ_ONLY_MESSAGE)
+
+    def remove_by_sku(self, sku):
+        raise ValueError(READ_ONLY_MESSAGE)
+
+    def update_product(self, sku, name, description, quantity, price, category):
+        raise ValueError(READ_ONLY_MESSAGE)
+
+    def save_product(self, product):
+        raise ValueError(READ_ONLY_MESSAGE)
+
+    def save_products(self):
+        raise ValueError(READ_ONLY_MESSAGE)
@@ -0,0 +1,92 @@
+import os
+
+from Repo.budget_repo import BudgetRepo
+from Repo.favourite_repo import FavouriteRepo
+from Repo.product_repo import ProductRepo
+from Repo.purchase_order_repo import PurchaseOrderRepo
+from Repo.reservation_repo import ReservationRepo
+from Repo.return_repo import ReturnRepo
+from Repo.stock_history_repo import StockHistoryRepo
+from Repo.stock_repo import configured_storage
+from Repo.supplier_product_repo import SupplierProductRepo
+from Repo.supplier_repo import SupplierRepo
+from Repo.user_repo import UserRepo
+
+# how main.py opens the app's shared ProductRepo (the storage engine comes from $STOCK_STORAGE);
+# a registry built without product_options opens a plain products.txt with no side files
+PRODUCT_OPTIONS = {"journal": True, "binary_snapshot": True, "mapped_catalogue": True}
+
+
+class RepoRegistry:
+    """Hands out one shared repo per data file, created on first use.
+
+    main.py and the services get their repos from here, so everything reads and writes
+    the same in-memory catalogue (one parse, one set of indexes, no stale copies).
+    """
+
+    def __init__(self, data_dir="src/data", product_options=None):
+        self.data_dir = data_dir
+        self.product_options = dict(product_options or {})
+        self._repos = {}   # (kind, path) -> repo
+
+    def path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def _shared(self, kind, name, create):
+        key = (kind, name)
+        repo = self._repos.get(key)
+        if repo is None:
+            repo = create(self.path(name)) if name is not None else create()
+            self._repos[key] = repo
+        return repo
+
+    def product_repo(self, name="products.txt"):
+        def create(filename):
+            options = dict(self.product_options)
+            if "storage" not in options:
+                options["storage"] = configured_storage(filename)
+            return ProductRepo(filename, **options)
+        return self._shared("products", name, create)
+
+    def reservation_repo(self):
+        # ReservationRepo / PurchaseOrderRepo use their module-level file constants
+        return self._shared("reservations", None, ReservationRepo)
+
+    def purchase_order_repo(self):
+        return self._shared("purchase_orders", None, PurchaseOrderRepo)
+
+    def user_repo(self, name="users.txt"):
+        return self._shared("users", name, UserRepo)
+
+    def favourite_repo(self, name="favourites.txt"):
+        return self._shared("favourites", name, FavouriteRepo)
+
+    def return_repo(self, name="returns.txt"):
+        return self._shared("returns", name, ReturnRepo)
+
+    def supplier_repo(self, name="suppliers.txt"):
+        return self._shared("suppliers", name, SupplierRepo)
+
+    def supplier_product_repo(self, name="supplier_products.txt"):
+        return self._shared("supplier_products", name, SupplierProductRepo)
+
+    def budget_repo(self, name="budgets.txt"):
+        return self._shared("budgets", name, BudgetRepo)
+
+    def stock_history_repo(self, name="stock_history.txt"):
+        return self._shared("stock_history", name, StockHistoryRepo)
+
+
+_default_registry = None
+
+
+def installed_registry():
+    # the registry the app installed, or None; services given no repos only share through it
+    return _default_registry
+
+
+def set_default_registry(registry):
+    # main.py installs the app's registry; tests install RepoRegistry(temp dir) to point every
+    # service at a temp data folder. None = nothing installed (services open their own repos)
+    global _default_registry
+    _default_registry = registry
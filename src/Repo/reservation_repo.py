@@ -1,12 +1,25 @@
 from model.reservation import Reservation
+from Repo.file_cache import FileCache
 
 RESERVATION_FILE = "src/data/reservations.txt"
 
 
+def parse_reservation_line(line):
+    # the 8 '|' fields as stored, None for anything else
+    parts = line.strip().split("|")
+    if len(parts) != 8:
+        return None
+    return tuple(parts)
+
+
 class ReservationRepo:
     def __init__(self):
         # tests can set this to a temp file path
         self._io_file = None
+        # parsed lines of the current file; appends (new reservations) only read the new lines
+        self._cache = None
+        self._active = {}          # sku -> ACTIVE quantity
+        self._active_version = None
 
     def set_io_file(self, path: str):
         """Allow tests to redirect file I/O without changing RESERVATION_FILE."""
@@ -16,6 +29,13 @@ class ReservationRepo:
         # If tests configured a temp file, use it; otherwise use the default constant.
         return self._io_file or RESERVATION_FILE
 
+    def _records(self):
+        path = self._path_for_io()
+        if self._cache is None or self._cache.filename != path:
+            self._cache = FileCache(path, parse_reservation_line, append_only=True, encoding="utf-8")
+            self._active_version = None
+        return self._cache.records()
+
     def save_reservation(self, reservation):
         with open(self._path_for_io(), "a", encoding="utf-8") as file:
             file.write(
@@ -26,28 +46,25 @@ class ReservationRepo:
 
     def get_all_reservations(self):
         reservations = []
-        try:
-            with open(self._path_for_io(), "r", encoding="utf-8") as file:
-                for line in file:
-                    parts = line.strip().split("|")
-                    if len(parts) != 8:
-                        continue
-                    reservations.append(
-                        Reservation(
-                            parts[0], parts[1], parts[2], parts[3],
-                            parts[7], parts[4], parts[5], parts[6]
-                        )
-                    )
-        except FileNotFoundError:
-            return []
+        for parts in self._records():
+            reservations.append(
+                Reservation(
+                    parts[0], parts[1], parts[2], parts[3],
+                    parts[7], parts[4], parts[5], parts[6]
+                )
+            )
         return reservations
 
     def get_active_reserved_quantity(self, sku):
-        total = 0
-        for r in self.get_all_reservations():
-            if r.sku == sku and r.status == "ACTIVE":
-                total += int(r.quantity)
-        return total
+        # per-SKU totals are worked out once per change to the file
+        records = self._records()
+        if self._active_version != self._cache.version:
+            self._active = {}
+            for parts in records:
+                if parts[6] == "ACTIVE":
+                    self._active[parts[2]] = self._active.get(parts[2], 0) + int(parts[3])
+            self._active_version = self._cache.version
+        return self._active.get(sku, 0)
 
     def cancel_reservation(self, reservation_id):
         try:
@@ -74,5 +91,7 @@ class ReservationRepo:
         if updated:
             with open(self._path_for_io(), "w", encoding="utf-8") as file:
                 file.writelines(new_lines)
+            if self._cache is not None:
+                self._cache.invalidate()
 
         return updated
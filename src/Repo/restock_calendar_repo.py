@@ -1,5 +1,6 @@
 from pathlib import Path
 from model.restock_rule import RestockRule
+from Repo.file_cache import file_signature
 
 
 class RestockCalendarRepo:
@@ -7,21 +8,29 @@ class RestockCalendarRepo:
         project_root = Path(__file__).resolve().parents[2]
         self.filepath = project_root / filename
         self.rules = {}
+        self._signature = None   # restock_rules.txt as last loaded / saved
         self.load()
 
     def load(self):
         self.rules = {}
-        if not self.filepath.exists():
+        self._signature = file_signature(self.filepath)
+        if self._signature is None:
             return
         for line in self.filepath.read_text(encoding="utf-8").splitlines():
             rule = RestockRule.from_line(line)
             if rule is not None:
                 self.rules[rule.sku] = rule
 
+    def _refresh(self):
+        # the rules file was edited elsewhere -> load it again
+        if file_signature(self.filepath) != self._signature:
+            self.load()
+
     def save(self):
         self.filepath.parent.mkdir(parents=True, exist_ok=True)
         lines = [r.to_line() for r in self.rules.values()]
         self.filepath.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+        self._signature = file_signature(self.filepath)
 
     def set_rule(self, sku, reorder_level, lead_time_days):
         rule = RestockRule(sku, reorder_level, lead_time_days)
@@ -30,9 +39,11 @@ class RestockCalendarRepo:
         return rule
 
     def get_rule(self, sku):
+        self._refresh()
         return self.rules.get(sku)
 
     def get_all_rules(self):
+        self._refresh()
         return list(self.rules.values())
 
     def remove_rule(self, sku):
@@ -0,0 +1,148 @@
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+
+_entry_key = itemgetter(0)
+
+
+def quantity_key(product):
+    # None -> broken quantity, left out of the index (same as the old int() try/except skip)
+    try:
+        return int(product.quantity)
+    except (TypeError, ValueError):
+        return None
+
+
+def price_key(product):
+    try:
+        return float(product.price)
+    except (TypeError, ValueError):
+        return None
+
+
+def name_key(product):
+    # same key the name sorts use: case-insensitive
+    return str(product.name).lower()
+
+
+def sku_key(product):
+    return str(product.sku)
+
+
+def is_active(product):
+    return getattr(product, "active", True) is not False
+
+
+# name -> (key function, which products are indexed); built by ProductRepo.get_sorted_index()
+SORTED_INDEXES = {
+    "active_quantity": (quantity_key, is_active),
+    "quantity": (quantity_key, None),
+    "price": (price_key, None),
+    "name": (name_key, None),
+    "sku": (sku_key, None),
+}
+
+
+class SortedIndex:
+    """(key, sku) pairs kept sorted with bisect, maintained by ProductRepo change events.
+
+    Range queries cost O(log n + k); the smallest / largest n are a slice.
+    """
+
+    def __init__(self, key, where=None):
+        self.key = key
+        self.where = where
+        self.on_reset([])
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---- listener callbacks (called by ProductRepo) ----
+
+    def on_reset(self, products):
+        self._keys = {}       # sku -> key currently in the index
+        for product in products:
+            key = self._key_of(product)
+            if key is not None and product.sku not in self._keys:
+                self._keys[product.sku] = key
+        self._entries = sorted((key, sku) for sku, key in self._keys.items())
+
+    def on_add(self, product):
+        if product.sku in self._keys:
+            return  # duplicate SKU, the repo only exposes the first one
+        self._insert(product.sku, self._key_of(product))
+
+    def on_change(self, product):
+        old = self._keys.get(product.sku)
+        new = self._key_of(product)
+        if old == new:
+            return
+        if old is not None:
+            self._discard(product.sku, old)
+        self._insert(product.sku, new)
+
+    def on_remove(self, product):
+        old = self._keys.get(product.sku)
+        if old is not None:
+            self._discard(product.sku, old)
+
+    def _key_of(self, product):
+        if self.where is not None and not self.where(product):
+            return None
+        return self.key(product)
+
+    def _insert(self, sku, key):
+        if key is None:
+            return
+        self._keys[sku] = key
+        insort(self._entries, (key, sku))
+
+    def _discard(self, sku, key):
+        del self._keys[sku]
+        i = bisect_left(self._entries, (key, sku))
+        del self._entries[i]
+
+    # ---- queries (SKUs in key order) ----
+
+    def _bounds(self, low, high):
+        start = 0 if low is None else bisect_left(self._entries, low, key=_entry_key)
+        if high is None:
+            end = len(self._entries)
+        else:
+            end = max(bisect_right(self._entries, high, key=_entry_key), start)
+        return start, end
+
+    def range(self, low=None, high=None):
+        # SKUs with low <= key <= high (None = unbounded)
+        start, end = self._bounds(low, high)
+        return [sku for _key, sku in self._entries[start:end]]
+
+    def count_range(self, low=None, high=None):
+        # len(range(low, high)) in O(log n), for the query planner
+        start, end = self._bounds(low, high)
+        return end - start
+
+    def prefix(self, prefix, limit=None):
+        # SKUs whose (string) key starts with prefix, in key order
+        entries = self._entries
+        i = bisect_left(entries, prefix, key=_entry_key)
+        results = []
+        while i < len(entries) and entries[i][0].startswith(prefix):
+            if limit is not None and len(results) >= limit:
+                break
+            results.append(entries[i][1])
+            i += 1
+        return results
+
+    def items(self, descending=False):
+        # (key, sku) pairs in key order -> pre-sorted listings without a sort per request
+        if descending:
+            return reversed(self._entries)
+        return iter(self._entries)
+
+    def smallest(self, n):
+        return [sku for _key, sku in self._entries[:max(n, 0)]]
+
+    def largest(self, n):
+        if n <= 0:
+            return []
+        return [sku for _key, sku in reversed(self._entries[-n:])]
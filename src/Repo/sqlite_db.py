@@ -0,0 +1,116 @@
+import sqlite3
+
+DEFAULT_DB_FILE = "src/data/inventory.db"
+
+# one table per text file; rowid order = line order, so lists come back the way the
+# text repos return them (including duplicate SKUs / ids, where the first one wins)
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS products (
+        pos INTEGER PRIMARY KEY AUTOINCREMENT,
+        sku TEXT NOT NULL,
+        name TEXT NOT NULL,
+        description TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        price REAL NOT NULL,
+        category TEXT,
+        active INTEGER NOT NULL DEFAULT 1
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_products_sku ON products (sku, pos)",
+
+    """CREATE TABLE IF NOT EXISTS reservations (
+        reservation_id TEXT NOT NULL,
+        order_id TEXT,
+        sku TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        created_by TEXT,
+        created_at TEXT,
+        status TEXT NOT NULL,
+        price TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_reservations_id ON reservations (reservation_id)",
+    "CREATE INDEX IF NOT EXISTS idx_reservations_sku_status ON reservations (sku, status)",
+
+    """CREATE TABLE IF NOT EXISTS purchase_orders (
+        po_id TEXT NOT NULL,
+        expected_date TEXT,
+        created_by TEXT,
+        status TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_purchase_orders_id ON purchase_orders (po_id)",
+    "CREATE INDEX IF NOT EXISTS idx_purchase_orders_status ON purchase_orders (status)",
+    """CREATE TABLE IF NOT EXISTS purchase_order_lines (
+        po_id TEXT NOT NULL,
+        sku TEXT NOT NULL,
+        quantity INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_purchase_order_lines_po ON purchase_order_lines (po_id)",
+
+    """CREATE TABLE IF NOT EXISTS users (
+        username TEXT NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)",
+
+    """CREATE TABLE IF NOT EXISTS favourites (
+        username TEXT NOT NULL,
+        sku TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_favourites_username ON favourites (username, sku)",
+
+    """CREATE TABLE IF NOT EXISTS supplier_products (
+        supplier_id TEXT NOT NULL,
+        sku TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_supplier_products_supplier ON supplier_products (supplier_id, sku)",
+    "CREATE INDEX IF NOT EXISTS idx_supplier_products_sku ON supplier_products (sku)",
+
+    # budgets.txt only ever holds one line; id 1 is that line
+    """CREATE TABLE IF NOT EXISTS budgets (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        month TEXT NOT NULL,
+        budget REAL,
+        spent REAL NOT NULL DEFAULT 0
+    )""",
+
+    """CREATE TABLE IF NOT EXISTS stock_history (
+        sku TEXT NOT NULL,
+        delta INTEGER NOT NULL,
+        new_quantity INTEGER NOT NULL,
+        action TEXT NOT NULL,
+        timestamp TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_stock_history_sku ON stock_history (sku)",
+
+    """CREATE TABLE IF NOT EXISTS returns (
+        return_id TEXT NOT NULL,
+        sku TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        condition TEXT,
+        decision TEXT,
+        reason TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_returns_sku ON returns (sku)",
+]
+
+
+def connect(db_file=DEFAULT_DB_FILE):
+    """Open the database (creating the tables on first use) in WAL mode.
+
+    WAL lets the reporting/reader processes keep reading while one writer commits,
+    and synchronous=NORMAL is the usual durability/speed trade-off that goes with it.
+    """
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with conn:
+        for statement in SCHEMA:
+            conn.execute(statement)
+    return conn
+
+
+def open_db(db):
+    # repos take either a path or an already open connection (so several repos share one)
+    if isinstance(db, sqlite3.Connection):
+        return db
+    return connect(db)
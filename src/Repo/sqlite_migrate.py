@@ -0,0 +1,160 @@
+import argparse
+import os
+
+from Repo.budget_repo import BudgetRepo
+from Repo.favourite_repo import FavouriteRepo
+from Repo.product_repo import ProductRepo
+from Repo.reservation_repo import ReservationRepo
+from Repo.sqlite_db import DEFAULT_DB_FILE, open_db
+from Repo.sqlite_repos import (PRODUCT_COLUMNS, product_row, reservation_row,
+                               return_row, stock_history_row)
+from Repo.stock_history_repo import StockHistoryRepo
+from Repo.supplier_product_repo import SupplierProductRepo
+from Repo.user_repo import UserRepo
+from model.return_item import ReturnItem
+
+
+# Copies the text data files into the SQLite database used by Repo.sqlite_repos.
+# The text repos do the parsing, so both backends read the files the same way.
+# Each table is replaced with the file's current contents (a missing file = empty
+# table), so the tool can be re-run until the switch-over.
+#
+#   PYTHONPATH=src python -m Repo.sqlite_migrate [--data-dir src/data] [--db src/data/inventory.db]
+
+
+def _exists(data_dir, name):
+    path = os.path.join(data_dir, name)
+    return path if os.path.exists(path) else None
+
+
+def _read_products(data_dir):
+    path = _exists(data_dir, "products.txt")
+    if path is None:
+        return []
+    # journal replayed, so pending changes are migrated too
+    return ProductRepo(path, journal=True).get_all_products()
+
+
+def _read_reservations(data_dir):
+    path = _exists(data_dir, "reservations.txt")
+    if path is None:
+        return []
+    repo = ReservationRepo()
+    repo.set_io_file(path)
+    return repo.get_all_reservations()
+
+
+def _read_purchase_orders(data_dir):
+    # headers and lines share one file: po_id|date|by|status|HEADER, then po_id|sku|qty
+    headers, lines = [], []
+    path = _exists(data_dir, "purchase_orders.txt")
+    if path is None:
+        return headers, lines
+    with open(path, "r") as file:
+        for line in file:
+            parts = line.strip().split("|")
+            if len(parts) == 5 and parts[4] == "HEADER":
+                headers.append((parts[0], parts[1], parts[2], parts[3]))
+            elif len(parts) == 3:
+                lines.append((parts[0], parts[1], int(parts[2])))
+    return headers, lines
+
+
+def _read_users(data_dir):
+    path = _exists(data_dir, "users.txt")
+    if path is None:
+        return []
+    return [(u.username, u.password, u.role) for u in UserRepo(path).load_users()]
+
+
+def _read_favourites(data_dir):
+    path = _exists(data_dir, "favourites.txt")
+    if path is None:
+        return []
+    return FavouriteRepo(path).load_all()
+
+
+def _read_supplier_products(data_dir):
+    path = _exists(data_dir, "supplier_products.txt")
+    if path is None:
+        return []
+    return SupplierProductRepo(path).load_all_links()
+
+
+def _read_budget(data_dir):
+    path = _exists(data_dir, "budgets.txt")
+    if path is None:
+        return []
+    month, budget, spent = BudgetRepo(path).load_budget_record()
+    if month is None:
+        return []
+    return [(1, month, budget, spent)]
+
+
+def _read_stock_history(data_dir):
+    path = _exists(data_dir, "stock_history.txt")
+    if path is None:
+        return []
+    return StockHistoryRepo(os.path.abspath(path)).get_all()
+
+
+def _read_returns(data_dir):
+    # return_id|sku|qty|condition|decision|reason (the reason is free text)
+    returns = []
+    path = _exists(data_dir, "returns.txt")
+    if path is None:
+        return returns
+    with open(path, "r") as file:
+        for line in file:
+            parts = line.rstrip("\n").split("|", 5)
+            if len(parts) == 6:
+                returns.append(ReturnItem(*parts))
+    return returns
+
+
+def migrate(data_dir="src/data", db=DEFAULT_DB_FILE):
+    """Copy every text data file in data_dir into db. Returns {table: rows written}."""
+    headers, po_lines = _read_purchase_orders(data_dir)
+    tables = {
+        "products": (f"({PRODUCT_COLUMNS})", [product_row(p) for p in _read_products(data_dir)]),
+        "reservations": ("", [reservation_row(r) for r in _read_reservations(data_dir)]),
+        "purchase_orders": ("", headers),
+        "purchase_order_lines": ("", po_lines),
+        "users": ("", _read_users(data_dir)),
+        "favourites": ("", _read_favourites(data_dir)),
+        "supplier_products": ("", _read_supplier_products(data_dir)),
+        "budgets": ("", _read_budget(data_dir)),
+        "stock_history": ("", [stock_history_row(e) for e in _read_stock_history(data_dir)]),
+        "returns": ("", [return_row(r) for r in _read_returns(data_dir)]),
+    }
+
+    conn = open_db(db)
+    counts = {}
+    try:
+        with conn:  # all tables in one transaction
+            for table, (columns, rows) in tables.items():
+                conn.execute(f"DELETE FROM {table}")
+                if table == "products":
+                    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'products'")
+                if rows:
+                    placeholders = ", ".join("?" * len(rows[0]))
+                    conn.executemany(f"INSERT INTO {table} {columns} VALUES ({placeholders})", rows)
+                counts[table] = len(rows)
+    finally:
+        if conn is not db:
+            conn.close()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy the text data files into the SQLite database.")
+    parser.add_argument("--data-dir", default="src/data")
+    parser.add_argument("--db", default=DEFAULT_DB_FILE)
+    args = parser.parse_args(argv)
+
+    for table, count in migrate(args.data_dir, args.db).items():
+        print(f"{table}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+from contextlib import contextmanager
+from datetime import date
+
+from model.product import Product
+from model.purchase_order import PurchaseOrder
+from model.reservation import Reservation
+from model.stock_history_entry import StockHistoryEntry
+from model.user import User
+from Repo.sqlite_db import DEFAULT_DB_FILE, open_db
+
+# SQLite versions of the text-file repos: same methods, same return values, but lookups
+# go through an index and a change is one row, not a rewrite of the whole file.
+# Each takes a database path or an open connection (see Repo.sqlite_db).
+
+PRODUCT_COLUMNS = "sku, name, description, quantity, price, category, active"
+
+# SKUs bound per "IN (...)" query: older SQLite builds allow at most 999 variables
+SKU_CHUNK = 500
+
+
+# ---- row <-> model (also used by Repo.sqlite_migrate) ----
+
+def product_row(product):
+    active = getattr(product, "active", True)
+    return (product.sku, product.name, product.description, int(product.quantity),
+            float(product.price), product.category, 1 if active else 0)
+
+
+def row_product(row):
+    sku, name, description, quantity, price, category, active = row
+    return Product(sku, name, description, quantity, price, category, active == 1)
+
+
+def reservation_row(r):
+    # stored the way reservations.txt writes them (price included, e.g. "None" or "2.0")
+    return (str(r.reservation_id), str(r.order_id), str(r.sku), int(r.quantity),
+            str(r.created_by), str(r.created_at), str(r.status), str(r.price))
+
+
+def row_reservation(row):
+    reservation_id, order_id, sku, quantity, created_by, created_at, status, price = row
+    return Reservation(reservation_id, order_id, sku, quantity, price, created_by, created_at, status)
+
+
+def stock_history_row(entry):
+    return entry.sku, entry.delta, entry.new_quantity, entry.action, entry.timestamp
+
+
+def return_row(r):
+    return str(r.return_id), str(r.sku), int(r.quantity), str(r.condition), str(r.decision), str(r.reason)
+
+
+class SqliteRepo:
+    """Connection handling shared by the SQLite repos."""
+
+    def __init__(self, db=DEFAULT_DB_FILE):
+        self.conn = open_db(db)
+        self._batch_depth = 0
+
+    def _commit(self):
+        if self._batch_depth == 0:
+            self.conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """One transaction for the whole block (committed on exit, rolled back on error)."""
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.conn.rollback()
+            raise
+        self._batch_depth -= 1
+        self._commit()
+
+    def data_version(self):
+        # changes whenever another connection commits to the database (our own commits don't count)
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class SqliteProductRepo(SqliteRepo):
+    # no in-memory index/column views; services fall back to plain scans
+    supports_indexes = False
+
+    def load_products(self):
+        """No-op: every read goes to the table, so there is no in-memory copy to reload.
+
+        Kept so code that reloads a ProductRepo (e.g. after another process wrote to it)
+        can do the same here.
+        """
+
+    @property
+    def products(self):
+        return self.get_all_products()
+
+    @products.setter
+    def products(self, products):
+        with self.batch():
+            self.conn.execute("DELETE FROM products")
+            self.conn.executemany(
+                f"INSERT INTO products ({PRODUCT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [product_row(p) for p in products])
+
+    def save_products(self):
+        # every change is already committed
+        self._commit()
+
+    def _first_pos(self, sku):
+        # only the first product with a SKU is visible, like the text repo
+        row = self.conn.execute("SELECT MIN(pos) FROM products WHERE sku = ?", (sku,)).fetchone()
+        return row[0]
+
+    def get_all_products(self):
+        rows = self.conn.execute(f"SELECT {PRODUCT_COLUMNS} FROM products ORDER BY pos")
+        return [row_product(row) for row in rows]
+
+    def find_by_sku(self, sku):
+        row = self.conn.execute(
+            f"SELECT {PRODUCT_COLUMNS} FROM products WHERE sku = ? ORDER BY pos LIMIT 1", (sku,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row_product(row)
+
+    def add_product(self, product: Product):
+        self.conn.execute(
+            f"INSERT INTO products ({PRODUCT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", product_row(product))
+        self._commit()
+
+    def remove_by_sku(self, sku):
+        pos = self._first_pos(sku)
+        if pos is None:
+            return False
+        self.conn.execute("DELETE FROM products WHERE pos = ?", (pos,))
+        self._commit()
+        return True
+
+    def update_product(self, sku, name, description, quantity, price, category):
+        pos = self._first_pos(sku)
+        if pos is None:
+            return False
+        self.conn.execute(
+            "UPDATE products SET name = ?, description = ?, quantity = ?, price = ?, category = ? WHERE pos = ?",
+            (name, description, int(quantity), float(price), category, pos))
+        self._commit()
+        return True
+
+    def save_product(self, product: Product):
+        pos = self._first_pos(product.sku)
+        if pos is None:
+            return False
+        self.conn.execute(
+            f"UPDATE products SET ({PRODUCT_COLUMNS}) = (?, ?, ?, ?, ?, ?, ?) WHERE pos = ?",
+            product_row(product) + (pos,))
+        self._commit()
+        return True
+
+    def get_product_quantity(self, sku):
+        row = self.conn.execute(
+            "SELECT quantity FROM products WHERE sku = ? ORDER BY pos LIMIT 1", (sku,)).fetchone()
+        if row is None:
+            return None
+        return int(row[0])
+
+    def product_active(self, sku):
+        row = self.conn.execute(
+            "SELECT active FROM products WHERE sku = ? ORDER BY pos LIMIT 1", (sku,)).fetchone()
+        if row is None:
+            return False
+        return row[0] == 1
+
+    def position_of(self, sku):
+        # index in get_all_products(): counts the rows before it, so use catalogue_key() to sort
+        pos = self._first_pos(sku)
+        if pos is None:
+            return None
+        return self.conn.execute("SELECT COUNT(*) FROM products WHERE pos < ?", (pos,)).fetchone()[0]
+
+    def catalogue_key(self, sku):
+        # sorts SKUs into catalogue order (the row's pos), or None
+        return self._first_pos(sku)
+
+    def products_for_skus(self, skus):
+        # catalogue order, unknown SKUs skipped
+        skus = list(set(skus))
+        found = {}   # sku -> (pos, product) of its first row
+        for start in range(0, len(skus), SKU_CHUNK):
+            chunk = skus[start:start + SKU_CHUNK]
+            rows = self.conn.execute(
+                f"SELECT pos, {PRODUCT_COLUMNS} FROM products WHERE sku IN ({', '.join('?' * len(chunk))}) "
+                f"ORDER BY pos", chunk)
+            for row in rows:
+                if row[1] not in found:
+                    found[row[1]] = (row[0], row_product(row[1:]))
+        return [product for _pos, product in sorted(found.values(), key=lambda item: item[0])]
+
+    def _skus_from(self, prefix, limit):
+        # walks the sku index from prefix onwards and stops at the first non-match
+        skus = []
+        rows = self.conn.execute("SELECT DISTINCT sku FROM products WHERE sku >= ? ORDER BY sku", (prefix,))
+        for (sku,) in rows:
+            if not sku.startswith(prefix) or len(skus) == limit:
+                break
+            skus.append(sku)
+        return skus
+
+    def complete_sku(self, prefix, limit=10):
+        if limit <= 0:
+            return []
+        return self._skus_from(prefix, limit)
+
+    def skus_with_prefix(self, prefix):
+        return self._skus_from(prefix, None)
+
+    def suggest_skus(self, sku, limit=5):
+        prefix = str(sku or "").strip()
+        while prefix != "":
+            suggestions = self.complete_sku(prefix, limit)
+            if suggestions:
+                return suggestions
+            prefix = prefix[:-1]
+        return []
+
+
+class SqliteReservationRepo(SqliteRepo):
+
+    def save_reservation(self, reservation):
+        self.conn.execute("INSERT INTO reservations VALUES (?, ?, ?, ?, ?, ?, ?, ?)", reservation_row(reservation))
+        self._commit()
+
+    def get_all_reservations(self):
+        rows = self.conn.execute(
+            "SELECT reservation_id, order_id, sku, quantity, created_by, created_at, status, price "
+            "FROM reservations ORDER BY rowid")
+        return [row_reservation(row) for row in rows]
+
+    def get_active_reserved_quantity(self, sku):
+        row = self.conn.execute(
+            "SELECT COALESCE(SUM(quantity), 0) FROM reservations WHERE sku = ? AND status = 'ACTIVE'", (sku,)
+        ).fetchone()
+        return int(row[0])
+
+    def cancel_reservation(self, reservation_id):
+        cursor = self.conn.execute(
+            "UPDATE reservations SET status = 'CANCELLED' WHERE reservation_id = ? AND status = 'ACTIVE'",
+            (reservation_id,))
+        self._commit()
+        return cursor.rowcount > 0
+
+
+class SqlitePurchaseOrderRepo(SqliteRepo):
+
+    def update_po_status(self, po_id, new_status):
+        cursor = self.conn.execute("UPDATE purchase_orders SET status = ? WHERE po_id = ?", (new_status, po_id))
+        self._commit()
+        return cursor.rowcount > 0
+
+    def get_po_status(self, po_id):
+        row = self.conn.execute(
+            "SELECT status FROM purchase_orders WHERE po_id = ? ORDER BY rowid LIMIT 1", (po_id,)).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def save_purchase_order(self, purchase_order, lines):
+        with self.batch():
+            self.conn.execute(
+                "INSERT INTO purchase_orders VALUES (?, ?, ?, ?)",
+                (str(purchase_order.po_id), str(purchase_order.expected_date),
+                 str(purchase_order.created_by), str(purchase_order.status)))
+            self.conn.executemany(
+                "INSERT INTO purchase_order_lines VALUES (?, ?, ?)",
+                [(str(line.po_id), str(line.sku), int(line.quantity)) for line in lines])
+
+    def get_purchase_orders(self):
+        # purchase_orders.txt has no supplier column, so supplier_id stays unset
+        rows = self.conn.execute(
+            "SELECT po_id, expected_date, created_by, status FROM purchase_orders ORDER BY rowid")
+        return [PurchaseOrder(po_id, expected_date, created_by, status)
+                for po_id, expected_date, created_by, status in rows]
+
+
+class SqliteUserRepo(SqliteRepo):
+
+    def load_users(self):
+        rows = self.conn.execute("SELECT username, password, role FROM users ORDER BY rowid")
+        return [User(username, password, role) for username, password, role in rows]
+
+    def get_user(self, username):
+        row = self.conn.execute(
+            "SELECT username, password, role FROM users WHERE username = ? ORDER BY rowid LIMIT 1", (username,)
+        ).fetchone()
+        if row is None:
+            return None
+        return User(*row)
+
+    def save_user(self, user):
+        if self.get_user(user.username) is not None:
+            raise Exception("User already exists")
+
+        self.conn.execute("INSERT INTO users VALUES (?, ?, ?)", (user.username, user.password, user.role))
+        self._commit()
+
+    def save_all_users(self, users):
+        with self.batch():
+            self.conn.execute("DELETE FROM users")
+            self.conn.executemany(
+                "INSERT INTO users VALUES (?, ?, ?)", [(u.username, u.password, u.role) for u in users])
+
+    def update_role(self, username, new_role):
+        new_role = new_role.strip().upper()
+
+        if new_role not in ("STAFF", "ADMIN", "MANAGER"):
+            raise ValueError("Invalid role")
+
+        row = self.conn.execute(
+            "SELECT rowid FROM users WHERE username = ? ORDER BY rowid LIMIT 1", (username,)).fetchone()
+        if row is None:
+            return False
+        self.conn.execute("UPDATE users SET role = ? WHERE rowid = ?", (new_role, row[0]))
+        self._commit()
+        return True
+
+
+class SqliteFavouriteRepo(SqliteRepo):
+
+    def load_all(self):
+        return list(self.conn.execute("SELECT username, sku FROM favourites ORDER BY rowid"))
+
+    def save_all(self, favourites):
+        with self.batch():
+            self.conn.execute("DELETE FROM favourites")
+            self.conn.executemany("INSERT INTO favourites VALUES (?, ?)", favourites)
+
+    def is_favourite(self, username, sku):
+        row = self.conn.execute(
+            "SELECT 1 FROM favourites WHERE username = ? AND sku = ? LIMIT 1", (username, sku)).fetchone()
+        return row is not None
+
+    def add_favourite(self, username, sku):
+        if not self.is_favourite(username, sku):
+            self.conn.execute("INSERT INTO favourites VALUES (?, ?)", (username, sku))
+            self._commit()
+
+    def get_favourites(self, username):
+        rows = self.conn.execute("SELECT sku FROM favourites WHERE username = ? ORDER BY rowid", (username,))
+        return [sku for (sku,) in rows]
+
+    def remove_favourite(self, username, sku):
+        self.conn.execute("DELETE FROM favourites WHERE username = ? AND sku = ?", (username, sku))
+        self._commit()
+
+
+class SqliteSupplierProductRepo(SqliteRepo):
+
+    def load_all_links(self):
+        return list(self.conn.execute("SELECT supplier_id, sku FROM supplier_products ORDER BY rowid"))
+
+    def save_all_links(self, links):
+        with self.batch():
+            self.conn.execute("DELETE FROM supplier_products")
+            self.conn.executemany("INSERT INTO supplier_products VALUES (?, ?)", links)
+
+    def add_link(self, supplier_id, sku):
+        row = self.conn.execute(
+            "SELECT 1 FROM supplier_products WHERE supplier_id = ? AND sku = ? LIMIT 1", (supplier_id, sku)
+        ).fetchone()
+        if row is not None:
+            return False
+        self.conn.execute("INSERT INTO supplier_products VALUES (?, ?)", (supplier_id, sku))
+        self._commit()
+        return True
+
+    def remove_link(self, supplier_id, sku):
+        cursor = self.conn.execute(
+            "DELETE FROM supplier_products WHERE supplier_id = ? AND sku = ?", (supplier_id, sku))
+        self._commit()
+        return cursor.rowcount > 0
+
+    def get_products_for_supplier(self, supplier_id):
+        rows = self.conn.execute(
+            "SELECT sku FROM supplier_products WHERE supplier_id = ? ORDER BY rowid", (supplier_id,))
+        return [sku for (sku,) in rows]
+
+    def get_suppliers_for_product(self, sku):
+        rows = self.conn.execute(
+            "SELECT supplier_id FROM supplier_products WHERE sku = ? ORDER BY rowid", (sku,))
+        return [supplier_id for (supplier_id,) in rows]
+
+
+class SqliteBudgetRepo(SqliteRepo):
+
+    def load_budget_record(self):
+        row = self.conn.execute("SELECT month, budget, spent FROM budgets WHERE id = 1").fetchone()
+        if row is None:
+            return None, None, None
+        return row
+
+    def save_budget_record(self, month_key, budget_amount, spent_amount=0.0):
+        budget = None if budget_amount is None else float(budget_amount)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO budgets (id, month, budget, spent) VALUES (1, ?, ?, ?)",
+            (month_key, budget, float(spent_amount)))
+        self._commit()
+
+    def current_month_key(self):
+        today = date.today()
+        return f"{today.year:04d}-{today.month:02d}"
+
+
+class SqliteStockHistoryRepo(SqliteRepo):
+
+    def load(self):
+        pass
+
+    def add_entry(self, entry: StockHistoryEntry):
+        self.conn.execute("INSERT INTO stock_history VALUES (?, ?, ?, ?, ?)", stock_history_row(entry))
+        self._commit()
+        return entry
+
+    def get_all(self):
+        rows = self.conn.execute(
+            "SELECT sku, delta, new_quantity, action, timestamp FROM stock_history ORDER BY rowid")
+        return [StockHistoryEntry(*row) for row in rows]
+
+    def get_by_sku(self, sku):
+        rows = self.conn.execute(
+            "SELECT sku, delta, new_quantity, action, timestamp FROM stock_history WHERE sku = ? ORDER BY rowid",
+            (sku,))
+        return [StockHistoryEntry(*row) for row in rows]
+
+
+class SqliteReturnRepo(SqliteRepo):
+
+    def save_return(self, r):
+        self.conn.execute("INSERT INTO returns VALUES (?, ?, ?, ?, ?, ?)", return_row(r))
+        self._commit()
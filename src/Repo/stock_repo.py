@@ -1,18 +1,352 @@
-class StockRepo:
+import copy
+import os
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from Repo.binary_snapshot import read_snapshot, write_snapshot
+from Repo.file_cache import FileStamp, replace_file
+from Repo.product_repo import format_product_line, parse_product_line, read_products_text
+from Repo.sqlite_db import DEFAULT_DB_FILE
+from Repo.sqlite_repos import SqliteProductRepo
+from model.product import Product
+
+# environment variable that picks the engine main.py runs ProductRepo on
+STORAGE_ENV = "STOCK_STORAGE"
+
+
+def _clone(p):
+    # copy.copy is ~10x slower, which shows when a whole catalogue is copied on load
+    return Product(p.sku, p.name, p.description, p.quantity, p.price, p.category, p.active)
+
+
+class StockRepo(ABC):
+    """Storage engine interface: where ProductRepo keeps the catalogue.
+
+    ProductRepo holds the products in memory (plus its indexes) and calls these to persist
+    each change, asking changed() first (and in refresh()) so it reloads what another
+    process wrote. Only the first product with a SKU is visible, so the single-product
+    calls act on that one.
+    """
+
     def __init__(self, filename):
         self.filename = filename
 
+    @abstractmethod
     def load_products(self):
-        pass
+        # every stored product, in catalogue order
+        ...
+
+    @abstractmethod
+    def save_products(self, products):
+        # replace everything with products
+        ...
+
+    @abstractmethod
+    def get_product(self, sku):
+        ...
 
     def save_product(self, product):
-        pass
+        # insert, or replace the stored product with the same SKU
+        if not self.update_product(product):
+            self.insert_product(product)
 
-    def get_product(self,sku):
-        pass
+    @abstractmethod
+    def insert_product(self, product):
+        ...
+
+    @abstractmethod
+    def update_product(self, product):
+        # False when no product has that SKU
+        ...
+
+    @abstractmethod
+    def delete_product(self, sku):
+        # False when no product has that SKU
+        ...
 
-    def update_product(self,product):
+    def changed(self):
+        # True when another process changed the stored catalogue since we last loaded or
+        # wrote it (ProductRepo then reloads); engines nobody else writes to never are
+        return False
+
+    @contextmanager
+    def batch(self):
+        # writes inside the block may be grouped; engines without transactions just run them
+        yield self
+
+    def close(self):
         pass
 
-    def delete_product(self,sku):
-        pass
\ No newline at end of file
+
+class MemoryStockRepo(StockRepo):
+    """Nothing persisted: for tests and as the baseline in benchmarks."""
+
+    def __init__(self, products=None):
+        super().__init__(None)
+        self._set_items([self._pack(p) for p in products or []])
+
+    def _pack(self, product):
+        # how a product is held: a copy, so in-place changes to ProductRepo's objects aren't "saved" by accident
+        return copy.copy(product)
+
+    def _unpack(self, item):
+        return copy.copy(item)
+
+    def _item_sku(self, item):
+        return item.sku
+
+    def _set_items(self, items):
+        self._items = items
+        self._positions = {}   # sku -> index of its first item
+        for i in range(len(items)):
+            self._positions.setdefault(self._item_sku(items[i]), i)
+
+    def load_products(self):
+        return [self._unpack(item) for item in self._items]
+
+    def save_products(self, products):
+        self._set_items([self._pack(p) for p in products])
+
+    def get_product(self, sku):
+        i = self._positions.get(sku)
+        return None if i is None else self._unpack(self._items[i])
+
+    def insert_product(self, product):
+        self._items.append(self._pack(product))
+        self._positions.setdefault(product.sku, len(self._items) - 1)
+
+    def update_product(self, product):
+        i = self._positions.get(product.sku)
+        if i is None:
+            return False
+        self._items[i] = self._pack(product)
+        return True
+
+    def delete_product(self, sku):
+        i = self._positions.pop(sku, None)
+        if i is None:
+            return False
+        del self._items[i]
+        # everything after i moved down one; a later duplicate of sku becomes the visible one
+        positions = self._positions
+        for j in range(i, len(self._items)):
+            other = self._item_sku(self._items[j])
+            if positions.get(other, j + 1) > j:
+                positions[other] = j
+        return True
+
+
+class TextStockRepo(MemoryStockRepo):
+    """products.txt, one line per product. Any change rewrites the file (once per batch).
+
+    Each product is held as its formatted line, so a write only formats the product that
+    changed. The file is only parsed again when its stamp (Repo.file_cache.FileStamp) shows
+    something else changed it.
+    """
+
+    def __init__(self, filename="src/data/products.txt"):
+        super().__init__()
+        self.filename = filename
+        self._in_batch = 0
+        self._stamp = FileStamp(filename)   # the file the held lines match (never taken = not read yet)
+
+    def _pack(self, product):
+        return product.sku, format_product_line(product)
+
+    def _unpack(self, item):
+        return parse_product_line(item[1])
+
+    def _item_sku(self, item):
+        return item[0]
+
+    def _read_lines(self):
+        try:
+            with open(self.filename, "r") as file:
+                return [line.strip() for line in file if line.strip() != ""]
+        except FileNotFoundError:
+            return []
+
+    def _read_file(self):
+        # (products, the lines they were parsed from)
+        lines = self._read_lines()
+        return [parse_product_line(line) for line in lines], lines
+
+    def _loaded_items(self, products, lines):
+        # untouched lines are written back as they were read
+        return [(products[i].sku, lines[i]) for i in range(len(lines))]
+
+    def load_products(self):
+        self._stamp.take()
+        products, lines = self._read_file()
+        self._set_items(self._loaded_items(products, lines))
+        return products
+
+    def changed(self):
+        return self._stamp.signature is not False and self._stamp.changed()
+
+    def _read(self):
+        if self._in_batch == 0 and self._stamp.changed():
+            self.load_products()
+
+    def _save_change(self):
+        if self._in_batch == 0:
+            self._write()
+
+    def _write(self):
+        lines = [item[1] for item in self._items]
+        self._stamp.take(replace_file(self.filename, "".join(line + "\n" for line in lines)))
+        return lines
+
+    def save_products(self, products):
+        super().save_products(products)
+        if self._in_batch == 0:
+            self._write()
+
+    def get_product(self, sku):
+        self._read()
+        return super().get_product(sku)
+
+    def insert_product(self, product):
+        self._read()
+        super().insert_product(product)
+        self._save_change()
+
+    def update_product(self, product):
+        self._read()
+        updated = super().update_product(product)
+        if updated:
+            self._save_change()
+        return updated
+
+    def delete_product(self, sku):
+        self._read()
+        deleted = super().delete_product(sku)
+        if deleted:
+            self._save_change()
+        return deleted
+
+    @contextmanager
+    def batch(self):
+        # apply every change in memory, write once at the end
+        self._read()
+        self._in_batch += 1
+        try:
+            yield self
+        except BaseException:
+            self._in_batch -= 1
+            self._stamp = FileStamp(self.filename)   # nothing written: re-read the file, dropping the changes
+            raise
+        self._in_batch -= 1
+        if self._in_batch == 0:
+            self._write()
+
+
+class BinaryStockRepo(TextStockRepo):
+    """products.txt plus the packed snapshot (Repo.binary_snapshot) that loads without parsing."""
+
+    def __init__(self, filename="src/data/products.txt"):
+        super().__init__(filename)
+        self.binary_filename = filename + ".bin"
+
+    def _read_file(self):
+        products = read_snapshot(self.binary_filename, self.filename)
+        if products is not None:
+            return products, None   # lines are formatted on the first write
+        lines = self._read_lines()
+        products = [parse_product_line(line) for line in lines]
+        state = self._stamp.state()   # taken by load_products() before reading
+        if state is not None:
+            write_snapshot(self.binary_filename, products, state)
+        return products, lines
+
+    def _loaded_items(self, products, lines):
+        # own copies: ProductRepo changes the returned products in place
+        return [(p.sku, None if lines is None else lines[i], _clone(p)) for i, p in enumerate(products)]
+
+    def _pack(self, product):
+        # the line plus the product parsed back from it, so the snapshot holds exactly
+        # what a text load gives without re-parsing the whole file on every write
+        sku, line = super()._pack(product)
+        try:
+            parsed = parse_product_line(line)
+        except (ValueError, IndexError):
+            parsed = None
+        return sku, line, parsed
+
+    def _unpack(self, item):
+        return _clone(item[2]) if item[2] is not None else parse_product_line(item[1])
+
+    def _write(self):
+        items = self._items
+        for i in range(len(items)):
+            if items[i][1] is None:
+                items[i] = (items[i][0], format_product_line(items[i][2]), items[i][2])
+        lines = super()._write()
+        parsed = [item[2] for item in self._items]
+        if None not in parsed:
+            write_snapshot(self.binary_filename, parsed, self._stamp.state())
+        elif os.path.exists(self.binary_filename):
+            os.remove(self.binary_filename)
+        return lines
+
+
+class SqliteStockRepo(StockRepo):
+    """products table in the SQLite database (Repo.sqlite_repos): single-row writes."""
+
+    def __init__(self, db=DEFAULT_DB_FILE):
+        super().__init__(db)
+        self.repo = SqliteProductRepo(db)
+        self._data_version = None   # as of our last load (None = not loaded yet)
+
+    def load_products(self):
+        self._data_version = self.repo.data_version()
+        return self.repo.get_all_products()
+
+    def changed(self):
+        return self._data_version is not None and self.repo.data_version() != self._data_version
+
+    def save_products(self, products):
+        self.repo.products = products
+
+    def get_product(self, sku):
+        return self.repo.find_by_sku(sku)
+
+    def insert_product(self, product):
+        self.repo.add_product(product)
+
+    def update_product(self, product):
+        return self.repo.save_product(product)
+
+    def delete_product(self, sku):
+        return self.repo.remove_by_sku(sku)
+
+    def batch(self):
+        return self.repo.batch()
+
+    def close(self):
+        self.repo.close()
+
+
+STORAGE_ENGINES = ("text", "memory", "binary", "sqlite")
+
+
+def open_storage(engine, products_file="src/data/products.txt", db_file=DEFAULT_DB_FILE):
+    """Storage engine by name (see STORAGE_ENGINES)."""
+    if engine == "text":
+        return TextStockRepo(products_file)
+    if engine == "binary":
+        return BinaryStockRepo(products_file)
+    if engine == "sqlite":
+        return SqliteStockRepo(db_file)
+    if engine == "memory":
+        # starts from products.txt, changes are lost on exit
+        return MemoryStockRepo(read_products_text(products_file))
+    raise ValueError("Unknown storage engine: " + str(engine) + " (choose from " + ", ".join(STORAGE_ENGINES) + ")")
+
+
+def configured_storage(products_file="src/data/products.txt", db_file=DEFAULT_DB_FILE):
+    # engine named by $STOCK_STORAGE, or None for ProductRepo's built-in journalled products.txt
+    engine = os.environ.get(STORAGE_ENV, "").strip().lower()
+    if engine == "":
+        return None
+    return open_storage(engine, products_file, db_file)
@@ -0,0 +1,79 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from Repo.product_repo import ProductRepo, read_products_text
+from Repo.sqlite_repos import SqliteProductRepo
+from Repo.stock_repo import STORAGE_ENGINES, open_storage
+
+
+# Runs the same ProductRepo workload on every storage engine against a copy of products.txt
+# (the real data files are never written):
+#
+#   PYTHONPATH=src python -m Repo.storage_benchmark [--products src/data/products.txt] [--updates 200]
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def benchmark(products_file="src/data/products.txt", engines=STORAGE_ENGINES, updates=200):
+    """{engine: {"load": s, "update": s, "batch": s}} for ProductRepo on each engine.
+
+    load = open + read the catalogue, update = `updates` single save_product calls,
+    batch = the same updates inside one batch().
+    """
+    products = read_products_text(products_file)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for engine in engines:
+            text_file = os.path.join(work_dir, engine + ".txt")
+            db_file = os.path.join(work_dir, engine + ".db")
+            if os.path.exists(products_file):
+                shutil.copyfile(products_file, text_file)
+            if engine == "sqlite":
+                seed = SqliteProductRepo(db_file)
+                seed.products = products
+                seed.close()
+
+            storage = open_storage(engine, text_file, db_file)
+            repo, load_time = _timed(lambda: ProductRepo(text_file, storage=storage))
+
+            skus = [p.sku for p in repo.get_all_products()[:updates]]
+
+            def update_each():
+                for sku in skus:
+                    p = repo.find_by_sku(sku)
+                    p.quantity += 1
+                    repo.save_product(p)
+
+            def update_batched():
+                with repo.batch():
+                    update_each()
+
+            _none, update_time = _timed(update_each)
+            _none, batch_time = _timed(update_batched)
+            storage.close()
+
+            results[engine] = {"load": load_time, "update": update_time, "batch": batch_time}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the product storage engines.")
+    parser.add_argument("--products", default="src/data/products.txt")
+    parser.add_argument("--updates", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    print(f"{'engine':<8} {'load':>10} {'update':>10} {'batch':>10}")
+    for engine, times in benchmark(args.products, updates=args.updates).items():
+        print(f"{engine:<8} {times['load']:>10.4f} {times['update']:>10.4f} {times['batch']:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
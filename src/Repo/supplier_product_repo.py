@@ -1,3 +1,17 @@
+from Repo.file_cache import FileCache, append_line
+
+
+def parse_link_line(line):
+    # supplier_id,sku -> (supplier_id, sku); None for blank / malformed lines
+    line = line.strip()
+    if line == "":
+        return None
+    parts = line.split(",", 1)
+    if len(parts) != 2:
+        return None
+    return parts[0].strip(), parts[1].strip()
+
+
 class SupplierProductRepo:
     def __init__(self, filename="src/data/supplier_products.txt"):
         self.filename = filename
@@ -5,32 +19,35 @@ class SupplierProductRepo:
             open(self.filename, "r").close()
         except FileNotFoundError:
             open(self.filename, "w").close()
+        # re-parsed only when the file changes; add_link appends, so only the new line is read
+        self._cache = FileCache(self.filename, parse_link_line, append_only=True)
+        self._lookups = ({}, {})
+        self._lookups_version = None
 
     def load_all_links(self):
-        links = []
-        with open(self.filename, "r") as file:
-            for line in file:
-                line = line.strip()
-                if line == "":
-                    continue
-                parts = line.split(",", 1)
-                if len(parts) != 2:
-                    continue
-                supplier_id = parts[0].strip()
-                sku = parts[1].strip()
-                links.append((supplier_id, sku))
-        return links
+        return list(self._cache.records())
 
     def save_all_links(self, links):
         with open(self.filename, "w") as file:
             for supplier_id, sku in links:
                 file.write(f"{supplier_id},{sku}\n")
+        self._cache.invalidate()
+
+    def _links_by(self):
+        # (supplier_id -> SKUs, sku -> supplier_ids), both in file order, rebuilt on change
+        links = self._cache.records()
+        if self._lookups_version != self._cache.version:
+            by_supplier, by_sku = {}, {}
+            for supplier_id, sku in links:
+                by_supplier.setdefault(supplier_id, []).append(sku)
+                by_sku.setdefault(sku, []).append(supplier_id)
+            self._lookups = (by_supplier, by_sku)
+            self._lookups_version = self._cache.version
+        return self._lookups
 
     def add_link(self, supplier_id, sku):
-        links = self.load_all_links()
-        if (supplier_id, sku) not in links:
-            links.append((supplier_id, sku))
-            self.save_all_links(links)
+        if sku not in self._links_by()[0].get(supplier_id, []):
+            append_line(self.filename, f"{supplier_id},{sku}")
             return True
         return False
 
@@ -51,15 +68,7 @@ class SupplierProductRepo:
         return removed
 
     def get_products_for_supplier(self, supplier_id):
-        skus = []
-        for s_id, sku in self.load_all_links():
-            if s_id == supplier_id:
-                skus.append(sku)
-        return skus
+        return list(self._links_by()[0].get(supplier_id, []))
 
     def get_suppliers_for_product(self, sku):
-        supplier_ids = []
-        for s_id, s_sku in self.load_all_links():
-            if s_sku == sku:
-                supplier_ids.append(s_id)
-        return supplier_ids
+        return list(self._links_by()[1].get(sku, []))
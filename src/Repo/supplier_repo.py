@@ -1,9 +1,11 @@
 from model.supplier import Supplier
+from Repo.file_cache import file_signature
 
 class SupplierRepo:
     def __init__(self, filename="src/data/suppliers.txt"):
         self.filename = filename
         self.suppliers = []
+        self._signature = None   # suppliers.txt as last loaded / saved
         self.load_suppliers()
 
     def load_suppliers(self):
@@ -28,17 +30,26 @@ class SupplierRepo:
         except FileNotFoundError:
             # Create empty file on first run
             open(self.filename, "w").close()
+        self._signature = file_signature(self.filename)
+
+    def _refresh(self):
+        # another terminal / batch job changed suppliers.txt -> load it again
+        if file_signature(self.filename) != self._signature:
+            self.load_suppliers()
 
     def save_suppliers(self):
         with open(self.filename, "w") as file:
             for s in self.suppliers:
                 status = "ACTIVE" if s.active else "INACTIVE"
                 file.write(f"{s.supplier_id},{s.name},{s.phone},{s.email},{status}\n")
+        self._signature = file_signature(self.filename)
 
     def get_all(self):
+        self._refresh()
         return self.suppliers
 
     def find_by_id(self, supplier_id):
+        self._refresh()
         for s in self.suppliers:
             if s.supplier_id == supplier_id:
                 return s
@@ -0,0 +1,151 @@
+from collections import Counter
+
+
+def search_fields(product):
+    # the text search_products matches against: trimmed + lowercase SKU, name, description
+    return (
+        str(product.sku).strip().lower(),
+        str(product.name).strip().lower(),
+        str(product.description).strip().lower(),
+    )
+
+
+def fuzzy_fields(product):
+    # what fuzzy search ranks against: the name (SKUs all share "sku0..." grams, descriptions are too long)
+    return (str(product.name).strip().lower(),)
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def word_trigrams(text):
+    # each word padded as "  word " so short words and first letters still count (typo tolerant)
+    grams = set()
+    for word in text.split():
+        grams |= trigrams("  " + word + " ")
+    return grams
+
+
+def dice(a, b):
+    # trigram similarity in 0..1
+    if not a or not b:
+        return 0.0
+    return 2.0 * len(a & b) / (len(a) + len(b))
+
+
+class TrigramIndex:
+    """Inverted index: 3-character substring -> SKUs whose SKU/name/description contain it.
+
+    Any substring of 3+ characters contains all of its own trigrams, so intersecting
+    their postings gives a small candidate set that search_products then verifies.
+    With fields=fuzzy_fields, grams=word_trigrams it backs the ranked fuzzy search instead.
+    """
+
+    def __init__(self, fields=search_fields, grams=trigrams):
+        self.fields = fields
+        self.grams = grams
+        self.on_reset([])
+
+    # ---- listener callbacks (called by ProductRepo) ----
+
+    def on_reset(self, products):
+        self.postings = {}   # trigram -> set of SKUs
+        self._grams = {}     # sku -> trigrams currently posted
+
+        for product in products:
+            self.on_add(product)
+
+    def on_add(self, product):
+        if product.sku in self._grams:
+            return  # duplicate SKU, the repo only exposes the first one
+        grams = self._grams_of(product)
+        self._grams[product.sku] = grams
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(product.sku)
+
+    def on_change(self, product):
+        old = self._grams.get(product.sku)
+        if old is None:
+            self.on_add(product)
+            return
+
+        new = self._grams_of(product)
+        if new == old:
+            return
+        self._grams[product.sku] = new
+        for gram in old - new:
+            self._unpost(gram, product.sku)
+        for gram in new - old:
+            self.postings.setdefault(gram, set()).add(product.sku)
+
+    def on_remove(self, product):
+        old = self._grams.pop(product.sku, None)
+        if old is None:
+            return
+        for gram in old:
+            self._unpost(gram, product.sku)
+
+    def _grams_of(self, product):
+        grams = set()
+        for field in self.fields(product):
+            grams |= self.grams(field)
+        return frozenset(grams)
+
+    def _unpost(self, gram, sku):
+        skus = self.postings[gram]
+        skus.discard(sku)
+        if not skus:
+            del self.postings[gram]
+
+    # ---- lookups ----
+
+    def candidates(self, query):
+        # SKUs that contain every trigram of query (a superset of the real matches);
+        # None when the query is too short to narrow anything down
+        grams = trigrams(query)
+        if not grams:
+            return None
+
+        postings = []
+        for gram in grams:
+            skus = self.postings.get(gram)
+            if not skus:
+                return set()
+            postings.append(skus)
+
+        # start from the rarest trigram so the intersection stays small
+        postings.sort(key=len)
+        result = set(postings[0])
+        for skus in postings[1:]:
+            result &= skus
+            if not result:
+                break
+        return result
+
+    def estimate(self, query):
+        # upper bound on len(candidates(query)) without intersecting anything; None if too short
+        grams = trigrams(query)
+        if not grams:
+            return None
+        return min(len(self.postings.get(gram, ())) for gram in grams)
+
+    def gram_count(self, sku):
+        return len(self._grams.get(sku, ()))
+
+    def overlap_counts(self, grams, min_overlap=1):
+        # {sku: how many of grams it has}, keeping SKUs with at least min_overlap of them.
+        # A SKU sharing min_overlap grams must be in one of the (len - min_overlap + 1) rarest
+        # postings, so only those are scanned; the common ones are just probed for those SKUs.
+        postings = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+        split = max(len(postings) - max(min_overlap, 1) + 1, 0)
+
+        counts = Counter()
+        for skus in postings[:split]:
+            counts.update(skus)
+        for skus in postings[split:]:
+            counts.update(counts.keys() & skus)
+
+        if min_overlap <= 1:
+            return counts
+        return {sku: n for sku, n in counts.items() if n >= min_overlap}
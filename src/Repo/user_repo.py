@@ -1,4 +1,20 @@
 from model.user import User
+from Repo.file_cache import FileCache
+
+
+def parse_user_line(line):
+    # username:password_hash[:ROLE] -> (username, password, role), None for a blank line
+    line = line.strip()
+    if not line:
+        return None
+
+    parts = line.split(":")
+    username = parts[0].strip()
+    password = parts[1].strip()
+    role = parts[2].strip().upper() if len(parts) > 2 and parts[2].strip() else "STAFF"
+    return username, password, role
+
+
 class UserRepo:
     def __init__(self, filename):
         self.filename = filename
@@ -6,29 +22,28 @@ class UserRepo:
             open(self.filename, "r").close()
         except FileNotFoundError:
             open(self.filename, "w").close()
+        # users.txt is re-parsed only when it changes; save_user appends -> only the new line is read
+        self._cache = FileCache(self.filename, parse_user_line, append_only=True)
+        self._by_username = {}
+        self._by_username_version = None
 
     def load_users(self):
-        users = []
-        with open(self.filename, "r") as file:
-            for line in file:
-                line = line.strip()
-                if not line:
-                    continue
-
-                parts = line.split(":")
-                username = parts[0].strip()
-                password = parts[1].strip()
-                role = parts[2].strip().upper() if len(parts) > 2 and parts[2].strip() else "STAFF"
-                users.append(User(username, password, role))
-
-        return users
+        # fresh User objects every call (callers change roles on them before save_all_users)
+        return [User(username, password, role) for username, password, role in self._cache.records()]
 
 
     def get_user(self, username):
-        for user in self.load_users():
-            if user.username == username:
-                return user
-        return None
+        records = self._cache.records()
+        if self._by_username_version != self._cache.version:
+            self._by_username = {}
+            for record in records:
+                self._by_username.setdefault(record[0], record)
+            self._by_username_version = self._cache.version
+
+        record = self._by_username.get(username)
+        if record is None:
+            return None
+        return User(*record)
 
     def save_user(self, user):
         if self.get_user(user.username) is not None:
@@ -41,6 +56,7 @@ class UserRepo:
         with open(self.filename, "w") as file:
             for user in users:
                 file.write(user.username + ":" + user.password + ":" + user.role + "\n")
+        self._cache.invalidate()
 
     def update_role(self, username, new_role):
         users = self.load_users()
@@ -1,68 +1,268 @@
+import json
+import os
+import time
+from bisect import bisect_right, insort
 from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 
+from Repo.file_cache import TAIL_CHECK_BYTES, replace_file
+from Service.audit_record import parse_audit_line, record_message
+from Service.audit_sink import flush_audit
+
 AUDIT_FILE = "src/data/audit_log.txt"
 
+# counts are kept per minute; the minute the window starts in is re-read from the log
+# (just the bytes its lines came from) so the window is still exact to the second
+BUCKET_SECONDS = 60
+
+# the longest window answered from the counters (main.py shows the last day and the last
+# week); minutes older than that are dropped, and longer windows read the whole log
+MAX_WINDOW_HOURS = 24 * 7
+
+# the checkpoint is rewritten at most this often (seconds); lines read since the last save
+# are just read again after a restart
+CHECKPOINT_INTERVAL = 60.0
+
+CHECKPOINT_VERSION = 2
+
 
 class ActivityService:
-    def __init__(self, filename=AUDIT_FILE):
+    """Activity stats from the audit log, read incrementally.
+
+    The log is only ever appended to, so each get_stats call reads just the bytes added
+    since the last one and adds them to per-minute counters; a window is the sum of the
+    minutes inside it. Only the last max_window_hours of minutes are kept; a longer window
+    is counted by reading the whole log, as before the counters existed. With
+    checkpoint_file the read position and the counters are saved (at most every
+    checkpoint_interval seconds), so a restart carries on from there instead of re-reading
+    the log. A log that was rotated, truncated or rewritten is read again from the start.
+    """
+
+    def __init__(self, filename=AUDIT_FILE, checkpoint_file=None,
+                 max_window_hours=MAX_WINDOW_HOURS, checkpoint_interval=CHECKPOINT_INTERVAL):
         self.filename = filename
+        self.checkpoint_file = checkpoint_file
+        self.max_window_hours = max_window_hours
+        self.checkpoint_interval = checkpoint_interval
+        self._checkpoint_loaded = False
+        self._last_save = None    # time.monotonic() of the last checkpoint write
+        self._unsaved = False     # counters changed since then
+        self._reset()
+
+    def _reset(self):
+        self._offset = 0      # bytes of complete lines counted
+        self._tail = b""      # last TAIL_CHECK_BYTES of them
+        self._inode = None
+        self._partial = None  # record from a last line still being written (not saved)
+        # minute start (epoch) -> [Counter of (user, action), Counter of failed logins by user,
+        #                          start, end of the log bytes its lines are in]
+        self._buckets = {}
+        self._minutes = []    # keys of _buckets, sorted
+        self._horizon = 0     # minutes up to this one are outside every window
 
     def _parse_line(self, line):
-        try:
-            timestamp_str, message = line.split(" - ", 1)
-            timestamp = datetime.strptime(
-                timestamp_str.strip(), "%Y-%m-%d %H:%M:%S"
-            )
-            return timestamp, message.strip()
-        except:
+        # (datetime, "USER=.. ACTION=.. ...") for a JSON or legacy text line, (None, None) if unreadable
+        record = parse_audit_line(line)
+        if record is None:
             return None, None
+        return datetime.fromtimestamp(record["ts"]), record_message(record)
 
-    def get_stats(self, hours=24):
-        cutoff = datetime.now() - timedelta(hours=hours)
+    def _entry(self, record):
+        # (minute, user, action, failed login?) for a record that names a user and an action
+        if record is None:
+            return None
+        user = record.get("user")
+        action = record.get("action")
+        if user is None or action is None:
+            return None
+        minute = int(record["ts"] // BUCKET_SECONDS) * BUCKET_SECONDS
+        return minute, user, action, action == "LOGIN" and "FAIL" in record.get("text", "")
+
+    def _count(self, record, start, end):
+        # start, end: where the record's line is in the log
+        entry = self._entry(record)
+        if entry is None:
+            return
+        minute, user, action, failed = entry
+        if minute <= self._horizon:
+            return
+
+        bucket = self._buckets.get(minute)
+        if bucket is None:
+            bucket = self._buckets[minute] = [Counter(), Counter(), start, end]
+            if self._minutes and minute < self._minutes[-1]:
+                insort(self._minutes, minute)  # lines are nearly always in time order
+            else:
+                self._minutes.append(minute)
+        bucket[0][(user, action)] += 1
+        if failed:
+            bucket[1][user] += 1
+        bucket[2] = min(bucket[2], start)
+        bucket[3] = max(bucket[3], end)
 
-        total_by_user = Counter()
-        total_by_action = Counter()
-        actions_by_user = defaultdict(Counter)
-        failed_logins_by_user = Counter()
+    def _prune(self):
+        # drop the minutes that have fallen out of the longest window
+        self._horizon = int(time.time() - self.max_window_hours * 3600 - BUCKET_SECONDS)
+        n = bisect_right(self._minutes, self._horizon)
+        if n == 0:
+            return False
+        for minute in self._minutes[:n]:
+            del self._buckets[minute]
+        del self._minutes[:n]
+        return True
 
+    def _continues(self, file, st):
+        # is this still the log we read up to self._offset (same file, nothing before it changed)?
+        if self._offset == 0:
+            return True
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            return False
+        file.seek(self._offset - len(self._tail))
+        return file.read(len(self._tail)) == self._tail
+
+    def _update(self):
+        flush_audit()  # lines still queued by the background writer
+        if not self._checkpoint_loaded:
+            self._checkpoint_loaded = True
+            self._load_checkpoint()
+
+        if self._prune():
+            self._unsaved = True
         try:
-            with open(self.filename, "r") as file:
-                for line in file:
-                    line = line.strip()
-                    if line == "":
-                        continue
+            with open(self.filename, "rb") as file:
+                st = os.fstat(file.fileno())
+                if not self._continues(file, st):
+                    self._reset()
+                    self._prune()
+                    self._unsaved = True
+                self._inode = st.st_ino
+                data = b""
+                if st.st_size > self._offset:
+                    file.seek(self._offset)
+                    data = file.read()
+        except FileNotFoundError:
+            if self._offset > 0 or self._buckets:
+                self._reset()
+                self._save_checkpoint(force=True)
+            self._partial = None
+            return
 
-                    timestamp, message = self._parse_line(line)
-                    if timestamp is None or timestamp < cutoff:
-                        continue
+        end = data.rfind(b"\n") + 1
+        if end > 0:
+            start = self._offset
+            for line in data[:end].split(b"\n")[:-1]:
+                self._count(parse_audit_line(line.decode("utf-8", errors="replace")), start, start + len(line) + 1)
+                start += len(line) + 1
+            self._offset += end
+            self._tail = (self._tail + data[:end])[-TAIL_CHECK_BYTES:]
+            self._unsaved = True
 
-                    user = None
-                    action = None
+        # the unfinished last line is counted for this call only, until its "\n" arrives
+        partial = data[end:]
+        self._partial = parse_audit_line(partial.decode("utf-8", errors="replace")) if partial else None
 
-                    parts = message.split()
-                    for part in parts:
-                        if part.startswith("USER="):
-                            user = part.split("=", 1)[1]
-                        elif part.startswith("ACTION="):
-                            action = part.split("=", 1)[1]
+        if self._unsaved:
+            self._save_checkpoint()
 
-                    if user is None or action is None:
-                        continue
+    def _load_checkpoint(self):
+        if self.checkpoint_file is None:
+            return
+        try:
+            with open(self.checkpoint_file, "r") as file:
+                data = json.load(file)
+            if data.get("version") != CHECKPOINT_VERSION:
+                return
+            buckets = {}
+            for minute, actions, fails, start, end in data["buckets"]:
+                buckets[minute] = [Counter({(u, a): n for u, a, n in actions}), Counter({u: n for u, n in fails}),
+                                   start, end]
+            offset, tail, inode = data["offset"], bytes.fromhex(data["tail"]), data["inode"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return  # missing or unreadable: read the log from the start
+        self._offset, self._tail, self._inode, self._buckets = offset, tail, inode, buckets
+        self._minutes = sorted(buckets)
+        self._last_save = time.monotonic()
 
-                    total_by_user[user] += 1
-                    total_by_action[action] += 1
-                    actions_by_user[user][action] += 1
+    def _save_checkpoint(self, force=False):
+        if self.checkpoint_file is None:
+            return
+        now = time.monotonic()
+        if not force and self._last_save is not None and now - self._last_save < self.checkpoint_interval:
+            return
+        self._last_save = now
+        self._unsaved = False
+        buckets = []
+        for minute in self._minutes:
+            actions, fails, start, end = self._buckets[minute]
+            buckets.append([minute, [[u, a, n] for (u, a), n in actions.items()], [[u, n] for u, n in fails.items()],
+                            start, end])
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "offset": self._offset,
+            "tail": self._tail.hex(),
+            "inode": self._inode,
+            "buckets": buckets,
+        }
+        replace_file(self.checkpoint_file, json.dumps(data, separators=(",", ":")))
 
-                    if action == "LOGIN" and "FAIL" in message:
-                        failed_logins_by_user[user] += 1
+    def _read_range(self, start, end):
+        # records of the complete lines in log bytes [start, end)
+        with open(self.filename, "rb") as file:
+            file.seek(start)
+            data = file.read(end - start)
+        return [parse_audit_line(line) for line in data.decode("utf-8", errors="replace").split("\n")]
 
+    def _scan(self):
+        # every record in the log (for windows longer than the counters keep)
+        try:
+            with open(self.filename, "rb") as file:
+                data = file.read()
         except FileNotFoundError:
-            pass
+            return []
+        return [parse_audit_line(line) for line in data.decode("utf-8", errors="replace").split("\n")]
 
-        return {
-            "total_by_user": total_by_user,
-            "total_by_action": total_by_action,
-            "actions_by_user": actions_by_user,
-            "failed_logins_by_user": failed_logins_by_user,
+    def _add(self, stats, actions, fails):
+        for (user, action), n in actions.items():
+            stats["total_by_user"][user] += n
+            stats["total_by_action"][action] += n
+            stats["actions_by_user"][user][action] += n
+        stats["failed_logins_by_user"].update(fails)
+
+    def _add_records(self, stats, records, cutoff, minute=None):
+        # records at or after cutoff (and in minute, when given), one at a time
+        for record in records:
+            entry = self._entry(record)
+            if entry is None or record["ts"] < cutoff or (minute is not None and entry[0] != minute):
+                continue
+            self._add(stats, {(entry[1], entry[2]): 1}, {entry[1]: 1} if entry[3] else {})
+
+    def get_stats(self, hours=24):
+        cutoff = (datetime.now() - timedelta(hours=hours)).timestamp()
+        stats = {
+            "total_by_user": Counter(),
+            "total_by_action": Counter(),
+            "actions_by_user": defaultdict(Counter),
+            "failed_logins_by_user": Counter(),
         }
+
+        if hours > self.max_window_hours:
+            # longer than the counters keep: count the whole log
+            flush_audit()
+            self._add_records(stats, self._scan(), cutoff)
+            return stats
+
+        self._update()
+        first = bisect_right(self._minutes, cutoff - BUCKET_SECONDS)
+        if first < len(self._minutes) and self._minutes[first] < cutoff:
+            # the window starts inside this minute: only its lines from cutoff on count
+            minute = self._minutes[first]
+            bucket = self._buckets[minute]
+            self._add_records(stats, self._read_range(bucket[2], bucket[3]), cutoff, minute)
+            first += 1
+        for minute in self._minutes[first:]:
+            bucket = self._buckets[minute]
+            self._add(stats, bucket[0], bucket[1])
+
+        # the unfinished last line, kept out of the saved counters
+        self._add_records(stats, [self._partial], cutoff)
+        return stats
@@ -0,0 +1,128 @@
+import json
+import time
+from datetime import datetime
+
+# attribute keys that name what an action was done to, in order of preference
+ENTITY_KEYS = ("sku", "po", "reservation", "target", "order")
+
+# timestamp formats of the text lines written before the log became JSON
+LEGACY_FORMATS = (
+    ("%Y-%m-%d %H:%M:%S", " - "),   # "2026-01-05 01:00:00 - USER=.. ACTION=.."
+    ("%Y%m%d%H%M%S", " "),          # "20260105010000 message" (purchase orders)
+)
+
+
+def audit_record(user, action, attrs=None, text=None, ts=None):
+    """Structured record for one audit entry:
+        {"ts": epoch seconds, "user": .. or None, "action": .., "entity": "sku:A1" or None,
+         "attrs": {key: value, ...}, "text": "free text" (only when there is some)}
+    Values are kept as given (numbers stay numbers, text may contain spaces).
+    """
+    attrs = dict(attrs or {})
+    entity = None
+    for key in ENTITY_KEYS:
+        if key in attrs:
+            entity = key + ":" + str(attrs[key])
+            break
+
+    record = {
+        "ts": round(time.time() if ts is None else ts, 3),
+        "user": user,
+        "action": action,
+        "entity": entity,
+        "attrs": attrs,
+    }
+    if text:
+        record["text"] = text
+    return record
+
+
+def parse_message(message, ts=None):
+    # record for a text message "USER=.. ACTION=.. key=value ... free text", as written
+    # before the services passed their fields: values are strings, "USER=None" means no user
+    user = None
+    action = None
+    attrs = {}
+    words = []
+    for part in message.split():
+        key, sep, value = part.partition("=")
+        if sep == "" or key == "":
+            words.append(part)
+        elif key == "USER":
+            user = None if value == "None" else value
+        elif key == "ACTION":
+            action = value
+        else:
+            attrs[key] = value
+    return audit_record(user, action, attrs, " ".join(words), ts)
+
+
+class AuditMessage(str):
+    """One audit entry as a service hands it over.
+
+    Reads as the text form ("USER=.. ACTION=.. key=value ... text") wherever a string is
+    expected, but audit_line() stores the fields it was built from, not that text.
+    """
+
+    def __new__(cls, user, action, text=None, **attrs):
+        message = super().__new__(cls, record_message({"user": user, "action": action, "attrs": attrs, "text": text}))
+        message.user = user
+        message.action = action
+        message.text = text
+        message.attrs = attrs
+        return message
+
+
+def message_record(message, ts=None):
+    # record for an AuditMessage, or for a plain text message (parsed)
+    if isinstance(message, AuditMessage):
+        return audit_record(message.user, message.action, message.attrs, message.text, ts)
+    return parse_message(message, ts)
+
+
+def audit_line(message):
+    # one JSON line per record (ASCII only, so any file encoding reads it)
+    return json.dumps(message_record(message), separators=(",", ":"), default=str)
+
+
+def record_message(record):
+    # back to "USER=.. ACTION=.. key=value ... text" for display
+    parts = []
+    if record.get("user") is not None:
+        parts.append("USER=" + str(record["user"]))
+    if record.get("action") is not None:
+        parts.append("ACTION=" + str(record["action"]))
+    for key, value in (record.get("attrs") or {}).items():
+        parts.append(f"{key}={value}")
+    if record.get("text"):
+        parts.append(record["text"])
+    return " ".join(parts)
+
+
+def _parse_legacy(line):
+    for fmt, sep in LEGACY_FORMATS:
+        timestamp_str, found, message = line.partition(sep)
+        if not found:
+            continue
+        try:
+            timestamp = datetime.strptime(timestamp_str.strip(), fmt)
+        except ValueError:
+            continue
+        return parse_message(message.strip(), timestamp.timestamp())
+    return None
+
+
+def parse_audit_line(line):
+    """Record for one line of the audit log (JSON or a legacy text line), or None."""
+    line = line.strip()
+    if line == "":
+        return None
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(record, dict) or not isinstance(record.get("ts"), (int, float)):
+            return None
+        return record
+    return _parse_legacy(line)
@@ -0,0 +1,151 @@
+import atexit
+import threading
+
+from Service.audit_record import audit_line
+
+# how often the background writer wakes up to write what has been queued (seconds)
+FLUSH_INTERVAL = 0.5
+
+# queued lines before write() stops waiting for the writer and writes them itself
+MAX_PENDING = 10000
+
+
+class AuditSink:
+    """Where the services' audit lines go.
+
+    With background=True, write() only queues the line; a daemon thread appends everything
+    queued every flush_interval seconds, one open + write per file. The queue holds at most
+    max_pending lines: past that the caller writes the queue out itself, so nothing is dropped
+    and memory stays bounded. Whatever is still queued is written by close() / at exit.
+
+    With background=False every write() appends straight away (tests, one-off scripts).
+    """
+
+    def __init__(self, background=True, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.background = background
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.last_error = None    # OSError from the background thread (it has no caller to raise to)
+        self._pending = []        # (filename, encoding, text) in write order
+        self._lock = threading.Lock()         # guards _pending
+        self._write_lock = threading.Lock()   # one writer at a time, so batches stay in order
+        self._wake = threading.Event()
+        self._thread = None
+        self._closed = False
+
+    def write(self, filename, line, encoding=None):
+        self.write_lines(filename, [line], encoding)
+
+    def write_lines(self, filename, lines, encoding=None):
+        text = "".join(line + "\n" for line in lines)
+        if text == "":
+            return
+        if not self.background or self._closed:
+            with self._write_lock:
+                self._append(filename, encoding, text)
+            return
+
+        with self._lock:
+            self._pending.append((filename, encoding, text))
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self.flush()
+        else:
+            self._start()
+
+    def flush(self):
+        # write everything queued so far (on the calling thread); OSError is raised here
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            self._write_batch(batch)
+
+    def close(self):
+        # stop the writer and write what is left; later writes go straight to the file
+        self._closed = True
+        thread = self._thread
+        if thread is not None:
+            self._wake.set()
+            thread.join()
+            self._thread = None
+            atexit.unregister(self.close)
+        self.flush()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                self.last_error = e
+
+    def _write_batch(self, batch):
+        # consecutive lines for the same file are joined into one write
+        groups = []
+        for filename, encoding, text in batch:
+            if groups and groups[-1][0] == filename and groups[-1][1] == encoding:
+                groups[-1][2].append(text)
+            else:
+                groups.append((filename, encoding, [text]))
+        for filename, encoding, texts in groups:
+            self._append(filename, encoding, "".join(texts))
+
+    def _append(self, filename, encoding, text):
+        with open(filename, "a", encoding=encoding) as file:
+            file.write(text)
+
+
+# synchronous until the app switches to a background sink (main.py does), so code and tests
+# that read the log straight after writing it keep seeing every line
+_sink = AuditSink(background=False)
+
+
+def audit_sink():
+    return _sink
+
+
+def set_audit_sink(sink):
+    # the old sink's queued lines are written before it is replaced
+    global _sink
+    old, _sink = _sink, sink
+    if old is not sink:
+        old.close()
+    return old
+
+
+def write_audit_line(filename, line, encoding=None):
+    _sink.write(filename, line, encoding)
+
+
+def write_audit_lines(filename, lines, encoding=None):
+    _sink.write_lines(filename, lines, encoding)
+
+
+def write_audit(filename, message):
+    # the services' audit entry point: one AuditMessage (or legacy text message) as a JSON record line
+    _sink.write(filename, audit_line(message))
+
+
+def write_audit_messages(filename, messages):
+    # several messages in one write
+    _sink.write_lines(filename, [audit_line(message) for message in messages])
+
+
+def flush_audit():
+    # before reading the log, so lines still queued are in it
+    _sink.flush()
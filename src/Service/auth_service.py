@@ -1,6 +1,7 @@
 import hashlib
 from model.user import User
-from datetime import datetime
+from Service.audit_record import AuditMessage
+from Service.audit_sink import write_audit
 
 AUDIT_FILE = "src/data/audit_log.txt"
 
@@ -36,16 +37,16 @@ class AuthService:
     def login(self, username, password):
         user = self.user_repo.get_user(username)
         if user is None:
-            self.write_audit(f"USER={username} ACTION=LOGIN FAIL reason=user_not_found")
+            self.write_audit(AuditMessage(username, "LOGIN", "FAIL", reason="user_not_found"))
             return False
 
         password = self._hash_password(password)
         if password != user.password:
-            self.write_audit(f"USER={username} ACTION=LOGIN FAIL reason=bad_password")
+            self.write_audit(AuditMessage(username, "LOGIN", "FAIL", reason="bad_password"))
             return False
 
         self.current_user = user
-        self.write_audit(f"USER={username} ACTION=LOGIN SUCCESS")
+        self.write_audit(AuditMessage(username, "LOGIN", "SUCCESS"))
         return True
 
     def assign_role(self, target_username, new_role):
@@ -72,7 +73,7 @@ class AuthService:
             return False
 
         print("You have successfully changed role")
-        self.write_audit(f"USER={self.current_user.username} ACTION=ASSIGN_ROLE target={target_username} role={new_role}")
+        self.write_audit(AuditMessage(self.current_user.username, "ASSIGN_ROLE", target=target_username, role=new_role))
 
         return True
 
@@ -81,6 +82,4 @@ class AuthService:
         return True
 
     def write_audit(self, message):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(AUDIT_FILE, "a") as f:
-            f.write(f"{timestamp} - {message}\n")
+        write_audit(AUDIT_FILE, message)
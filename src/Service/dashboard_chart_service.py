@@ -1,8 +1,55 @@
 # src/Service/dashboard_chart_service.py
+import copy
+
+from Repo.product_columns import columns_for
+from Repo.inventory_counters import counters_for
+
+try:
+    import numpy as np
+except ImportError:  # optional: without NumPy the dashboard uses plain Python loops
+    np = None
+
+
+def build_summary(total_products, total_units, low_stock_count, out_of_stock_count, threshold):
+    # Summary screen numbers (shared with ProductService.get_dashboard_summary)
+    if out_of_stock_count > 0:
+        system_status = "CRITICAL"
+    elif low_stock_count >= 3:
+        system_status = "WARNING"
+    else:
+        system_status = "HEALTHY"
+
+    if total_products > 0:
+        low_stock_percent = round((low_stock_count / total_products) * 100, 1)
+        out_of_stock_percent = round((out_of_stock_count / total_products) * 100, 1)
+    else:
+        low_stock_percent = 0
+        out_of_stock_percent = 0
+
+    return {
+        "total_products": total_products,
+        "total_units": total_units,
+        "low_stock_count": low_stock_count,
+        "out_of_stock_count": out_of_stock_count,
+        "threshold": threshold,
+        "system_status": system_status,
+        "low_stock_percent": low_stock_percent,
+        "out_of_stock_percent": out_of_stock_percent,
+    }
+
 
 class DashboardChartService:
-    def __init__(self, product_repo):
+    def __init__(self, product_repo, use_numpy=True, use_counters=True, use_cache=True):
         self.product_repo = product_repo
+        self.use_numpy = use_numpy
+        # live counters kept by the repo make the dashboard independent of catalogue size
+        self.use_counters = use_counters
+        # stats snapshots keyed by (repo version, threshold); refreshes with no writes in between are free
+        self.use_cache = use_cache
+        self._cache = {}
+        self._cache_version = None
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def _safe_int(self, value, default=0):
         try:
@@ -19,21 +66,100 @@ class DashboardChartService:
 
         return f"{label:<18} | " + ("#" * filled) + f" ({value})"
 
+    def _active_quantities(self):
+        # quantities of ACTIVE products, straight from the packed columns when the repo has them
+        columns = columns_for(self.product_repo)
+        if columns is not None:
+            return columns.active_quantities()
+
+        quantities = []
+        for p in self.product_repo.get_all_products():
+            # skip inactive if your system supports that
+            if getattr(p, "active", True) is False:
+                continue
+            quantities.append(self._safe_int(p.quantity))
+        return quantities
+
+    def _counters(self):
+        if not self.use_counters:
+            return None
+        return counters_for(self.product_repo)
+
+    def _numpy_columns(self):
+        # (columns, quantities, active mask, category codes) as NumPy views over the packed
+        # arrays (no copy), or None when NumPy or the column view isn't available
+        if np is None or not self.use_numpy:
+            return None
+        columns = columns_for(self.product_repo)
+        if columns is None:
+            return None
+
+        n = len(columns)
+        if n == 0:
+            qty = np.zeros(0, dtype=np.int64)
+            active = np.zeros(0, dtype=bool)
+            codes = np.zeros(0, dtype=np.int64)
+        else:
+            qty = np.frombuffer(columns.quantities, dtype=np.int64, count=n)
+            active = np.frombuffer(columns.active, dtype=np.uint8, count=n).astype(bool)
+            codes = np.frombuffer(columns.category_codes, dtype=columns.category_codes.typecode, count=n)
+        return columns, qty, active, codes
+
+    def _category_counts_from(self, pairs):
+        # (category text, count) pairs -> {category name: count}, blank -> Uncategorised
+        counts = {}
+        for cat, n in pairs:
+            if n == 0:
+                continue
+            if cat == "":
+                cat = "Uncategorised"
+            counts[cat] = counts.get(cat, 0) + int(n)
+        return counts
+
+    def _in_catalogue_order(self, counts):
+        # the order the plain loop gives: each category where its first ACTIVE product is in
+        # the catalogue (the chart's sort is stable, so tied counts are shown in this order).
+        # Counters / columns don't keep that order; the walk stops once every category is seen
+        if len(counts) < 2:
+            return counts
+        ordered = {}
+        for p in self.product_repo.get_all_products():
+            if getattr(p, "active", True) is False:
+                continue
+            cat = "" if p.category is None else str(p.category).strip()
+            if cat == "":
+                cat = "Uncategorised"
+            if cat in counts and cat not in ordered:
+                ordered[cat] = counts[cat]
+                if len(ordered) == len(counts):
+                    return ordered
+        for cat in counts:
+            ordered.setdefault(cat, counts[cat])
+        return ordered
+
     def get_inventory_status_counts(self, threshold):
         # Inventory status: IN STOCK / LOW STOCK / OUT OF STOCK
-        products = self.product_repo.get_all_products()
+        counters = self._counters()
+        if counters is not None:
+            return counters.status_counts(threshold)
+
+        arrays = self._numpy_columns()
+        if arrays is not None:
+            _columns, qty, active, _codes = arrays
+            q = qty[active]
+            out_of_stock = int(np.count_nonzero(q == 0))
+            low_stock = int(np.count_nonzero((q != 0) & (q <= threshold)))
+            return {
+                "in_stock": int(q.size) - out_of_stock - low_stock,
+                "low_stock": low_stock,
+                "out_of_stock": out_of_stock
+            }
 
         in_stock = 0
         low_stock = 0
         out_of_stock = 0
 
-        for p in products:
-            # skip inactive if your system supports that
-            if getattr(p, "active", True) is False:
-                continue
-
-            qty = self._safe_int(p.quantity)
-
+        for qty in self._active_quantities():
             if qty == 0:
                 out_of_stock += 1
             elif qty <= threshold:
@@ -49,15 +175,23 @@ class DashboardChartService:
 
     def get_stock_bucket_counts(self):
         # Stock level buckets: 0, 1-5, 6-20, 21+
-        products = self.product_repo.get_all_products()
-        buckets = {"0": 0, "1-5": 0, "6-20": 0, "21+": 0}
+        counters = self._counters()
+        if counters is not None:
+            return counters.bucket_counts()
 
-        for p in products:
-            if getattr(p, "active", True) is False:
-                continue
+        arrays = self._numpy_columns()
+        if arrays is not None:
+            _columns, qty, active, _codes = arrays
+            q = qty[active]
+            # bin 1 = <=5 (negatives too, like the loop below), 2 = 6-20, 3 = 21+, then 0 for qty == 0
+            bins = np.digitize(q, [6, 21]) + 1
+            bins[q == 0] = 0
+            counts = np.bincount(bins, minlength=4)
+            return {"0": int(counts[0]), "1-5": int(counts[1]), "6-20": int(counts[2]), "21+": int(counts[3])}
 
-            qty = self._safe_int(p.quantity)
+        buckets = {"0": 0, "1-5": 0, "6-20": 0, "21+": 0}
 
+        for qty in self._active_quantities():
             if qty == 0:
                 buckets["0"] += 1
             elif qty <= 5:
@@ -71,6 +205,20 @@ class DashboardChartService:
 
     def get_category_counts(self):
         # Category breakdown (all categories)
+        counters = self._counters()
+        if counters is not None:
+            return self._in_catalogue_order(self._category_counts_from(counters.categories.items()))
+
+        arrays = self._numpy_columns()
+        if arrays is not None:
+            columns, _qty, active, codes = arrays
+            per_code = np.bincount(codes[active], minlength=len(columns.category_names))
+            return self._in_catalogue_order(self._category_counts_from(zip(columns.category_names, per_code)))
+
+        columns = columns_for(self.product_repo)
+        if columns is not None:
+            return self._in_catalogue_order(self._category_counts_from(columns.category_counts(active_only=True).items()))
+
         products = self.product_repo.get_all_products()
         counts = {}
 
@@ -90,7 +238,211 @@ class DashboardChartService:
 
         return counts
 
-    def build_dashboard_chart_lines(self, threshold):
+    def get_total_stock_value(self, active_only=False):
+        # sum of quantity * price over the catalogue
+        arrays = self._numpy_columns()
+        if arrays is not None:
+            columns, qty, active, _codes = arrays
+            prices = np.frombuffer(columns.prices, dtype=np.float64, count=len(columns)) if len(columns) else np.zeros(0)
+            values = qty * prices
+            if active_only:
+                values = values[active]
+            return float(values.sum())
+
+        columns = columns_for(self.product_repo)
+        if columns is not None:
+            return columns.total_value(active_only=active_only)
+
+        total = 0.0
+        for p in self.product_repo.get_all_products():
+            if active_only and getattr(p, "active", True) is False:
+                continue
+            try:
+                total += int(p.quantity) * float(p.price)
+            except:
+                continue
+        return total
+
+    def _product_rows(self):
+        # (qty, price, active, category text) per product for repos without the column view
+        for p in self.product_repo.get_all_products():
+            try:
+                price = float(p.price)
+            except:
+                price = 0.0
+            category = "" if p.category is None else str(p.category).strip()
+            yield self._safe_int(p.quantity), price, getattr(p, "active", True) is not False, category
+
+    def _repo_version(self):
+        # None -> repo can't tell us when it changed, so nothing is cached
+        if getattr(self.product_repo, "supports_indexes", False) is not True:
+            return None
+        # changes made by another process only bump the version once the repo has looked
+        self.product_repo.check_for_changes()
+        return getattr(self.product_repo, "version", None)
+
+    def get_dashboard_stats(self, threshold):
+        version = self._repo_version() if self.use_cache else None
+        if version is None:
+            return self._compute_dashboard_stats(threshold)
+
+        if version != self._cache_version:
+            # any write makes every cached threshold stale
+            self._cache = {}
+            self._cache_version = version
+
+        stats = self._cache.get(threshold)
+        if stats is None:
+            self.cache_misses += 1
+            stats = self._compute_dashboard_stats(threshold)
+            self._cache[threshold] = stats
+        else:
+            self.cache_hits += 1
+
+        # callers get their own copy so they can't corrupt the cached snapshot
+        return copy.deepcopy(stats)
+
+    def get_cache_stats(self):
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "version": self._cache_version,
+            "entries": len(self._cache)
+        }
+
+    def clear_cache(self):
+        self._cache = {}
+        self._cache_version = None
+
+    def _compute_dashboard_stats(self, threshold):
+        # Everything the summary + chart screens show, from ONE walk over the catalogue.
+        # "summary" counts every product with qty < threshold (summary screen rules);
+        # "status"/"buckets"/"categories" count ACTIVE products with qty <= threshold (chart rules).
+        counters = self._counters()
+        if counters is not None:
+            return self._dashboard_stats_from_counters(counters, threshold)
+
+        arrays = self._numpy_columns()
+        if arrays is not None:
+            return self._dashboard_stats_numpy(arrays, threshold)
+
+        in_stock = 0
+        low_stock = 0
+        out_of_stock = 0
+        buckets = [0, 0, 0, 0]
+        category_keys = {}
+        total_products = 0
+        total_units = 0
+        total_value = 0.0
+        summary_low = 0
+        summary_out = 0
+
+        columns = columns_for(self.product_repo)
+        if columns is not None:
+            rows = zip(columns.quantities, columns.prices, columns.active, columns.category_codes)
+        else:
+            rows = self._product_rows()
+
+        for qty, price, active, category_key in rows:
+            total_products += 1
+            total_units += qty
+            total_value += qty * price
+
+            if qty == 0:
+                summary_out += 1
+            elif qty < threshold:
+                summary_low += 1
+
+            if not active:
+                continue
+
+            if qty == 0:
+                out_of_stock += 1
+                buckets[0] += 1
+            else:
+                if qty <= threshold:
+                    low_stock += 1
+                else:
+                    in_stock += 1
+
+                if qty <= 5:
+                    buckets[1] += 1
+                elif qty <= 20:
+                    buckets[2] += 1
+                else:
+                    buckets[3] += 1
+
+            category_keys[category_key] = category_keys.get(category_key, 0) + 1
+
+        if columns is not None:
+            # column rows aren't in catalogue order (removals move the last row into the gap)
+            categories = self._in_catalogue_order(self._category_counts_from(
+                (columns.category_names[code], n) for code, n in category_keys.items()))
+        else:
+            categories = self._category_counts_from(category_keys.items())
+
+        return {
+            "threshold": threshold,
+            "status": {"in_stock": in_stock, "low_stock": low_stock, "out_of_stock": out_of_stock},
+            "buckets": {"0": buckets[0], "1-5": buckets[1], "6-20": buckets[2], "21+": buckets[3]},
+            "categories": categories,
+            "total_value": total_value,
+            "summary": build_summary(total_products, total_units, summary_low, summary_out, threshold),
+        }
+
+    def _dashboard_stats_from_counters(self, counters, threshold):
+        summary_low, summary_out = counters.summary_counts(threshold)
+        return {
+            "threshold": threshold,
+            "status": counters.status_counts(threshold),
+            "buckets": counters.bucket_counts(),
+            "categories": self._in_catalogue_order(self._category_counts_from(counters.categories.items())),
+            "total_value": counters.total_value,
+            "summary": build_summary(counters.total_products, counters.total_units,
+                                     summary_low, summary_out, threshold),
+        }
+
+    def _dashboard_stats_numpy(self, arrays, threshold):
+        columns, qty, active, codes = arrays
+        n = len(columns)
+        prices = np.frombuffer(columns.prices, dtype=np.float64, count=n) if n else np.zeros(0)
+
+        summary_out = int(np.count_nonzero(qty == 0))
+        summary_low = int(np.count_nonzero((qty != 0) & (qty < threshold)))
+
+        q = qty[active]
+        out_of_stock = int(np.count_nonzero(q == 0))
+        low_stock = int(np.count_nonzero((q != 0) & (q <= threshold)))
+
+        bins = np.digitize(q, [6, 21]) + 1
+        bins[q == 0] = 0
+        bucket_counts = np.bincount(bins, minlength=4)
+        per_code = np.bincount(codes[active], minlength=len(columns.category_names))
+
+        return {
+            "threshold": threshold,
+            "status": {
+                "in_stock": int(q.size) - out_of_stock - low_stock,
+                "low_stock": low_stock,
+                "out_of_stock": out_of_stock
+            },
+            "buckets": {
+                "0": int(bucket_counts[0]), "1-5": int(bucket_counts[1]),
+                "6-20": int(bucket_counts[2]), "21+": int(bucket_counts[3])
+            },
+            "categories": self._in_catalogue_order(self._category_counts_from(zip(columns.category_names, per_code))),
+            "total_value": float((qty * prices).sum()),
+            "summary": build_summary(n, int(qty.sum()), summary_low, summary_out, threshold),
+        }
+
+    def get_dashboard_summary(self, threshold=5):
+        return self.get_dashboard_stats(threshold)["summary"]
+
+    def build_dashboard_chart_lines(self, threshold, stats=None):
+        # pass the stats from get_dashboard_stats() to reuse an aggregation already done
+        if stats is None:
+            stats = self.get_dashboard_stats(threshold)
+
         lines = []
         lines.append("\n==============================")
         lines.append("     [ DASHBOARD CHARTS ]")
@@ -99,7 +451,7 @@ class DashboardChartService:
         lines.append("")
 
         # Chart 1: Inventory status
-        status = self.get_inventory_status_counts(threshold)
+        status = stats["status"]
         lines.append("--- Inventory Status ---")
         max_status = status["in_stock"]
         if status["low_stock"] > max_status:
@@ -113,7 +465,7 @@ class DashboardChartService:
         lines.append("")
 
         # Chart 2: Stock buckets
-        buckets = self.get_stock_bucket_counts()
+        buckets = stats["buckets"]
         lines.append("--- Stock Level Buckets ---")
         max_bucket = 0
         for key in buckets:
@@ -128,7 +480,7 @@ class DashboardChartService:
         lines.append("")
 
         # Chart 3: Category counts (top 5 to keep it short)
-        counts = self.get_category_counts()
+        counts = stats["categories"]
         lines.append("--- Product Categories (Top 5) ---")
 
         # Convert dict -> list of (cat, count) then sort manually (basic)
@@ -136,7 +488,7 @@ class DashboardChartService:
         for cat in counts:
             items.append((cat, counts[cat]))
 
-        # simple sort by count desc (lab-level)
+        # sort by count desc; stable, so ties stay in catalogue order (see _in_catalogue_order)
         items.sort(key=lambda x: x[1], reverse=True)
 
         top = items[:5]
@@ -1,15 +1,36 @@
 from Repo.product_repo import ProductRepo
 from Repo.category_repo import CategoryRepo
+from Repo.product_columns import columns_for, _to_int, _to_float
+from Repo.product_indexes import indexes_for, sorted_index_for, search_index_for, fuzzy_index_for
+from Repo.trigram_index import search_fields, fuzzy_fields, word_trigrams, dice
+from Service.dashboard_chart_service import build_summary
 from model.product import Product
-from datetime import datetime
+from Service.audit_record import AuditMessage
+from Service.audit_sink import write_audit
+import heapq
+import itertools
+import math
 
 AUDIT_FILE = "src/data/audit_log.txt"
 
+# query_products order_by -> sort key (broken numbers sort as 0)
+ORDER_KEYS = {
+    "sku": lambda p: str(p.sku),
+    "name": lambda p: str(p.name).lower(),
+    "quantity": lambda p: _to_int(p.quantity),
+    "price": lambda p: _to_float(p.price),
+}
+
+# reading rows off a sorted index beats sorting them once they are 1/8+ of the catalogue
+PRESORTED_SHARE = 8
+
 
 class ProductService:
-    def __init__(self, product_repo: ProductRepo, category_repo: CategoryRepo):
+    def __init__(self, product_repo: ProductRepo, category_repo: CategoryRepo, supplier_product_repo=None):
         self.product_repo = product_repo
         self.category_repo = category_repo
+        # optional: only needed for query_products(supplier_id=...)
+        self.supplier_product_repo = supplier_product_repo
 
     def add_new_product(self, sku, name, description, quantity, price, category=None, user=None):
         if sku == "":
@@ -42,7 +63,7 @@ class ProductService:
 
         new_product = Product(sku, name, description, quantity, price, category, active=True)
         self.product_repo.add_product(new_product)
-        self.write_audit(f"USER={user} ACTION=PRODUCT_ADD sku={sku} qty={quantity} price={price}")
+        self.write_audit(AuditMessage(user, "PRODUCT_ADD", sku=sku, qty=quantity, price=price))
 
         return "Product added successfully"
 
@@ -78,7 +99,7 @@ class ProductService:
         )
 
         if updated:
-            self.write_audit(f"USER={user} ACTION=PRODUCT_UPDATE sku={sku}")
+            self.write_audit(AuditMessage(user, "PRODUCT_UPDATE", sku=sku))
             return "Product updated successfully"
         else:
             return "Product not found"
@@ -93,7 +114,7 @@ class ProductService:
 
         removed = self.product_repo.remove_by_sku(sku)
         if removed:
-            self.write_audit(f"USER={user} ACTION=PRODUCT_REMOVE sku={sku}")
+            self.write_audit(AuditMessage(user, "PRODUCT_REMOVE", sku=sku))
             return "Product removed successfully"
         else:
             return "Product not found"
@@ -112,7 +133,7 @@ class ProductService:
 
         p.active = False
         self.product_repo.save_product(p)
-        self.write_audit(f"USER={user} ACTION=PRODUCT_DEACTIVATE sku={sku}")
+        self.write_audit(AuditMessage(user, "PRODUCT_DEACTIVATE", sku=sku))
         return "Product deactivated successfully"
 
     def reactivate_product(self, sku):
@@ -139,29 +160,78 @@ class ProductService:
         if q == "":
             return results
 
-        for p in self.product_repo.get_all_products():
+        products = None
+        search_index = search_index_for(self.product_repo)
+        if search_index is not None:
+            candidates = search_index.candidates(q)
+            if candidates is not None:
+                # only products holding every trigram of the query are checked
+                products = self.product_repo.products_for_skus(candidates)
+
+        if products is None:
+            # no index, or a 1-2 character query -> check every product
+            products = self.product_repo.get_all_products()
+
+        for p in products:
 
-            sku = str(p.sku).strip().lower()
-            name = str(p.name).strip().lower()
-            desc = str(p.description).strip().lower()
+            sku, name, desc = search_fields(p)
 
             if q in sku or q in name or q in desc:
                 results.append(p)
 
         return results
 
-    def filter_products(self, category=None, max_qty=None, sort_by=None):
-        products = self.product_repo.get_all_products()
+    def fuzzy_search_products(self, query, limit=10, min_score=0.3):
+        # Typo tolerant name search: [(product, score)] best first, score = trigram
+        # similarity (0..1) of the query to the product name.
+        q = (query or "").strip().lower()
+        if q == "" or limit <= 0:
+            return []
+
+        query_grams = word_trigrams(q)
+        if not query_grams:
+            return []
+
+        scored = []
+        fuzzy_index = fuzzy_index_for(self.product_repo)
+        if fuzzy_index is not None:
+            # dice >= min_score needs at least this many shared trigrams -> prune on the index
+            min_overlap = max(math.ceil(min_score * len(query_grams) / (2 - min_score)), 1)
+            counts = fuzzy_index.overlap_counts(query_grams, min_overlap)
+            for sku, shared in counts.items():
+                score = 2.0 * shared / (len(query_grams) + fuzzy_index.gram_count(sku))
+                if score >= min_score:
+                    scored.append((score, -self.product_repo.catalogue_key(sku), sku))
+
+            best = heapq.nlargest(limit, scored)
+            return [(self.product_repo.find_by_sku(sku), round(score, 3)) for score, _position, sku in best]
+
+        for position, p in enumerate(self.product_repo.get_all_products()):
+            score = 0.0
+            for field in fuzzy_fields(p):
+                score = max(score, dice(query_grams, word_trigrams(field)))
+            if score > 0 and score >= min_score:
+                scored.append((score, -position, p))
+
+        best = heapq.nlargest(limit, scored, key=lambda row: row[:2])
+        return [(p, round(score, 3)) for score, _position, p in best]
+
+    def filter_products(self, category=None, max_qty=None, sort_by=None, min_price=None, max_price=None):
+        indexes = indexes_for(self.product_repo)
         results = []
 
         # Filter by category
         if category and category.strip() != "":
-            cat = category.strip().lower()
-            for p in products:
-                if p.category is not None and p.category.strip().lower() == cat:
-                    results.append(p)
+            if indexes is not None:
+                # category index -> only the matching products are touched
+                results = self.product_repo.products_for_skus(indexes.category_skus(category))
+            else:
+                cat = category.strip().lower()
+                for p in self.product_repo.get_all_products():
+                    if p.category is not None and p.category.strip().lower() == cat:
+                        results.append(p)
         else:
-            results = list(products)
+            results = list(self.product_repo.get_all_products())
 
         # Filter by max quantity
         if max_qty is not None and str(max_qty).strip() != "":
@@ -171,7 +241,27 @@ class ProductService:
             except:
                 pass
 
-        # Sort
+        # Filter by price range (inclusive)
+        if min_price is not None and str(min_price).strip() != "":
+            try:
+                min_price = float(min_price)
+                results = [p for p in results if float(p.price) >= min_price]
+            except:
+                pass
+
+        if max_price is not None and str(max_price).strip() != "":
+            try:
+                max_price = float(max_price)
+                results = [p for p in results if float(p.price) <= max_price]
+            except:
+                pass
+
+        # Sort (from the maintained sorted index when that beats sorting)
+        if sort_by in ("name", "quantity", "price"):
+            ordered = self._presorted(results, sort_by)
+            if ordered is not None:
+                return ordered
+
         if sort_by == "name":
             results.sort(key=lambda p: str(p.name).lower())
         elif sort_by == "quantity":
@@ -181,6 +271,224 @@ class ProductService:
 
         return results
 
+    def query_products(self, category=None, active=None, min_qty=None, max_qty=None,
+                       min_price=None, max_price=None, supplier_id=None, text=None,
+                       order_by=None, descending=False, limit=None, offset=0):
+        # Combined filters (all optional, ANDed together), then ordering + paging.
+        # Starts from the most selective index available instead of the whole catalogue.
+        criteria = self._query_criteria(category, active, min_qty, max_qty, min_price, max_price,
+                                        supplier_id, text)
+
+        if order_by is not None and order_by not in ORDER_KEYS:
+            raise ValueError("order_by must be one of: " + ", ".join(ORDER_KEYS))
+        try:
+            offset = int(offset or 0)
+            limit = None if limit is None else int(limit)
+        except (TypeError, ValueError):
+            raise ValueError("Limit and offset must be whole numbers")
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("Limit and offset cannot be negative")
+
+        _source, estimate, fetch = self._plan_query(criteria)
+        end = None if limit is None else offset + limit
+
+        if order_by is not None and estimate * PRESORTED_SHARE >= len(self.product_repo.get_all_products()):
+            # most of the catalogue is in play -> walk the order index, stop once the page is full
+            index = self._order_index(order_by)
+            if index is not None:
+                walk = self._walk_index(index, descending, lambda p: self._query_matches(p, criteria))
+                return list(itertools.islice(walk, offset, end))
+
+        if fetch is None:
+            products = self.product_repo.get_all_products()
+        else:
+            products = self.product_repo.products_for_skus(fetch())
+
+        matches = (p for p in products if self._query_matches(p, criteria))
+
+        if order_by is None:
+            # catalogue order -> stop as soon as the page is full
+            return list(itertools.islice(matches, offset, end))
+
+        key = ORDER_KEYS[order_by]
+        if limit is None:
+            ordered = sorted(matches, key=key, reverse=descending)
+        elif descending:
+            # heap top-k: O(n log k) instead of sorting everything
+            ordered = heapq.nlargest(offset + limit, matches, key=key)
+        else:
+            ordered = heapq.nsmallest(offset + limit, matches, key=key)
+        return ordered[offset:]
+
+    def _order_index(self, order_by):
+        # maintained SortedIndex for an ORDER_KEYS name, or None when it doesn't cover
+        # every product (no index support, duplicate SKUs, unparseable numbers)
+        index = sorted_index_for(self.product_repo, order_by)
+        if index is None or len(index) != len(self.product_repo.get_all_products()):
+            return None
+        return index
+
+    def _walk_index(self, index, descending, keep):
+        # products passing keep(p) in index order; equal keys come out in catalogue
+        # order, exactly like a stable sort of the catalogue would give them
+        find = self.product_repo.find_by_sku
+        catalogue_key = self.product_repo.catalogue_key
+        run = []
+        run_key = None
+        for key, sku in index.items(descending):
+            if run and key != run_key:
+                run.sort(key=catalogue_key)
+                for run_sku in run:
+                    yield find(run_sku)
+                run = []
+            run_key = key
+            if keep(find(sku)):
+                run.append(sku)
+
+        run.sort(key=catalogue_key)
+        for run_sku in run:
+            yield find(run_sku)
+
+    def _presorted(self, products, order_by):
+        # products in order_by order read off the sorted index, or None if sorting is the better deal
+        index = self._order_index(order_by)
+        if index is None or len(products) * PRESORTED_SHARE < len(index):
+            return None
+
+        wanted = {p.sku: p for p in products}
+        if len(wanted) != len(products):
+            return None
+
+        ordered = list(self._walk_index(index, False, lambda p: wanted.get(p.sku) is p))
+        if len(ordered) != len(products):
+            return None
+        return ordered
+
+    def explain_query(self, **filters):
+        # which index query_products would start from, and how many rows it expects to check
+        criteria = self._query_criteria(**filters)
+        source, estimate, _fetch = self._plan_query(criteria)
+        return {"index": source, "estimated_rows": estimate}
+
+    def _query_criteria(self, category=None, active=None, min_qty=None, max_qty=None,
+                        min_price=None, max_price=None, supplier_id=None, text=None):
+        criteria = {}
+
+        if category is not None and str(category).strip() != "":
+            criteria["category"] = str(category).strip().lower()
+
+        if active is not None:
+            criteria["active"] = bool(active)
+
+        try:
+            min_qty = None if min_qty is None or str(min_qty).strip() == "" else int(min_qty)
+            max_qty = None if max_qty is None or str(max_qty).strip() == "" else int(max_qty)
+        except ValueError:
+            raise ValueError("Quantity range must be whole numbers")
+        if min_qty is not None or max_qty is not None:
+            criteria["qty"] = (min_qty, max_qty)
+
+        try:
+            min_price = None if min_price is None or str(min_price).strip() == "" else float(min_price)
+            max_price = None if max_price is None or str(max_price).strip() == "" else float(max_price)
+        except ValueError:
+            raise ValueError("Price range must be numbers")
+        if min_price is not None or max_price is not None:
+            criteria["price"] = (min_price, max_price)
+
+        if supplier_id is not None and str(supplier_id).strip() != "":
+            if self.supplier_product_repo is None:
+                raise ValueError("Supplier filter needs supplier product links")
+            skus = self.supplier_product_repo.get_products_for_supplier(str(supplier_id).strip())
+            criteria["supplier_skus"] = set(skus)
+
+        if text is not None and str(text).strip() != "":
+            criteria["text"] = str(text).strip().lower()
+
+        return criteria
+
+    def _plan_query(self, criteria):
+        # (index name, estimated rows, fetch() -> candidate SKUs); fetch None = full scan.
+        # Every candidate is still checked against all criteria, so any index is safe to start from.
+        options = []
+
+        indexes = indexes_for(self.product_repo)
+        if indexes is not None:
+            if "supplier_skus" in criteria:
+                skus = criteria["supplier_skus"]
+                # each fetch binds its own set (skus is reassigned below)
+                options.append(("supplier", len(skus), lambda skus=skus: skus))
+
+            if "category" in criteria:
+                skus = indexes.category_skus(criteria["category"])
+                options.append(("category", len(skus), lambda skus=skus: skus))
+
+            if "active" in criteria:
+                skus = indexes.active_skus() if criteria["active"] else indexes.inactive_skus()
+                options.append(("active", len(skus), lambda skus=skus: skus))
+
+            if "qty" in criteria:
+                # ACTIVE-only queries can use the smaller active quantity index
+                name = "active_quantity" if criteria.get("active") is True else "quantity"
+                qty_index = sorted_index_for(self.product_repo, name)
+                low, high = criteria["qty"]
+                options.append((name, qty_index.count_range(low, high),
+                                lambda: qty_index.range(low, high)))
+
+            if "price" in criteria:
+                price_index = sorted_index_for(self.product_repo, "price")
+                low_price, high_price = criteria["price"]
+                options.append(("price", price_index.count_range(low_price, high_price),
+                                lambda: price_index.range(low_price, high_price)))
+
+            if "text" in criteria:
+                search_index = search_index_for(self.product_repo)
+                estimate = search_index.estimate(criteria["text"])
+                if estimate is not None:
+                    options.append(("text", estimate, lambda: search_index.candidates(criteria["text"])))
+
+        if not options:
+            return "full_scan", len(self.product_repo.get_all_products()), None
+
+        return min(options, key=lambda option: option[1])
+
+    def _query_matches(self, p, criteria):
+        if "category" in criteria:
+            if p.category is None or str(p.category).strip().lower() != criteria["category"]:
+                return False
+
+        if "active" in criteria and (getattr(p, "active", True) is not False) != criteria["active"]:
+            return False
+
+        if "qty" in criteria:
+            try:
+                qty = int(p.quantity)
+            except (TypeError, ValueError):
+                return False
+            low, high = criteria["qty"]
+            if (low is not None and qty < low) or (high is not None and qty > high):
+                return False
+
+        if "price" in criteria:
+            try:
+                price = float(p.price)
+            except (TypeError, ValueError):
+                return False
+            low, high = criteria["price"]
+            if (low is not None and price < low) or (high is not None and price > high):
+                return False
+
+        if "supplier_skus" in criteria and p.sku not in criteria["supplier_skus"]:
+            return False
+
+        if "text" in criteria:
+            q = criteria["text"]
+            sku, name, desc = search_fields(p)
+            if q not in sku and q not in name and q not in desc:
+                return False
+
+        return True
+
     def update_product_description(self, sku, description):
         if sku is None or sku.strip() == "":
             raise ValueError("SKU cannot be empty")
@@ -241,6 +549,11 @@ class ProductService:
         if threshold < 0:
             return None
 
+        quantity_index = sorted_index_for(self.product_repo, "active_quantity")
+        if quantity_index is not None:
+            # ACTIVE products sorted by qty -> only the k matches are touched (catalogue order kept)
+            return self.product_repo.products_for_skus(quantity_index.range(high=threshold))
+
         for p in self.product_repo.get_all_products():
             # NEW: ignore inactive for alerts
             if getattr(p, "active", True) is False:
@@ -258,16 +571,45 @@ class ProductService:
 
         return low_stock
 
+    def get_lowest_stock_products(self, count):
+        # the `count` ACTIVE products with the least stock, lowest first (ties by SKU)
+        try:
+            count = int(count)
+        except:
+            return None
+
+        if count < 0:
+            return None
+
+        quantity_index = sorted_index_for(self.product_repo, "active_quantity")
+        if quantity_index is not None:
+            return [self.product_repo.find_by_sku(sku) for sku in quantity_index.smallest(count)]
+
+        rows = []
+        for p in self.product_repo.get_all_products():
+            if getattr(p, "active", True) is False:
+                continue
+            try:
+                rows.append((int(p.quantity), str(p.sku), p))
+            except:
+                continue  # skip broken data
+
+        return [p for _qty, _sku, p in heapq.nsmallest(count, rows, key=lambda row: row[:2])]
+
     def get_dashboard_summary(self, threshold=5):
-        products = self.product_repo.get_all_products()
+        columns = columns_for(self.product_repo)
+        if columns is not None:
+            # packed int64 column -> no per-product attribute lookups or int() calls
+            quantities = columns.quantities
+        else:
+            quantities = [int(p.quantity) for p in self.product_repo.get_all_products()]
 
-        total_products = len(products)
+        total_products = len(quantities)
         total_units = 0
         low_stock_count = 0
         out_of_stock_count = 0
 
-        for p in products:
-            qty = int(p.quantity)
+        for qty in quantities:
             total_units += qty
 
             if qty == 0:
@@ -275,32 +617,7 @@ class ProductService:
             elif qty < threshold:
                 low_stock_count += 1
 
-        if out_of_stock_count > 0:
-            system_status = "CRITICAL"
-        elif low_stock_count >= 3:
-            system_status = "WARNING"
-        else:
-            system_status = "HEALTHY"
-
-        if total_products > 0:
-            low_stock_percent = round((low_stock_count / total_products) * 100, 1)
-            out_of_stock_percent = round((out_of_stock_count / total_products) * 100, 1)
-        else:
-            low_stock_percent = 0
-            out_of_stock_percent = 0
-
-        return {
-            "total_products": total_products,
-            "total_units": total_units,
-            "low_stock_count": low_stock_count,
-            "out_of_stock_count": out_of_stock_count,
-            "threshold": threshold,
-            "system_status": system_status,
-            "low_stock_percent": low_stock_percent,
-            "out_of_stock_percent": out_of_stock_percent,
-
-
-        }
+        return build_summary(total_products, total_units, low_stock_count, out_of_stock_count, threshold)
 
     def estimate_restock_cost_for_sku(self, sku, target_stock_level):
         sku = (sku or "").strip()
@@ -365,9 +682,7 @@ class ProductService:
         return breakdown, total_cost, errors
 
     def write_audit(self, message):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(AUDIT_FILE, "a") as f:
-            f.write(f"{timestamp} - {message}\n")
+        write_audit(AUDIT_FILE, message)
 
 
 
@@ -1,15 +1,25 @@
 import uuid
 from datetime import datetime, date
 from model.purchase_order import PurchaseOrder, PurchaseOrderLine, POStatus
-from Repo.purchase_order_repo import PurchaseOrderRepo
 from Repo.product_repo import ProductRepo
+from Repo.purchase_order_repo import PurchaseOrderRepo
+from Repo.repo_registry import installed_registry
+from Service.audit_record import AuditMessage
+from Service.audit_sink import write_audit
 
 AUDIT_FILE = "src/data/audit_log.txt"
 
 class PurchaseOrderService:
-    def __init__(self):
-        self.repo = PurchaseOrderRepo()
-        self.product_repo = ProductRepo("src/data/products.txt")
+    def __init__(self, product_repo=None, repo=None):
+        # shared repos from the app's registry unless given (same catalogue StockService changes);
+        # with no registry installed, plain repos of our own
+        registry = installed_registry()
+        if repo is None:
+            repo = registry.purchase_order_repo() if registry is not None else PurchaseOrderRepo()
+        if product_repo is None:
+            product_repo = registry.product_repo() if registry is not None else ProductRepo("src/data/products.txt")
+        self.repo = repo
+        self.product_repo = product_repo
 
     def validate_date(self, date_string):
         try:
@@ -126,9 +136,8 @@ class PurchaseOrderService:
 
             if total_cost > budget:
                 print("Purchase order blocked: estimated cost exceeds the monthly budget.")
-                self.write_audit(
-                    f"PO BLOCKED (over budget) - User: {user}, Cost: £{total_cost:.2f}, Budget: £{budget:.2f}"
-                )
+                self.write_audit(AuditMessage(user, "PO_BLOCKED", "PO BLOCKED (over budget)",
+                                              cost=round(total_cost, 2), budget=round(budget, 2)))
                 return
 
         po_id = "PO" + datetime.now().strftime("%Y%m%d%H%M%S")
@@ -141,7 +150,7 @@ class PurchaseOrderService:
         self.repo.save_purchase_order(po, line_objects)
         self._add_to_budget_spent(budget_service, total_cost)
         self._print_budget_after_purchase(budget_service)
-        self.write_audit(f"PO {po_id}, created by {user} (Cost: £{total_cost:.2f})")
+        self.write_audit(AuditMessage(user, "PO_CREATE", f"PO {po_id} created by {user}", po=po_id, cost=round(total_cost, 2)))
         print(f"Purchase order {po_id} created successfully")
 
     def get_purchase_orders(self):
@@ -179,13 +188,11 @@ class PurchaseOrderService:
         if not updated:
             return "Purchase Order not updated"
 
-        self.write_audit(f"Purchase order {po_id} updated successfully by {user}")
+        self.write_audit(AuditMessage(user, "PO_STATUS", po=po_id, status=status))
         return f"Purchase order {po_id} updated successfully"
 
     def write_audit(self, message):
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        with open(AUDIT_FILE, "a", encoding="utf-8") as file:
-            file.write(f"{timestamp} {message}\n")
+        write_audit(AUDIT_FILE, message)
 
     def _add_to_budget_spent(self, budget_service, amount):
         if budget_service is None:
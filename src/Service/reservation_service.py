@@ -2,7 +2,10 @@ import uuid
 from datetime import datetime
 
 from model.reservation import Reservation
+from Repo.repo_registry import installed_registry
 from Repo.reservation_repo import ReservationRepo
+from Service.audit_record import AuditMessage
+from Service.audit_sink import write_audit
 
 
 AUDIT_FILE = "src/data/audit_log.txt"
@@ -10,14 +13,15 @@ AUDIT_FILE = "src/data/audit_log.txt"
 
 class ReservationService:
 
-    def __init__(self, product_repo):
+    def __init__(self, product_repo, reservation_repo=None):
         self.product_repo = product_repo
-        self.reservation_repo = ReservationRepo()
+        if reservation_repo is None:
+            registry = installed_registry()
+            reservation_repo = registry.reservation_repo() if registry is not None else ReservationRepo()
+        self.reservation_repo = reservation_repo
 
     def write_audit(self, message):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(AUDIT_FILE, "a") as file:
-            file.write(f"{timestamp} - {message}\n")
+        write_audit(AUDIT_FILE, message)
 
     def get_available_quantity(self, sku):
         on_hand = self.product_repo.get_product_quantity(sku)
@@ -65,16 +69,14 @@ class ReservationService:
         )
 
         self.reservation_repo.save_reservation(reservation)
-        self.write_audit(
-            f"Reservation {reservation_id} created by {user.username} "
-            f"order={order_id} sku={sku} qty={quantity}"
-        )
+        self.write_audit(AuditMessage(user.username, "RESERVATION_CREATE", reservation=reservation_id,
+                                      order=order_id, sku=sku, qty=quantity))
 
         print(f"Reservation successful. ID: {reservation_id}")
 
     def cancel_reservation(self, reservation_id, user):
         if self.reservation_repo.cancel_reservation(reservation_id):
-            self.write_audit(f"Reservation {reservation_id} cancelled by {user.username}")
+            self.write_audit(AuditMessage(user.username, "RESERVATION_CANCEL", reservation=reservation_id))
             print("Reservation cancelled and stock released")
         else:
             print("Reservation not found or already cancelled")
@@ -1,5 +1,6 @@
 from Repo.product_repo import ProductRepo
-from datetime import datetime
+from Service.audit_record import AuditMessage
+from Service.audit_sink import write_audit, write_audit_messages
 
 AUDIT_FILE = "src/data/audit_log.txt"
 
@@ -8,10 +9,11 @@ class StockService:
     def __init__(self, product_repo: ProductRepo):
         self.product_repo = product_repo
 
-    def write_audit(self,message):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(AUDIT_FILE, "a") as f:
-            f.write(f"{timestamp} - {message}\n")
+    def write_audit(self, message):
+        write_audit(AUDIT_FILE, message)
+
+    def write_audit_lines(self, messages):
+        write_audit_messages(AUDIT_FILE, messages)
 
 
     def record_stock_increase(self, sku, amount,user=None):
@@ -26,8 +28,8 @@ class StockService:
             raise ValueError("This product is INACTIVE and cannot be used in stock operations.")
 
         product.quantity += amount
-        self.product_repo.save_products()
-        self.write_audit(f"USER={user} ACTION=STOCK_DECREASE sku={sku} amount={amount} new_qty={product.quantity}")
+        self.product_repo.save_product(product)
+        self.write_audit(AuditMessage(user, "STOCK_DECREASE", sku=sku, amount=amount, new_qty=product.quantity))
         return product.quantity
 
     def record_stock_decrease(self, sku, amount,user=None):
@@ -45,6 +47,68 @@ class StockService:
             raise ValueError("Insufficient stock")
 
         product.quantity -= amount
-        self.product_repo.save_products()
-        self.write_audit(f"USER={user} ACTION=STOCK_DECREASE sku={sku} amount={amount} new_qty={product.quantity}")
+        self.product_repo.save_product(product)
+        self.write_audit(AuditMessage(user, "STOCK_DECREASE", sku=sku, amount=amount, new_qty=product.quantity))
         return product.quantity
+
+    def apply_adjustments(self, adjustments, user=None):
+        # Bulk stock movements: every (sku, delta) line is checked against the quantity the
+        # earlier lines leave behind, valid lines are applied in memory, then the catalogue
+        # is saved once and the audit records go out in a single write.
+        results, new_quantities = self._check_adjustments(adjustments)
+        if len(new_quantities) == 0:
+            return results
+
+        with self.product_repo.batch():
+            for sku in new_quantities:
+                product = self.product_repo.find_by_sku(sku)
+                product.quantity = new_quantities[sku]
+                self.product_repo.save_product(product)
+
+        messages = []
+        for result in results:
+            if not result["ok"]:
+                continue
+            action = "STOCK_INCREASE" if result["delta"] > 0 else "STOCK_DECREASE"
+            messages.append(AuditMessage(user, action, sku=result["sku"], amount=abs(result["delta"]),
+                                         new_qty=result["new_qty"]))
+        self.write_audit_lines(messages)
+
+        return results
+
+    def check_adjustments(self, adjustments):
+        # what apply_adjustments would do with these lines right now, without applying them
+        return self._check_adjustments(adjustments)[0]
+
+    def _check_adjustments(self, adjustments):
+        # (one result per line, sku -> quantity after the accepted lines)
+        results = []
+        new_quantities = {}  # sku -> quantity after the lines accepted so far
+
+        for sku, delta in adjustments:
+            result = {"sku": sku, "delta": delta, "ok": False, "new_qty": None, "error": None}
+            results.append(result)
+
+            if isinstance(delta, bool) or not isinstance(delta, int) or delta == 0:
+                result["error"] = "Adjustment must be a non-zero whole number"
+                continue
+
+            product = self.product_repo.find_by_sku(sku)
+            if product is None:
+                result["error"] = "Invalid SKU"
+                continue
+
+            if getattr(product, "active", True) is False:
+                result["error"] = "This product is INACTIVE and cannot be used in stock operations."
+                continue
+
+            current = new_quantities.get(sku, product.quantity)
+            if current + delta < 0:
+                result["error"] = "Insufficient stock"
+                continue
+
+            new_quantities[sku] = current + delta
+            result["ok"] = True
+            result["new_qty"] = current + delta
+
+        return results, new_quantities
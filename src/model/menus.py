@@ -23,6 +23,7 @@ class Menus:
         print("1) View all products")
         print("2) Search products")
         print("3) Filter products")
+        print("11) Advanced search")
         print("8) View favourite products")
         print("0) Back")
         if current_user and current_user.is_manager():
@@ -39,6 +40,7 @@ class Menus:
         print("\n------------[ STOCK ]-----------")
         print("1) Record stock increase")
         print("2) Record stock decrease")
+        print("3) Apply bulk adjustments from file")
         print("0) Back")
         return input("Choose an option: ").strip()
 
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import Service.stock_service as stock_service_module
+from Service.audit_record import parse_audit_line, record_message
+from Service.stock_service import StockService
+from Repo.product_repo import ProductRepo
+from model.product import Product
+
+
+class TestStockBulkAdjustCP(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.audit_file = os.path.join(self.tmpdir.name, "audit.txt")
+        self.old_audit = stock_service_module.AUDIT_FILE
+        stock_service_module.AUDIT_FILE = self.audit_file
+
+        self.repo = ProductRepo(os.path.join(self.tmpdir.name, "products.txt"))
+        self.repo.add_product(Product("SKU1", "P1", "D", 10, 1.0, "C"))
+        self.repo.add_product(Product("SKU2", "P2", "D", 3, 1.0, "C"))
+        self.repo.add_product(Product("OFF", "P3", "D", 5, 1.0, "C", active=False))
+        self.service = StockService(self.repo)
+
+    def tearDown(self):
+        stock_service_module.AUDIT_FILE = self.old_audit
+        self.tmpdir.cleanup()
+
+    def _audit_lines(self):
+        # JSON records, read back as "USER=.. ACTION=.. key=value" messages
+        with open(self.audit_file) as f:
+            return [record_message(parse_audit_line(line)) for line in f.read().splitlines()]
+
+    def test_all_valid(self):
+        results = self.service.apply_adjustments([("SKU1", 5), ("SKU2", -3)], user="td169")
+        self.assertEqual([15, 0], [r["new_qty"] for r in results])
+        self.assertTrue(all(r["ok"] for r in results))
+        self.assertEqual(15, ProductRepo(self.repo.filename).get_product_quantity("SKU1"))
+
+        lines = self._audit_lines()
+        self.assertEqual(2, len(lines))
+        self.assertIn("ACTION=STOCK_INCREASE sku=SKU1 amount=5 new_qty=15", lines[0])
+        self.assertIn("ACTION=STOCK_DECREASE sku=SKU2 amount=3 new_qty=0", lines[1])
+
+    def test_audit_fields_typed(self):
+        self.service.apply_adjustments([("SKU1", -4)])
+        with open(self.audit_file) as f:
+            record = parse_audit_line(f.readline())
+        self.assertIsNone(record["user"])   # no user is null, not "None"
+        self.assertEqual({"sku": "SKU1", "amount": 4, "new_qty": 6}, record["attrs"])
+
+    def test_invalid_lines_reported_per_line(self):
+        results = self.service.apply_adjustments([
+            ("NOPE", 1),
+            ("OFF", 1),
+            ("SKU2", -4),
+            ("SKU1", 0),
+            ("SKU1", "7"),
+            ("SKU1", 2),
+        ])
+        self.assertEqual(
+            ["Invalid SKU",
+             "This product is INACTIVE and cannot be used in stock operations.",
+             "Insufficient stock",
+             "Adjustment must be a non-zero whole number",
+             "Adjustment must be a non-zero whole number",
+             None],
+            [r["error"] for r in results],
+        )
+        self.assertEqual(12, self.repo.get_product_quantity("SKU1"))
+        self.assertEqual(3, self.repo.get_product_quantity("SKU2"))
+        self.assertEqual(1, len(self._audit_lines()))
+
+    def test_running_quantity_across_lines(self):
+        # second decrease sees the stock left by the first one
+        results = self.service.apply_adjustments([("SKU2", -2), ("SKU2", -2), ("SKU2", 4), ("SKU2", -5)])
+        self.assertEqual([True, False, True, True], [r["ok"] for r in results])
+        self.assertEqual(0, self.repo.get_product_quantity("SKU2"))
+
+    def test_nothing_valid_writes_nothing(self):
+        results = self.service.apply_adjustments([("NOPE", 1)])
+        self.assertFalse(results[0]["ok"])
+        self.assertFalse(os.path.exists(self.audit_file))
+
+    def test_check_matches_apply_without_changing_anything(self):
+        adjustments = [("SKU2", -2), ("SKU2", -2), ("NOPE", 1), ("SKU1", -10)]
+        checked = self.service.check_adjustments(adjustments)
+        self.assertEqual(3, self.repo.get_product_quantity("SKU2"))
+        self.assertFalse(os.path.exists(self.audit_file))
+        self.assertEqual(checked, self.service.apply_adjustments(adjustments))
+
+    def test_persists_once(self):
+        adjustments = [("SKU1", 1)] * 200
+        with patch.object(self.repo, "_write_snapshot", wraps=self.repo._write_snapshot) as write:
+            self.service.apply_adjustments(adjustments)
+        self.assertEqual(1, write.call_count)
+        self.assertEqual(210, self.repo.get_product_quantity("SKU1"))
+        self.assertEqual(200, len(self._audit_lines()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Black-box RANDOM testing: the NumPy dashboard path must give the same answers as the
+plain Python loops on the same catalogue.
+
+- fixed seed so results are repeatable
+- catalogues include 0 / negative quantities, blank categories and inactive products
+- the NumPy half is skipped when NumPy isn't installed
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+import Service.dashboard_chart_service as dashboard_module
+from Service.dashboard_chart_service import DashboardChartService
+
+
+class TestRandom_DashboardNumpyMatchesLoops(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.rng = random.Random(6)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _random_repo(self, n):
+        repo = ProductRepo(os.path.join(self.tmpdir.name, f"products_{n}.txt"))
+        products = []
+        for i in range(n):
+            products.append(Product(
+                f"SKU{i}", "N", "D",
+                self.rng.choice([0, 0, -1, self.rng.randint(1, 40)]),
+                round(self.rng.uniform(0, 30), 2),
+                self.rng.choice([None, "", " Food ", "Food", "Drinks", "Uncategorised"]),
+                self.rng.random() > 0.2,
+            ))
+        repo.products = products
+        return repo
+
+    def _all_stats(self, svc, threshold):
+        return (
+            svc.get_inventory_status_counts(threshold),
+            svc.get_stock_bucket_counts(),
+            svc.get_category_counts(),
+        )
+
+    def test_columns_path_matches_product_loops(self):
+        for n in [0, 1, 50, 400]:
+            repo = self._random_repo(n)
+            packed = DashboardChartService(repo, use_numpy=False, use_counters=False)
+
+            # a plain list of products forces the original per-Product loops
+            class PlainRepo:
+                def get_all_products(self):
+                    return repo.get_all_products()
+
+            plain = DashboardChartService(PlainRepo())
+            for threshold in [0, 3, 5, 25]:
+                self.assertEqual(self._all_stats(plain, threshold), self._all_stats(packed, threshold))
+            self.assertAlmostEqual(plain.get_total_stock_value(), packed.get_total_stock_value())
+
+    @unittest.skipIf(dashboard_module.np is None, "NumPy not installed")
+    def test_numpy_path_matches_python_path(self):
+        for n in [0, 1, 50, 400]:
+            repo = self._random_repo(n)
+            fast = DashboardChartService(repo, use_numpy=True, use_counters=False)
+            slow = DashboardChartService(repo, use_numpy=False, use_counters=False)
+            self.assertIsNotNone(fast._numpy_columns())
+
+            for threshold in [-1, 0, 3, 5, 25]:
+                self.assertEqual(self._all_stats(slow, threshold), self._all_stats(fast, threshold))
+
+            for active_only in [False, True]:
+                self.assertAlmostEqual(slow.get_total_stock_value(active_only),
+                                       fast.get_total_stock_value(active_only))
+
+            # still identical after incremental changes to the columns
+            repo.add_product(Product("NEW", "N", "D", 0, 1.0, "Toys", True))
+            if n > 0:
+                repo.remove_by_sku("SKU0")
+            self.assertEqual(self._all_stats(slow, 5), self._all_stats(fast, 5))
+
+    def test_numpy_missing_falls_back(self):
+        repo = self._random_repo(20)
+        original = dashboard_module.np
+        dashboard_module.np = None
+        try:
+            svc = DashboardChartService(repo, use_counters=False)
+            self.assertIsNone(svc._numpy_columns())
+            self.assertEqual(self._all_stats(DashboardChartService(repo, use_numpy=False, use_counters=False), 5),
+                             self._all_stats(svc, 5))
+        finally:
+            dashboard_module.np = original
+
+
+if __name__ == "__main__":
+    unittest.main()
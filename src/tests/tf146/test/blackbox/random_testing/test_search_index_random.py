@@ -0,0 +1,81 @@
+"""
+Black-box RANDOM testing: search_products through the trigram index must return exactly
+what the old full scan returns (same products, same order).
+
+- fixed seed so results are repeatable
+- small alphabet so many queries hit, many only partly match across fields
+- queries of length 1..5 (short ones take the scan path), mixed case + padding
+- the catalogue is changed between queries (add / update / remove / in-place + save)
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+from Service.product_service import ProductService
+
+
+class _PlainRepo:
+    def __init__(self, repo):
+        self.repo = repo
+
+    def get_all_products(self):
+        return self.repo.get_all_products()
+
+
+class TestRandom_SearchIndexMatchesScan(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.rng = random.Random(12)
+        self.repo = ProductRepo(os.path.join(self.tmpdir.name, "products.txt"))
+        self.repo.products = [self._random_product(i) for i in range(150)]
+        self.indexed = ProductService(self.repo, None)
+        self.scan = ProductService(_PlainRepo(self.repo), None)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _text(self, low, high):
+        return "".join(self.rng.choice("abcAB ") for _ in range(self.rng.randint(low, high)))
+
+    def _random_product(self, i):
+        return Product(f"S{i}{self._text(0, 2)}", self._text(0, 8), self._text(0, 12),
+                       1, 1.0, None, True)
+
+    def _check_queries(self):
+        for _ in range(40):
+            query = " " + self._text(1, 5) + " "
+            self.assertEqual([p.sku for p in self.indexed.search_products(query)],
+                             [p.sku for p in self.scan.search_products(query)], query)
+
+    def test_fresh_catalogue(self):
+        self._check_queries()
+
+    def test_after_changes(self):
+        for step in range(60):
+            op = self.rng.choice(["add", "update", "remove", "save"])
+            sku = self.rng.choice(self.repo.get_all_products()).sku
+            if op == "add":
+                self.repo.add_product(self._random_product(1000 + step))
+            elif op == "update":
+                self.repo.update_product(sku, self._text(0, 8), self._text(0, 12), 1, 1.0, None)
+            elif op == "remove":
+                self.repo.remove_by_sku(sku)
+            else:
+                self.repo.find_by_sku(sku).name = self._text(0, 8)
+                self.repo.save_products()
+            if step % 10 == 0:
+                self._check_queries()
+        self._check_queries()
+
+    def test_no_candidates(self):
+        self.assertEqual(self.indexed.search_products("zzz"), [])
+        self.assertEqual(self.repo.get_search_index().candidates("zzz"), set())
+        self.assertIsNone(self.repo.get_search_index().candidates("ab"))
+
+
+if __name__ == "__main__":
+    unittest.main()
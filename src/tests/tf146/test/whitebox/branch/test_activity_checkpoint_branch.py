@@ -0,0 +1,202 @@
+# File: src/tests/tf146/test/whitebox/branch/test_activity_checkpoint_branch.py
+#
+# White-Box (Branch) tests for the incremental ActivityService.get_stats.
+# Branches: only appended bytes read, unfinished last line counted but not saved,
+# log truncated / rewritten / replaced / deleted -> read from the start, checkpoint
+# saved and resumed, checkpoint missing / corrupt / other version / no checkpoint,
+# checkpoint rewritten at most every checkpoint_interval, minutes inside vs outside the
+# window, the minute the window starts in re-read to the second, minutes older than the
+# longest window dropped, longer windows read the whole log, lines out of time order.
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import Service.activity_service as activity_module
+from Service.activity_service import ActivityService
+from Service.audit_record import audit_line, audit_record
+
+
+def legacy(ts, message):
+    return f"{ts.strftime('%Y-%m-%d %H:%M:%S')} - {message}\n"
+
+
+class TestBranch_ActivityCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.tmpdir.name, "audit_log.txt")
+        self.checkpoint = os.path.join(self.tmpdir.name, "audit_log.checkpoint")
+        self.now = datetime.now()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _append(self, text):
+        with open(self.log, "a") as f:
+            f.write(text)
+
+    def _users(self, service, hours=24):
+        return dict(service.get_stats(hours=hours)["total_by_user"])
+
+    def test_only_new_bytes_are_parsed(self):
+        self._append(legacy(self.now, "USER=a ACTION=LOGIN SUCCESS"))
+        service = ActivityService(self.log)
+        self.assertEqual(self._users(service), {"a": 1})
+
+        self._append(audit_line("USER=b ACTION=LOGIN FAIL") + "\n")
+        parsed = []
+        real_parse = activity_module.parse_audit_line
+        with mock.patch.object(activity_module, "parse_audit_line",
+                               side_effect=lambda line: parsed.append(line) or real_parse(line)):
+            stats = service.get_stats(hours=24)
+            self.assertEqual(dict(stats["total_by_user"]), {"a": 1, "b": 1})
+            self.assertEqual(dict(stats["failed_logins_by_user"]), {"b": 1})
+            self.assertEqual(len([line for line in parsed if line]), 1)
+
+            parsed.clear()
+            service.get_stats(hours=1)  # nothing appended: nothing parsed
+            self.assertEqual([line for line in parsed if line], [])
+
+    def test_unfinished_line_counted_until_completed(self):
+        self._append(legacy(self.now, "USER=a ACTION=LOGIN SUCCESS"))
+        line = audit_line("USER=b ACTION=LOGOUT")
+        self._append(line)  # no "\n" yet
+        service = ActivityService(self.log, self.checkpoint)
+        self.assertEqual(self._users(service), {"a": 1, "b": 1})
+        self.assertEqual(service._offset, os.path.getsize(self.log) - len(line))
+
+        self._append("\n")
+        self.assertEqual(self._users(service), {"a": 1, "b": 1})
+        self.assertEqual(service._offset, os.path.getsize(self.log))
+
+    def test_rewritten_log_read_from_start(self):
+        self._append(legacy(self.now, "USER=a ACTION=LOGIN SUCCESS") * 2)
+        service = ActivityService(self.log)
+        self.assertEqual(self._users(service), {"a": 2})
+
+        with open(self.log, "w") as f:  # same inode, longer, different start
+            f.write(legacy(self.now, "USER=z ACTION=LOGIN SUCCESS") * 3)
+        self.assertEqual(self._users(service), {"z": 3})
+
+        with open(self.log, "w") as f:  # truncated
+            f.write(legacy(self.now, "USER=y ACTION=LOGIN SUCCESS"))
+        self.assertEqual(self._users(service), {"y": 1})
+
+        other = self.log + ".new"
+        with open(other, "w") as f:
+            f.write(legacy(self.now, "USER=y ACTION=LOGIN SUCCESS") + legacy(self.now, "USER=x ACTION=X Y"))
+        os.replace(other, self.log)  # rotated: new inode
+        self.assertEqual(self._users(service), {"y": 1, "x": 1})
+
+        os.remove(self.log)
+        self.assertEqual(self._users(service), {})
+        self.assertEqual(service._offset, 0)
+
+    def test_checkpoint_resumes_after_restart(self):
+        self._append(legacy(self.now, "USER=a ACTION=LOGIN FAIL"))
+        self.assertEqual(self._users(ActivityService(self.log, self.checkpoint)), {"a": 1})
+        with open(self.checkpoint) as f:
+            saved = json.load(f)
+        self.assertEqual(saved["offset"], os.path.getsize(self.log))
+
+        self._append(legacy(self.now, "USER=b ACTION=LOGIN SUCCESS"))
+        service = ActivityService(self.log, self.checkpoint)
+        with mock.patch.object(activity_module, "parse_audit_line", wraps=activity_module.parse_audit_line) as parse:
+            stats = service.get_stats(hours=24)
+        self.assertEqual(dict(stats["total_by_user"]), {"a": 1, "b": 1})
+        self.assertEqual(dict(stats["failed_logins_by_user"]), {"a": 1})
+        self.assertEqual(len([c for c in parse.call_args_list if c.args[0]]), 1)
+
+    def test_checkpoint_for_another_log_is_ignored(self):
+        self._append(legacy(self.now, "USER=a ACTION=LOGIN SUCCESS"))
+        ActivityService(self.log, self.checkpoint).get_stats()
+        os.remove(self.log)
+        self._append(legacy(self.now, "USER=b ACTION=LOGIN SUCCESS") * 2)
+        self.assertEqual(self._users(ActivityService(self.log, self.checkpoint)), {"b": 2})
+
+    def test_unusable_checkpoints(self):
+        self._append(legacy(self.now, "USER=a ACTION=LOGIN SUCCESS"))
+        for content in ["{broken", json.dumps({"version": 99, "offset": 5}), json.dumps({"version": 1})]:
+            with open(self.checkpoint, "w") as f:
+                f.write(content)
+            self.assertEqual(self._users(ActivityService(self.log, self.checkpoint)), {"a": 1})
+
+    def test_window_sums_minutes_inside_it(self):
+        lines = [
+            json.dumps(audit_record("a", "LOGIN", text="SUCCESS", ts=(self.now - timedelta(hours=2)).timestamp())),
+            json.dumps(audit_record("a", "LOGIN", text="SUCCESS", ts=(self.now - timedelta(hours=30)).timestamp())),
+            json.dumps(audit_record("a", "LOGOUT", ts=(self.now - timedelta(days=30)).timestamp())),
+            json.dumps(audit_record("b", "LOGIN", ts=self.now.timestamp())),
+        ]
+        self._append("\n".join(lines) + "\n")
+        service = ActivityService(self.log)
+        self.assertEqual(self._users(service, hours=1), {"b": 1})
+        self.assertEqual(self._users(service, hours=24), {"a": 1, "b": 1})
+        stats = service.get_stats(hours=24 * 7)
+        self.assertEqual(dict(stats["actions_by_user"]["a"]), {"LOGIN": 2})
+        self.assertEqual(len(service._buckets), 3)  # the 30-day-old minute was never kept
+
+        # longer than the counters keep: the whole log is read instead
+        stats = service.get_stats(hours=24 * 60)
+        self.assertEqual(dict(stats["actions_by_user"]["a"]), {"LOGIN": 2, "LOGOUT": 1})
+        self.assertEqual(len(service._buckets), 3)
+
+        service = ActivityService(self.log, max_window_hours=24 * 60)
+        stats = service.get_stats(hours=24 * 60)
+        self.assertEqual(dict(stats["actions_by_user"]["a"]), {"LOGIN": 2, "LOGOUT": 1})
+        self.assertEqual(len(service._buckets), 4)
+
+    def test_old_minutes_dropped_and_keys_sorted(self):
+        old = (self.now - timedelta(hours=3)).timestamp()
+        lines = [audit_record("a", "X", ts=self.now.timestamp()),
+                 audit_record("b", "X", ts=old),  # out of time order
+                 audit_record("c", "X", ts=old - 3600 + 120)]
+        self._append("".join(json.dumps(r) + "\n" for r in lines))
+        service = ActivityService(self.log, max_window_hours=4)
+        self.assertEqual(self._users(service, hours=4), {"a": 1, "b": 1, "c": 1})
+        self.assertEqual(service._minutes, sorted(service._buckets))
+        self.assertEqual(self._users(service, hours=2), {"a": 1})
+
+        later = time.time() + 0.5 * 3600
+        with mock.patch.object(activity_module.time, "time", return_value=later):
+            service.get_stats(hours=1)
+        self.assertEqual(len(service._buckets), 2)  # c's minute is now more than 4 hours old
+        self.assertEqual(service._minutes, sorted(service._buckets))
+
+    def test_window_exact_to_the_second(self):
+        minute = (int(self.now.timestamp()) // 60 - 120) * 60   # a minute about two hours ago
+        lines = [audit_record("out", "X", ts=minute + 10), audit_record("b", "X", ts=minute + 50),
+                 audit_record("c", "X", ts=minute + 90), audit_record("out", "X", ts=minute + 29)]
+        self._append("".join(json.dumps(r) + "\n" for r in lines))
+        hours = (time.time() - (minute + 30)) / 3600   # the window starts at minute + 30 (and a bit)
+        expected = {"b": 1, "c": 1}
+        self.assertEqual(self._users(ActivityService(self.log, self.checkpoint), hours), expected)
+        self.assertEqual(self._users(ActivityService(self.log, self.checkpoint), hours), expected)  # restarted
+        self.assertEqual(self._users(ActivityService(self.log, max_window_hours=1), hours), expected)  # full read
+
+    def test_checkpoint_rewritten_at_most_every_interval(self):
+        service = ActivityService(self.log, self.checkpoint, checkpoint_interval=60)
+        clock = [1000.0]
+        with mock.patch.object(activity_module.time, "monotonic", side_effect=lambda: clock[0]):
+            self._append(legacy(self.now, "USER=a ACTION=LOGIN SUCCESS"))
+            self.assertEqual(self._users(service), {"a": 1})  # first save straight away
+            self._append(legacy(self.now, "USER=b ACTION=LOGIN SUCCESS"))
+            self.assertEqual(self._users(service), {"a": 1, "b": 1})
+            with open(self.checkpoint) as f:
+                self.assertEqual(json.load(f)["offset"], len(legacy(self.now, "USER=a ACTION=LOGIN SUCCESS")))
+
+            clock[0] += 60
+            service.get_stats()  # nothing new read, but the earlier change is still unsaved
+            with open(self.checkpoint) as f:
+                self.assertEqual(json.load(f)["offset"], os.path.getsize(self.log))
+
+        # a restart from the older checkpoint just reads the lines after it again
+        self.assertEqual(self._users(ActivityService(self.log, self.checkpoint)), {"a": 1, "b": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
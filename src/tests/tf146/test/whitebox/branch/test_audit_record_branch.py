@@ -0,0 +1,136 @@
+# File: src/tests/tf146/test/whitebox/branch/test_audit_record_branch.py
+#
+# White-Box (Branch) tests for Service.audit_record and ActivityService reading it.
+# Branches: fields kept as given (null user, typed values, spaces), legacy text messages
+# split into USER/ACTION/key=value/free-text tokens, entity found or not, JSON line valid /
+# broken / not a record, legacy "YYYY-mm-dd HH:MM:SS - msg" and "YYYYmmddHHMMSS msg" lines,
+# blank and unreadable lines; stats over a log mixing all three formats.
+
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import Service.purchase_order_service as po_service_module
+from Service.activity_service import ActivityService
+from Service.audit_record import (AuditMessage, audit_line, audit_record, parse_audit_line, parse_message,
+                                  record_message)
+from Service.purchase_order_service import PurchaseOrderService
+
+
+class TestBranch_AuditRecord(unittest.TestCase):
+    def test_fields_kept_as_given(self):
+        message = AuditMessage(None, "PO_BLOCKED", "PO BLOCKED (over budget)", cost=12.5, budget=10.0)
+        self.assertIn("PO BLOCKED", message)   # still reads as the text message
+        record = parse_audit_line(audit_line(message))
+        self.assertIsNone(record["user"])
+        self.assertEqual(record["attrs"], {"cost": 12.5, "budget": 10.0})
+        self.assertEqual(record["text"], "PO BLOCKED (over budget)")
+
+        record = parse_audit_line(audit_line(AuditMessage("ann", "RESERVATION_CREATE", order="order 7", sku="A1", qty=2)))
+        self.assertEqual(record["attrs"], {"order": "order 7", "sku": "A1", "qty": 2})
+        self.assertEqual(record["entity"], "sku:A1")
+        self.assertNotIn("text", record)
+
+    def test_record_without_attrs(self):
+        record = audit_record("ann", "LOGIN", text="SUCCESS", ts=5)
+        self.assertEqual(record, {"ts": 5, "user": "ann", "action": "LOGIN", "entity": None,
+                                  "attrs": {}, "text": "SUCCESS"})
+
+    def test_tokens_split_into_fields(self):
+        record = parse_message("USER=ann ACTION=STOCK_DECREASE sku=A1 amount=2 new_qty=3", ts=10)
+        self.assertEqual(record, {
+            "ts": 10, "user": "ann", "action": "STOCK_DECREASE", "entity": "sku:A1",
+            "attrs": {"sku": "A1", "amount": "2", "new_qty": "3"}})
+
+    def test_free_text_and_no_entity(self):
+        record = parse_message("USER=bob ACTION=LOGIN FAIL reason=bad_password =odd", ts=1)
+        self.assertIsNone(record["entity"])
+        self.assertEqual(record["text"], "FAIL =odd")
+        self.assertEqual(record["attrs"], {"reason": "bad_password"})
+        self.assertEqual(record_message(record), "USER=bob ACTION=LOGIN reason=bad_password FAIL =odd")
+
+    def test_entity_preference(self):
+        record = parse_message("USER=a ACTION=X order=O1 reservation=R1", ts=1)
+        self.assertEqual(record["entity"], "reservation:R1")
+        self.assertIsNone(parse_message("USER=None ACTION=X")["user"])   # old lines for no user
+        self.assertEqual(record_message({"attrs": None}), "")
+
+    def test_json_line_round_trip(self):
+        line = audit_line("USER=ann ACTION=PO_CREATE po=PO1 cost=1.00 created by ann")
+        self.assertTrue(line.isascii())
+        record = parse_audit_line(line + "\n")
+        self.assertEqual(record["user"], "ann")
+        self.assertEqual(record["entity"], "po:PO1")
+        self.assertEqual(record["text"], "created by ann")
+        self.assertAlmostEqual(record["ts"], datetime.now().timestamp(), delta=5)
+
+    def test_unreadable_lines(self):
+        self.assertIsNone(parse_audit_line("   \n"))
+        self.assertIsNone(parse_audit_line("{not json"))
+        self.assertIsNone(parse_audit_line(json.dumps({"user": "a"})))       # no ts
+        self.assertIsNone(parse_audit_line(json.dumps({"ts": "yesterday"})))
+        self.assertIsNone(parse_audit_line("2026-01-05 01:00:00 USER=a ACTION=B"))
+        self.assertIsNone(parse_audit_line("hello world"))
+
+    def test_legacy_lines(self):
+        record = parse_audit_line("2026-01-05 01:00:00 - USER=adora ACTION=LOGIN SUCCESS")
+        self.assertEqual(record["ts"], datetime(2026, 1, 5, 1, 0, 0).timestamp())
+        self.assertEqual((record["user"], record["action"], record["text"]), ("adora", "LOGIN", "SUCCESS"))
+
+        record = parse_audit_line("20260105010203 PO BLOCKED (over budget) - User: ann, Cost: £5.00")
+        self.assertEqual(record["ts"], datetime(2026, 1, 5, 1, 2, 3).timestamp())
+        self.assertIsNone(record["user"])
+        self.assertTrue(record["text"].startswith("PO BLOCKED"))
+
+
+class TestBranch_ActivityReadsRecords(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.tmpdir.name, "audit_log.txt")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_stats_over_mixed_log(self):
+        recent = datetime.now() - timedelta(minutes=5)
+        old = datetime.now() - timedelta(days=3)
+        lines = [
+            recent.strftime("%Y-%m-%d %H:%M:%S") + " - USER=ann ACTION=LOGIN FAIL reason=bad_password",
+            recent.strftime("%Y%m%d%H%M%S") + " USER=ann ACTION=PO_CREATE po=PO1 cost=1.00",
+            recent.strftime("%Y%m%d%H%M%S") + " PO PO2, created by ann (Cost: £1.00)",  # no USER/ACTION
+            old.strftime("%Y-%m-%d %H:%M:%S") + " - USER=old ACTION=LOGIN SUCCESS",
+            json.dumps(audit_record("bob", "LOGIN", text="SUCCESS")),
+            json.dumps(audit_record("bob", "LOGIN", text="FAIL", ts=old.timestamp())),
+            "garbage",
+            "",
+        ]
+        with open(self.log, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+        service = ActivityService(self.log)
+        stats = service.get_stats(hours=24)
+        self.assertEqual(dict(stats["total_by_user"]), {"ann": 2, "bob": 1})
+        self.assertEqual(dict(stats["total_by_action"]), {"LOGIN": 2, "PO_CREATE": 1})
+        self.assertEqual(dict(stats["failed_logins_by_user"]), {"ann": 1})
+        self.assertEqual(service.get_stats(hours=24 * 7)["total_by_user"]["old"], 1)
+
+        ts, message = service._parse_line(lines[4])
+        self.assertIsInstance(ts, datetime)
+        self.assertEqual(message, "USER=bob ACTION=LOGIN SUCCESS")
+
+    def test_purchase_order_lines_counted(self):
+        old_file = po_service_module.AUDIT_FILE
+        po_service_module.AUDIT_FILE = self.log
+        try:
+            svc = PurchaseOrderService(product_repo=object(), repo=object())
+            svc.write_audit("USER=ann ACTION=PO_STATUS po=PO1 status=APPROVED")
+        finally:
+            po_service_module.AUDIT_FILE = old_file
+        stats = ActivityService(self.log).get_stats(hours=1)
+        self.assertEqual(stats["actions_by_user"]["ann"]["PO_STATUS"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+# File: src/tests/tf146/test/whitebox/branch/test_audit_sink_branch.py
+#
+# White-Box (Branch) tests for Service.audit_sink.
+# Branches: synchronous write, queued write + background flush, full queue written by the
+# caller, batches grouped per file, close() with/without a writer thread, writes after close,
+# write error kept by the background thread; services writing through the shared sink.
+
+import os
+import tempfile
+import threading
+import unittest
+
+import Service.audit_sink as audit_sink_module
+import Service.stock_service as stock_service_module
+from Service.activity_service import ActivityService
+from Service.audit_sink import AuditSink, audit_sink, set_audit_sink
+from Service.stock_service import StockService
+
+
+def read(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+class TestBranch_AuditSink(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.tmpdir.name, "audit_log.txt")
+        self.other = os.path.join(self.tmpdir.name, "other.txt")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_synchronous_sink_writes_straight_away(self):
+        sink = AuditSink(background=False)
+        sink.write(self.log, "a")
+        sink.write_lines(self.log, ["b", "c"])
+        sink.write_lines(self.log, [])
+        self.assertEqual(read(self.log), ["a", "b", "c"])
+        self.assertIsNone(sink._thread)
+
+    def test_background_sink_queues_until_flushed(self):
+        sink = AuditSink(flush_interval=60)
+        try:
+            sink.write(self.log, "a")
+            sink.write(self.other, "x")
+            sink.write(self.log, "b")
+            self.assertEqual(read(self.log), [])
+            self.assertEqual(sink.pending(), 3)
+            self.assertTrue(sink._thread.is_alive())
+            sink.flush()
+            self.assertEqual(read(self.log), ["a", "b"])
+            self.assertEqual(read(self.other), ["x"])
+            self.assertEqual(sink.pending(), 0)
+        finally:
+            sink.close()
+
+    def test_background_thread_writes_on_its_own(self):
+        sink = AuditSink(flush_interval=0.01)
+        try:
+            sink.write(self.log, "a")
+            for _i in range(200):
+                if read(self.log):
+                    break
+                threading.Event().wait(0.01)
+            self.assertEqual(read(self.log), ["a"])
+        finally:
+            sink.close()
+
+    def test_full_queue_written_by_caller(self):
+        sink = AuditSink(flush_interval=60, max_pending=3)
+        try:
+            sink.write(self.log, "a")
+            sink.write(self.log, "b")
+            self.assertEqual(read(self.log), [])
+            sink.write(self.log, "c")
+            self.assertEqual(read(self.log), ["a", "b", "c"])
+            self.assertEqual(sink.pending(), 0)
+        finally:
+            sink.close()
+
+    def test_close_writes_the_rest_then_goes_synchronous(self):
+        sink = AuditSink(flush_interval=60)
+        sink.write(self.log, "a")
+        sink.close()
+        self.assertIsNone(sink._thread)
+        self.assertEqual(read(self.log), ["a"])
+        sink.write(self.log, "b")
+        self.assertEqual(read(self.log), ["a", "b"])
+        sink.close()  # no thread: just a flush
+
+    def test_background_write_error_is_kept(self):
+        sink = AuditSink(flush_interval=0.01)
+        try:
+            sink.write(os.path.join(self.tmpdir.name, "missing", "log.txt"), "a")
+            for _i in range(200):
+                if sink.last_error is not None:
+                    break
+                threading.Event().wait(0.01)
+            self.assertIsInstance(sink.last_error, OSError)
+        finally:
+            sink.close()
+
+    def test_flush_raises_write_errors_to_the_caller(self):
+        sink = AuditSink(flush_interval=60)
+        try:
+            sink.write(os.path.join(self.tmpdir.name, "missing", "log.txt"), "a")
+            with self.assertRaises(OSError):
+                sink.flush()
+        finally:
+            sink.close()
+
+
+class TestBranch_ServicesUseSharedSink(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.tmpdir.name, "audit_log.txt")
+        self.old_file = stock_service_module.AUDIT_FILE
+        stock_service_module.AUDIT_FILE = self.log
+        self.sink = AuditSink(flush_interval=60)
+        self.old_sink = set_audit_sink(self.sink)
+
+    def tearDown(self):
+        set_audit_sink(self.old_sink)
+        stock_service_module.AUDIT_FILE = self.old_file
+        self.tmpdir.cleanup()
+
+    def test_service_lines_queued_and_seen_by_activity_stats(self):
+        self.assertIs(audit_sink(), self.sink)
+        svc = StockService(product_repo=None)
+        svc.write_audit("USER=ann ACTION=STOCK_INCREASE sku=A amount=1")
+        svc.write_audit_lines(["USER=bob ACTION=STOCK_DECREASE sku=A amount=1",
+                               "USER=ann ACTION=STOCK_DECREASE sku=B amount=2"])
+        self.assertEqual(read(self.log), [])
+        self.assertEqual(self.sink.pending(), 2)
+
+        stats = ActivityService(self.log).get_stats(hours=1)  # flushes first
+        self.assertEqual(stats["total_by_user"]["ann"], 2)
+        self.assertEqual(stats["total_by_action"]["STOCK_DECREASE"], 2)
+        self.assertEqual(len(read(self.log)), 3)
+
+    def test_replacing_the_sink_writes_its_queue(self):
+        svc = StockService(product_repo=None)
+        svc.write_audit("USER=ann ACTION=X")
+        set_audit_sink(AuditSink(background=False))
+        self.assertEqual(len(read(self.log)), 1)
+        svc.write_audit("USER=ann ACTION=Y")
+        self.assertEqual(len(read(self.log)), 2)
+        self.assertFalse(audit_sink_module.audit_sink().background)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+# File: src/tests/tf146/test/whitebox/branch/test_binary_snapshot_branch.py
+#
+# White-Box (Branch) tests for the binary products snapshot (products.txt.bin).
+# Branches: no text file, fresh snapshot used, stale snapshot (text edited) ignored and
+# rewritten, same-size rewrite keeping the mtime (in place / new inode) ignored, damaged /
+# wrong magic snapshot ignored, journal replayed on top of a binary
+# load, save rewrites both files, unparseable product -> snapshot removed, flag off.
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from model.product import Product
+import Repo.product_repo as product_repo_module
+from Repo.product_repo import ProductRepo
+
+
+class TestBranch_BinarySnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "products.txt")
+        with open(self.filename, "w") as f:
+            f.write("A1,Apple,Red fruit,5,0.5,Food,ACTIVE\n")
+            f.write("\n")
+            f.write(" B2 , Café crème ,Hot,0,2.75,,INACTIVE\n")
+            f.write("C3,Cable,USB,12,3.1,Electronics\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _state(self, repo):
+        return [vars(p) for p in repo.get_all_products()]
+
+    def _binary_loads(self, repo):
+        # the text parser is never called when the snapshot is fresh
+        with patch.object(ProductRepo, "_load_text", side_effect=AssertionError("text parsed")):
+            repo.load_products()
+
+    def test_first_load_writes_snapshot_then_uses_it(self):
+        text_repo = ProductRepo(self.filename)
+        repo = ProductRepo(self.filename, binary_snapshot=True)
+        self.assertTrue(os.path.exists(self.filename + ".bin"))
+        self._binary_loads(repo)
+        self.assertEqual(self._state(repo), self._state(text_repo))
+        self.assertIsNone(repo.find_by_sku("B2").category)
+        self.assertIs(repo.find_by_sku("B2").active, False)
+
+    def test_flag_off_never_writes(self):
+        ProductRepo(self.filename).save_products()
+        self.assertFalse(os.path.exists(self.filename + ".bin"))
+
+    def test_no_text_file(self):
+        repo = ProductRepo(os.path.join(self.tmpdir.name, "missing.txt"), binary_snapshot=True)
+        self.assertEqual(repo.get_all_products(), [])
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, "missing.txt.bin")))
+
+    def test_stale_snapshot_ignored(self):
+        ProductRepo(self.filename, binary_snapshot=True)
+        with open(self.filename, "a") as f:
+            f.write("D4,Desk,Wood,1,99.0,Office,ACTIVE\n")
+        repo = ProductRepo(self.filename, binary_snapshot=True)
+        self.assertIsNotNone(repo.find_by_sku("D4"))
+        self._binary_loads(repo)  # rewritten for the new text
+        self.assertIsNotNone(repo.find_by_sku("D4"))
+
+    def _same_size_rewrite(self, in_place):
+        # what a second writer within the same mtime tick looks like: new bytes, same size + mtime
+        st = os.stat(self.filename)
+        with open(self.filename) as f:
+            text = f.read().replace("Apple", "Apric")
+        target = self.filename if in_place else self.filename + ".new"
+        with open(target, "w") as f:
+            f.write(text)
+        if not in_place:
+            os.replace(target, self.filename)
+        os.utime(self.filename, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(os.stat(self.filename).st_size, st.st_size)
+
+    def test_recent_same_size_rewrite_ignored(self):
+        # products.txt was modified just before the snapshot was written: its crc is kept
+        ProductRepo(self.filename, binary_snapshot=True)
+        self._same_size_rewrite(in_place=True)
+        repo = ProductRepo(self.filename, binary_snapshot=True)
+        self.assertEqual(repo.find_by_sku("A1").name, "Apric")
+
+    def test_replaced_file_with_same_size_and_mtime_ignored(self):
+        # an old products.txt (no crc kept) swapped for another file: the inode differs
+        old_ns = os.stat(self.filename).st_mtime_ns - 3600 * 10 ** 9
+        os.utime(self.filename, ns=(old_ns, old_ns))
+        ProductRepo(self.filename, binary_snapshot=True)
+        self._same_size_rewrite(in_place=False)
+        repo = ProductRepo(self.filename, binary_snapshot=True)
+        self.assertEqual(repo.find_by_sku("A1").name, "Apric")
+        self._binary_loads(repo)  # rewritten for the new file
+        self.assertEqual(repo.find_by_sku("A1").name, "Apric")
+
+    def test_no_temp_files_left(self):
+        repo = ProductRepo(self.filename, binary_snapshot=True)
+        repo.add_product(Product("E5", "Egg", "Box", "7", "1.25", " ", True))
+        self.assertEqual(sorted(os.listdir(self.tmpdir.name)), ["products.txt", "products.txt.bin"])
+
+    def test_damaged_snapshot_ignored(self):
+        ProductRepo(self.filename, binary_snapshot=True)
+        for damage in [b"", b"XXXX" + b"\0" * 40]:
+            with open(self.filename + ".bin", "wb") as f:
+                f.write(damage)
+            os.utime(self.filename, ns=(os.stat(self.filename).st_atime_ns, os.stat(self.filename).st_mtime_ns))
+            repo = ProductRepo(self.filename, binary_snapshot=True)
+            self.assertEqual(len(repo.get_all_products()), 3)
+
+    def test_truncated_snapshot_ignored(self):
+        ProductRepo(self.filename, binary_snapshot=True)
+        with open(self.filename + ".bin", "rb") as f:
+            data = f.read()
+        with open(self.filename + ".bin", "wb") as f:
+            f.write(data[:-5])
+        repo = ProductRepo(self.filename, binary_snapshot=True)
+        self.assertEqual(self._state(repo), self._state(ProductRepo(self.filename)))
+
+    def test_journal_replayed_after_binary_load(self):
+        repo = ProductRepo(self.filename, journal=True, binary_snapshot=True)
+        repo.update_product("A1", "Apple", "Green fruit", 9, 0.6, "Food")
+        repo.remove_by_sku("C3")
+
+        again = ProductRepo(self.filename, journal=True, binary_snapshot=True)
+        self._binary_loads(again)
+        self.assertEqual(again.find_by_sku("A1").quantity, 9)
+        self.assertIsNone(again.find_by_sku("C3"))
+
+    def test_save_rewrites_snapshot(self):
+        repo = ProductRepo(self.filename, binary_snapshot=True)
+        repo.add_product(Product("E5", "Egg", "Box", "7", "1.25", " ", True))
+        again = ProductRepo(self.filename, binary_snapshot=True)
+        self._binary_loads(again)
+        self.assertEqual(self._state(again), self._state(ProductRepo(self.filename)))
+        self.assertEqual(again.find_by_sku("E5").quantity, 7)
+
+    def test_unparseable_product_removes_snapshot(self):
+        repo = ProductRepo(self.filename, binary_snapshot=True)
+        repo.find_by_sku("A1").quantity = "lots"
+        repo.save_products()
+        self.assertFalse(os.path.exists(self.filename + ".bin"))
+
+
+if __name__ == "__main__":
+    unittest.main()
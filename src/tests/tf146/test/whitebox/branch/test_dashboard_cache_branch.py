@@ -0,0 +1,107 @@
+# File: src/tests/tf146/test/whitebox/branch/test_dashboard_cache_branch.py
+#
+# White-Box (Branch) tests for the DashboardChartService stats cache.
+# Branches: hit (same version + threshold), miss (new threshold / repo write / reload /
+# products.txt changed by another process),
+# repo without a version (never cached), use_cache=False, returned copy isolation.
+
+import os
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+from Service.dashboard_chart_service import DashboardChartService
+
+
+class _PlainRepo:
+    def __init__(self, products):
+        self.products = products
+
+    def get_all_products(self):
+        return self.products
+
+
+class TestBranch_DashboardCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = ProductRepo(os.path.join(self.tmpdir.name, "products.txt"))
+        self.repo.products = [
+            Product("A", "A", "D", 0, 1.0, "Food", True),
+            Product("B", "B", "D", 4, 2.0, "Food", True),
+            Product("C", "C", "D", 30, 1.0, None, True),
+        ]
+        self.svc = DashboardChartService(self.repo)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_repeat_refresh_is_a_hit(self):
+        first = self.svc.get_dashboard_stats(5)
+        second = self.svc.get_dashboard_stats(5)
+        self.assertEqual(first, second)
+        self.assertEqual((self.svc.cache_hits, self.svc.cache_misses), (1, 1))
+
+    def test_new_threshold_is_a_miss(self):
+        self.svc.get_dashboard_stats(5)
+        self.svc.get_dashboard_stats(10)
+        self.svc.get_dashboard_stats(5)
+        stats = self.svc.get_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 2, 2))
+
+    def test_write_invalidates(self):
+        before = self.svc.get_dashboard_stats(5)
+        version = self.repo.version
+        self.repo.update_product("C", "C", "D", 0, 1.0, None)
+        self.assertGreater(self.repo.version, version)
+
+        after = self.svc.get_dashboard_stats(5)
+        self.assertEqual(self.svc.cache_misses, 2)
+        self.assertEqual(after["status"]["out_of_stock"], before["status"]["out_of_stock"] + 1)
+        self.assertEqual(self.svc.get_cache_stats()["entries"], 1)
+
+    def test_save_and_reload_invalidate(self):
+        self.svc.get_dashboard_stats(5)
+        self.repo.save_products()
+        self.svc.get_dashboard_stats(5)
+        self.repo.load_products()
+        self.svc.get_dashboard_stats(5)
+        self.assertEqual((self.svc.cache_hits, self.svc.cache_misses), (0, 3))
+
+    def test_change_by_another_process_is_a_miss(self):
+        self.repo.save_products()
+        self.repo.reload_interval = 0
+        before = self.svc.get_dashboard_stats(5)
+        other = ProductRepo(self.repo.filename, reload_interval=None)
+        other.update_product("C", "C", "D", 0, 1.0, None)
+
+        after = self.svc.get_dashboard_stats(5)
+        self.assertEqual(self.svc.cache_misses, 2)
+        self.assertEqual(after["status"]["out_of_stock"], before["status"]["out_of_stock"] + 1)
+
+    def test_returned_stats_are_copies(self):
+        stats = self.svc.get_dashboard_stats(5)
+        stats["status"]["in_stock"] = 999
+        self.assertEqual(self.svc.get_dashboard_stats(5)["status"]["in_stock"], 1)
+
+    def test_cache_disabled(self):
+        svc = DashboardChartService(self.repo, use_cache=False)
+        svc.get_dashboard_stats(5)
+        svc.get_dashboard_stats(5)
+        self.assertEqual((svc.cache_hits, svc.cache_misses), (0, 0))
+
+    def test_repo_without_version_not_cached(self):
+        svc = DashboardChartService(_PlainRepo(self.repo.get_all_products()))
+        self.assertEqual(svc.get_dashboard_stats(5), self.svc.get_dashboard_stats(5))
+        svc.get_dashboard_stats(5)
+        self.assertEqual((svc.cache_hits, svc.cache_misses), (0, 0))
+
+    def test_clear_cache(self):
+        self.svc.get_dashboard_stats(5)
+        self.svc.clear_cache()
+        self.svc.get_dashboard_stats(5)
+        self.assertEqual(self.svc.cache_misses, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
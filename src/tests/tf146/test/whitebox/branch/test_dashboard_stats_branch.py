@@ -0,0 +1,113 @@
+# File: src/tests/tf146/test/whitebox/branch/test_dashboard_stats_branch.py
+#
+# White-Box (Branch) tests for DashboardChartService.get_dashboard_stats (single pass).
+# Branches: columns rows vs product rows vs NumPy, inactive skip, qty==0 / <=threshold / else,
+# bucket edges, summary rules (all products, qty < threshold), tied categories in catalogue
+# order on every path after edits.
+
+import os
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+import Service.dashboard_chart_service as dashboard_module
+from Service.dashboard_chart_service import DashboardChartService
+from Service.product_service import ProductService
+
+
+class _PlainRepo:
+    # no column view -> forces the per-Product rows
+    def __init__(self, products):
+        self.products = products
+
+    def get_all_products(self):
+        return self.products
+
+
+class TestBranch_DashboardStats(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = ProductRepo(os.path.join(self.tmpdir.name, "products.txt"))
+        self.repo.products = [
+            Product("A", "A", "D", 0, 1.0, None, True),
+            Product("B", "B", "D", 5, 2.0, "Food", True),
+            Product("C", "C", "D", 6, 1.0, " Food ", True),
+            Product("D", "D", "D", 21, 0.5, "Drinks", True),
+            Product("E", "E", "D", 2, 3.0, "X", False),
+            Product("F", "F", "D", 0, 1.0, "X", False),
+        ]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _expected_from_separate_methods(self, svc, threshold):
+        return {
+            "status": svc.get_inventory_status_counts(threshold),
+            "buckets": svc.get_stock_bucket_counts(),
+            "categories": svc.get_category_counts(),
+        }
+
+    def _check(self, svc, threshold):
+        stats = svc.get_dashboard_stats(threshold)
+        expected = self._expected_from_separate_methods(svc, threshold)
+        for key in expected:
+            self.assertEqual(expected[key], stats[key])
+
+        summary = ProductService(self.repo, None).get_dashboard_summary(threshold)
+        self.assertEqual(summary, stats["summary"])
+        self.assertAlmostEqual(0 + 10.0 + 6.0 + 10.5 + 6.0 + 0, stats["total_value"])
+        return stats
+
+    def test_columns_single_pass(self):
+        svc = DashboardChartService(self.repo, use_numpy=False, use_counters=False)
+        stats = self._check(svc, 5)
+        self.assertEqual({"in_stock": 2, "low_stock": 1, "out_of_stock": 1}, stats["status"])
+        self.assertEqual({"0": 1, "1-5": 1, "6-20": 1, "21+": 1}, stats["buckets"])
+        self.assertEqual({"Uncategorised": 1, "Food": 2, "Drinks": 1}, stats["categories"])
+        self.assertEqual("CRITICAL", stats["summary"]["system_status"])
+        self.assertEqual(1, stats["summary"]["low_stock_count"])  # E (2) only; B is not < 5
+
+    def test_product_rows_single_pass(self):
+        svc = DashboardChartService(_PlainRepo(self.repo.get_all_products()))
+        for threshold in [0, 5, 30]:
+            self._check(svc, threshold)
+
+    @unittest.skipIf(dashboard_module.np is None, "NumPy not installed")
+    def test_numpy_stats(self):
+        svc = DashboardChartService(self.repo, use_numpy=True, use_counters=False)
+        for threshold in [0, 5, 30]:
+            self._check(svc, threshold)
+
+    def test_tied_categories_in_catalogue_order(self):
+        # B is the first Food product; after the edits Drinks comes first in the catalogue
+        options = [{}, {"use_numpy": False}, {"use_counters": False}, {"use_counters": False, "use_numpy": False}]
+        services = [DashboardChartService(self.repo, use_cache=False, **kwargs) for kwargs in options]
+        for svc in services:
+            svc.get_category_counts()   # counters / columns built before the edits, then kept up to date
+        self.repo.remove_by_sku("B")
+        self.repo.remove_by_sku("C")
+        self.repo.add_product(Product("G", "G", "D", 7, 1.0, "Food", True))
+        self.repo.add_product(Product("H", "H", "D", 7, 1.0, "Tools", True))
+        self.repo.update_product("A", "A", "D", 3, 1.0, "Zinc")
+        expected = DashboardChartService(_PlainRepo(self.repo.get_all_products())).get_category_counts()
+        self.assertEqual(list(expected), ["Zinc", "Drinks", "Food", "Tools"])
+        for kwargs, svc in zip(options, services):
+            with self.subTest(**kwargs):
+                self.assertEqual(list(svc.get_category_counts()), list(expected))
+                self.assertEqual(list(svc.get_dashboard_stats(5)["categories"]), list(expected))
+                self.assertEqual(svc.build_dashboard_chart_lines(5)[-5:-1],
+                                 DashboardChartService(_PlainRepo(self.repo.get_all_products()))
+                                 .build_dashboard_chart_lines(5)[-5:-1])
+
+    def test_chart_lines_reuse_given_stats(self):
+        svc = DashboardChartService(self.repo)
+        stats = svc.get_dashboard_stats(5)
+        stats["status"]["in_stock"] = 99  # proves the lines come from the passed-in stats
+        joined = "\n".join(svc.build_dashboard_chart_lines(5, stats))
+        self.assertIn("(99)", joined)
+        self.assertEqual(stats["summary"], svc.get_dashboard_summary(5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,408 @@
+# File: src/tests/tf146/test/whitebox/branch/test_file_cache_branch.py
+#
+# White-Box (Branch) tests for the (mtime, size, inode) file cache and the repos using it.
+# Branches: missing file, unchanged file (trusted / too recent to trust), grown file read
+# from the old end, rewritten / shrunk / replaced file read in full, unchanged prefix on a
+# full read, unfinished last line kept or dropped, parse error; repos noticing changes made
+# by another instance (tail applied vs full reload, refresh disabled, inside a batch), two
+# journalled writers keeping each other's records when appending / compacting, a rewrite by
+# the other process reloaded before writing (or a whole-catalogue save refused), file stamps
+# (signature trusted vs recent same-size rewrite), temp files of our own for replace_file.
+
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import Repo.file_cache as file_cache_module
+import Repo.reservation_repo as reservation_repo_module
+from Repo.favourite_repo import FavouriteRepo
+from Repo.file_cache import FileCache, FileStamp, append_line, file_signature, replace_file
+from Repo.product_repo import ProductRepo
+from Repo.reservation_repo import ReservationRepo
+from Repo.supplier_product_repo import SupplierProductRepo
+from Repo.supplier_repo import SupplierRepo
+from Repo.user_repo import UserRepo
+from model.product import Product
+from model.reservation import Reservation
+
+
+class CountingParser:
+    def __init__(self):
+        self.lines = []
+
+    def __call__(self, line):
+        self.lines.append(line)
+        line = line.strip()
+        if line == "bad":
+            raise ValueError("bad line")
+        return line or None
+
+
+class TestBranch_FileCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "data.txt")
+        self.parse = CountingParser()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, text, mode="w"):
+        with open(self.path, mode) as f:
+            f.write(text)
+
+    def test_missing_then_created_then_removed(self):
+        cache = FileCache(self.path, self.parse, append_only=True)
+        self.assertEqual(cache.records(), [])
+        self.assertIsNone(file_signature(self.path))
+        self._write("a\n")
+        self.assertEqual(cache.records(), ["a"])
+        os.remove(self.path)
+        self.assertEqual(cache.records(), [])
+        self.assertEqual(cache.resets, 1)
+
+    def test_unchanged_file_is_not_parsed_again(self):
+        self._write("a\nb\n")
+        cache = FileCache(self.path, self.parse)
+        with mock.patch.object(file_cache_module, "RACY_WINDOW_NS", 0):
+            cache.records()
+            cache.records()
+        self.assertEqual(self.parse.lines, ["a", "b"])
+
+    def test_recent_same_size_rewrite_is_still_seen(self):
+        self._write("a\nb\n")
+        cache = FileCache(self.path, self.parse, append_only=True)
+        cache.records()
+        stat = os.stat(self.path)
+        self._write("c\nd\n")
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))  # same (mtime, size, inode)
+        self.assertEqual(cache.records(), ["c", "d"])
+        self.assertEqual(cache.resets, 1)
+
+    def test_appended_lines_only_parse_the_tail(self):
+        self._write("a\nb\n")
+        cache = FileCache(self.path, self.parse, append_only=True)
+        version = cache.version
+        self.assertEqual(cache.records(), ["a", "b"])
+        self._write("c\n", "a")
+        self.assertEqual(cache.records(), ["a", "b", "c"])
+        self.assertEqual(self.parse.lines, ["a", "b", "c"])
+        self.assertEqual(cache.resets, 0)
+        self.assertEqual(cache.size, 6)
+        self.assertGreater(cache.version, version)
+
+    def test_rewrites_read_in_full(self):
+        self._write("a\nb\n")
+        cache = FileCache(self.path, self.parse, append_only=True)
+        cache.records()
+        self._write("x\nb\nc\n")  # grew, but the start changed
+        self.assertEqual(cache.records(), ["x", "b", "c"])
+        self._write("x\n")        # shrunk
+        self.assertEqual(cache.records(), ["x"])
+        os.replace(self._other("x\ny\n"), self.path)  # new inode
+        self.assertEqual(cache.records(), ["x", "y"])
+        self.assertEqual(cache.resets, 2)  # x,b,c -> x is one; x -> x,y kept the prefix
+
+    def _other(self, text):
+        other = os.path.join(self.tmpdir.name, "other.txt")
+        with open(other, "w") as f:
+            f.write(text)
+        return other
+
+    def test_full_read_with_unchanged_prefix(self):
+        self._write("a\n")
+        cache = FileCache(self.path, self.parse)  # not append-only: always a full read
+        cache.records()
+        self._write("b\n", "a")
+        self.assertEqual(cache.records(), ["a", "b"])
+        self.assertEqual(self.parse.lines, ["a", "b"])
+        self.assertEqual(cache.resets, 0)
+
+    def test_unfinished_last_line(self):
+        self._write("a\nb")
+        kept = FileCache(self.path, self.parse, append_only=True)
+        dropped = FileCache(self.path, CountingParser(), append_only=True, partial_lines=False)
+        self.assertEqual(kept.records(), ["a", "b"])
+        self.assertEqual(dropped.records(), ["a"])
+        self._write("c\nd\n", "a")
+        self.assertEqual(kept.records(), ["a", "bc", "d"])
+        self.assertEqual(dropped.records(), ["a", "bc", "d"])
+
+    def test_parse_error_leaves_cache_as_it_was(self):
+        self._write("a\n")
+        cache = FileCache(self.path, self.parse, append_only=True)
+        cache.records()
+        self._write("b\nbad\n", "a")
+        with self.assertRaises(ValueError):
+            cache.records()
+        self.assertEqual(cache._records, ["a"])
+        self._write("a\nc\n")
+        self.assertEqual(cache.records(), ["a", "c"])
+
+    def test_stamp_sees_recent_same_size_rewrite(self):
+        self._write("a\nb\n")
+        stamp = FileStamp(self.path)
+        stamp.take()
+        self.assertFalse(stamp.changed())
+        stat = os.stat(self.path)
+        self._write("c\nd\n")
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))  # same (mtime, size, inode)
+        self.assertTrue(stamp.changed())
+
+        stamp.take()
+        with mock.patch.object(file_cache_module, "RACY_WINDOW_NS", 0):
+            stamp.take()
+            self._write("e\nf\n")
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self.assertFalse(stamp.changed())  # old enough: the signature alone decides
+        os.remove(self.path)
+        self.assertTrue(stamp.changed())
+
+    def test_replace_file_uses_its_own_temp_file(self):
+        self._write("old\n")
+        names = []
+        real_mkstemp = file_cache_module.tempfile.mkstemp
+        with mock.patch.object(file_cache_module.tempfile, "mkstemp",
+                               side_effect=lambda **kw: names.append(real_mkstemp(**kw)) or names[-1]):
+            replace_file(self.path, "new\n")
+            replace_file(self.path, b"newer\n")
+        self.assertNotEqual(names[0][1], names[1][1])
+        self.assertEqual(os.listdir(self.tmpdir.name), ["data.txt"])
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "newer\n")
+
+    def test_append_line_adds_missing_newline(self):
+        append_line(self.path, "a")
+        self._write("b", "a")
+        append_line(self.path, "c")
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "a\nb\nc\n")
+
+
+class TestBranch_FileBackedRepos(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _path(self, name, text=None):
+        path = os.path.join(self.dir, name)
+        if text is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return path
+
+    def test_user_repo_sees_other_writers(self):
+        path = self._path("users.txt", "ann:h:admin\n")
+        repo, other = UserRepo(path), UserRepo(path)
+        self.assertEqual(repo.get_user("ann").role, "ADMIN")
+        other.save_user(self._user("bob"))
+        self.assertEqual(repo.get_user("bob").role, "STAFF")
+        other.update_role("ann", "staff")
+        self.assertEqual(repo.get_user("ann").role, "STAFF")
+        self.assertIsNone(repo.get_user("cat"))
+
+        users = repo.load_users()
+        users[0].role = "MANAGER"  # callers get their own objects
+        self.assertEqual(repo.get_user("ann").role, "STAFF")
+
+    def _user(self, name):
+        from model.user import User
+        return User(name, "h")
+
+    def test_favourites_append_and_lookups(self):
+        path = self._path("favourites.txt", "ann,A1")  # no final newline
+        repo = FavouriteRepo(path)
+        inode = os.stat(path).st_ino
+        repo.add_favourite("ann", "B2")
+        repo.add_favourite("ann", "B2")
+        self.assertEqual(os.stat(path).st_ino, inode)
+        self.assertEqual(repo.load_all(), [("ann", "A1"), ("ann", "B2")])
+        self.assertEqual(repo.get_favourites("ann"), ["A1", "B2"])
+        self.assertEqual(repo.get_favourites("bob"), [])
+        repo.remove_favourite("ann", "A1")
+        self.assertFalse(repo.is_favourite("ann", "A1"))
+        self.assertTrue(repo.is_favourite("ann", "B2"))
+
+    def test_supplier_links_append_and_lookups(self):
+        path = self._path("links.txt", "SUP1,A1\nbad\n")
+        repo = SupplierProductRepo(path)
+        self.assertTrue(repo.add_link("SUP2", "A1"))
+        self.assertFalse(repo.add_link("SUP2", "A1"))
+        self.assertEqual(repo.get_suppliers_for_product("A1"), ["SUP1", "SUP2"])
+        self.assertTrue(repo.remove_link("SUP1", "A1"))
+        self.assertEqual(repo.get_suppliers_for_product("A1"), ["SUP2"])
+        self.assertEqual(repo.get_products_for_supplier("SUP2"), ["A1"])
+        self.assertEqual(repo.get_products_for_supplier("SUP1"), [])
+
+    def test_reservation_totals_follow_the_file(self):
+        path = self._path("reservations.txt", "")
+        repo = ReservationRepo()
+        repo.set_io_file(path)
+        repo.save_reservation(Reservation("R1", "O1", "A1", 2, 1.0, "ann", "t1"))
+        repo.save_reservation(Reservation("R2", "O2", "A1", 3, 1.0, "ann", "t2"))
+        self.assertEqual(repo.get_active_reserved_quantity("A1"), 5)
+        self.assertTrue(repo.cancel_reservation("R1"))
+        self.assertEqual(repo.get_active_reserved_quantity("A1"), 3)
+
+        other_path = self._path("other.txt", "R9|O9|A1|7|ann|t|ACTIVE|None\n")
+        repo.set_io_file(None)
+        with mock.patch.object(reservation_repo_module, "RESERVATION_FILE", other_path):
+            self.assertEqual(repo.get_active_reserved_quantity("A1"), 7)
+            self.assertEqual([r.reservation_id for r in repo.get_all_reservations()], ["R9"])
+
+    def test_supplier_repo_reloads_on_change(self):
+        path = self._path("suppliers.txt", "SUP1,Acme,,,ACTIVE\n")
+        repo, other = SupplierRepo(path), SupplierRepo(path)
+        other.suppliers[0].name = "Acme Ltd"
+        other.save_suppliers()
+        self.assertEqual(repo.find_by_id("SUP1").name, "Acme Ltd")
+        self.assertEqual(len(repo.get_all()), 1)
+
+
+class TestBranch_ProductRepoReload(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "products.txt")
+        with open(self.path, "w") as f:
+            f.write("A,ProdA,Desc,1,1.0,Food,ACTIVE\nB,ProdB,Desc,2,2.0,Food,ACTIVE\n")
+        self.writer = ProductRepo(self.path, journal=True, reload_interval=None)
+        self.reader = ProductRepo(self.path, reload_interval=0)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_journal_tail_applied_incrementally(self):
+        index = self.reader.get_sorted_index("quantity")
+        resets = []
+        self.reader.add_listener(type("L", (), {
+            "on_reset": lambda s, products: resets.append(len(products)),
+            "on_add": lambda s, p: None, "on_change": lambda s, p: None, "on_remove": lambda s, p: None})())
+        resets.clear()
+
+        self.writer.update_product("A", "ProdA", "Desc", 9, 1.0, "Food")
+        self.writer.add_product(Product("C", "ProdC", "Desc", 3, 3.0, None, True))
+        self.writer.remove_by_sku("B")
+
+        self.assertEqual([p.sku for p in self.reader.get_all_products()], ["A", "C"])
+        self.assertEqual(self.reader.find_by_sku("A").quantity, 9)
+        self.assertEqual([sku for _key, sku in index.items()], ["C", "A"])
+        self.assertEqual(resets, [])  # no full reload
+        self.assertFalse(self.reader.refresh())
+
+    def test_rewritten_catalogue_reloaded(self):
+        self.writer.update_product("A", "ProdA", "Desc", 9, 1.0, "Food")
+        self.assertEqual(self.reader.find_by_sku("A").quantity, 9)
+        self.writer.compact()  # new products.txt, journal emptied
+        self.writer.add_product(Product("C", "ProdC", "Desc", 3, 3.0, None, True))
+        self.assertEqual([p.sku for p in self.reader.get_all_products()], ["A", "B", "C"])
+
+    def test_own_writes_do_not_reload(self):
+        self.reader.update_product("B", "ProdB", "Desc", 5, 2.0, "Food")
+        b = self.reader.find_by_sku("B")
+        self.assertFalse(self.reader.refresh())
+        self.assertIs(self.reader.find_by_sku("B"), b)
+
+    def test_refresh_disabled_or_in_batch(self):
+        self.writer.update_product("A", "ProdA", "Desc", 9, 1.0, "Food")
+        self.assertEqual(self.writer.find_by_sku("A").quantity, 9)
+        other = ProductRepo(self.path, reload_interval=None)
+        self.reader.update_product("A", "ProdA", "Desc", 1, 1.0, "Food")
+        self.assertEqual(other.find_by_sku("A").quantity, 9)  # never checks
+
+        self.writer.update_product("B", "ProdB", "Desc", 7, 2.0, "Food")
+        with self.reader.batch():
+            self.assertFalse(self.reader.refresh())
+            self.assertEqual(self.reader.find_by_sku("B").quantity, 2)
+        self.assertEqual(self.reader.find_by_sku("B").quantity, 7)
+
+    def test_journal_writers_keep_each_others_records(self):
+        other = ProductRepo(self.path, journal=True, reload_interval=None)
+        self.writer.update_product("A", "ProdA", "Desc", 50, 1.0, "Food")
+        other.update_product("B", "ProdB", "Desc", 7, 2.0, "Food")
+        self.assertEqual(other.find_by_sku("A").quantity, 50)  # applied before appending
+        self.assertFalse(other.refresh())
+
+        # their older record for a SKU we change too doesn't undo ours
+        self.writer.update_product("B", "ProdB", "Desc", 8, 2.0, "Food")
+        other.update_product("B", "ProdB", "Desc", 9, 2.0, "Food")
+        self.assertEqual(other.find_by_sku("B").quantity, 9)
+
+        self.writer.update_product("A", "ProdA", "Desc", 60, 1.0, "Food")
+        other.compact()
+        fresh = ProductRepo(self.path, reload_interval=None)
+        self.assertEqual([(p.sku, p.quantity) for p in fresh.get_all_products()], [("A", 60), ("B", 9)])
+
+        # compacted by the other process: reloaded, and our change still made
+        self.writer.update_product("B", "ProdB", "Desc", 3, 2.0, "Food")
+        self.assertEqual([(p.sku, p.quantity) for p in self.writer.get_all_products()], [("A", 60), ("B", 3)])
+        self.assertTrue(other.refresh())
+        self.assertEqual(other.find_by_sku("B").quantity, 3)
+
+    def test_compaction_by_the_other_process_is_not_overwritten(self):
+        other = ProductRepo(self.path, journal=True, reload_interval=None)
+        other.save_product(Product("A", "ProdA", "Desc", 77, 1.0, "Food", True))
+        other.compact()
+
+        self.writer.compact()
+        self.assertEqual(ProductRepo(self.path).find_by_sku("A").quantity, 77)
+
+        other.update_product("B", "ProdB", "Desc", 5, 2.0, "Food")
+        other.compact()
+        self.writer.find_by_sku("A").quantity = 1   # changed in place: not known to the repo
+        with self.assertRaises(ValueError):
+            self.writer.save_products()
+        self.assertEqual([(p.sku, p.quantity) for p in ProductRepo(self.path).get_all_products()],
+                         [("A", 77), ("B", 5)])
+        self.assertTrue(self.writer.refresh())
+        self.writer.save_products()   # up to date again
+        self.assertEqual(ProductRepo(self.path).find_by_sku("B").quantity, 5)
+
+    def test_rewrite_by_the_other_process_reloaded_before_writing(self):
+        plain = ProductRepo(self.path, reload_interval=None)
+        other = ProductRepo(self.path, reload_interval=None)
+        other.update_product("A", "ProdA", "Desc", 50, 1.0, "Food")
+        plain.update_product("B", "ProdB", "Desc", 7, 2.0, "Food")
+        plain.add_product(Product("C", "ProdC", "Desc", 3, 3.0, None, True))
+        other.refresh()
+        other.remove_by_sku("C")
+        with plain.batch():
+            plain.update_product("A", "ProdA", "Desc", 51, 1.0, "Food")
+        expected = [("A", 51), ("B", 7)]
+        self.assertEqual([(p.sku, p.quantity) for p in plain.get_all_products()], expected)
+        self.assertEqual([(p.sku, p.quantity) for p in ProductRepo(self.path).get_all_products()], expected)
+
+    def test_two_writers_never_lose_an_update(self):
+        skus = ["A", "B"]
+        for seed in range(30):
+            with open(self.path, "w") as f:
+                f.write("A,ProdA,Desc,1,1.0,Food,ACTIVE\nB,ProdB,Desc,2,2.0,Food,ACTIVE\n")
+            if os.path.exists(self.path + ".journal"):
+                os.remove(self.path + ".journal")
+            rng = random.Random(seed)
+            journal = rng.random() < 0.5
+            repos = [ProductRepo(self.path, journal=journal, reload_interval=None,
+                                 compact_threshold=rng.choice([40, 10 ** 6])) for _ in range(2)]
+            expected = {"A": 1, "B": 2}
+            for _ in range(40):
+                repo = rng.choice(repos)
+                action = rng.random()
+                if action < 0.7:
+                    sku = rng.choice(skus)
+                    expected[sku] = rng.randrange(100)
+                    repo.update_product(sku, "Prod" + sku, "Desc", expected[sku], 1.0, "Food")
+                elif action < 0.85:
+                    repo.compact()
+                else:
+                    repo.refresh()
+            for repo in repos + [ProductRepo(self.path)]:
+                repo.refresh()
+                self.assertEqual({p.sku: p.quantity for p in repo.get_all_products()}, expected, seed)
+
+
+if __name__ == "__main__":
+    unittest.main()
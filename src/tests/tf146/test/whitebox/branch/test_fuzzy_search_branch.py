@@ -0,0 +1,96 @@
+# File: src/tests/tf146/test/whitebox/branch/test_fuzzy_search_branch.py
+#
+# White-Box (Branch) tests for ProductService.fuzzy_search_products.
+# Branches: empty query / limit <= 0, typo match ranked first, below min_score dropped,
+# ties in catalogue order, limit cuts, index kept in step with updates/removes,
+# index path == scan path (repo without indexes), overlap pruning.
+
+import os
+import random
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+from Repo.trigram_index import TrigramIndex, fuzzy_fields, word_trigrams
+from Service.product_service import ProductService
+
+
+class _PlainRepo:
+    def __init__(self, repo):
+        self.repo = repo
+
+    def get_all_products(self):
+        return self.repo.get_all_products()
+
+
+class TestBranch_FuzzySearch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = ProductRepo(os.path.join(self.tmpdir.name, "products.txt"))
+        self.repo.products = [
+            Product("P1", "Coffee Beans", "D", 1, 1.0, None, True),
+            Product("P2", "Green Tea", "D", 1, 1.0, None, True),
+            Product("P3", "Coffee Filters", "D", 1, 1.0, None, True),
+            Product("P4", "Black Tea", "D", 1, 1.0, None, False),
+            Product("P5", "Oat Milk", "D", 1, 1.0, None, True),
+        ]
+        self.service = ProductService(self.repo, None)
+        self.scan = ProductService(_PlainRepo(self.repo), None)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _skus(self, results):
+        return [p.sku for p, _score in results]
+
+    def test_empty_query_and_limit(self):
+        self.assertEqual(self.service.fuzzy_search_products("   "), [])
+        self.assertEqual(self.service.fuzzy_search_products("coffee", limit=0), [])
+
+    def test_typo_ranks_best_match_first(self):
+        results = self.service.fuzzy_search_products("cofee beens")
+        self.assertEqual(results[0][0].sku, "P1")
+        self.assertTrue(0 < results[0][1] <= 1)
+        scores = [score for _p, score in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_ties_keep_catalogue_order_and_limit(self):
+        results = self.service.fuzzy_search_products("tea", min_score=0.1)
+        self.assertEqual(self._skus(results)[:2], ["P2", "P4"])
+        self.assertEqual(len(self.service.fuzzy_search_products("tea", limit=1, min_score=0.1)), 1)
+
+    def test_min_score_filters(self):
+        self.assertEqual(self.service.fuzzy_search_products("zebra"), [])
+        self.assertEqual(self.service.fuzzy_search_products("coffee", min_score=1.0), [])
+
+    def test_index_follows_changes(self):
+        self.repo.update_product("P5", "Coffee Beans Decaf", "D", 1, 1.0, None)
+        self.repo.remove_by_sku("P1")
+        self.assertEqual(self._skus(self.service.fuzzy_search_products("coffee beans"))[0], "P5")
+        self.assertNotIn("P1", self._skus(self.service.fuzzy_search_products("coffee beans")))
+
+    def test_index_matches_scan(self):
+        rng = random.Random(13)
+        words = ["coffee", "beans", "tea", "green", "milk", "oat", "rice", "olive", "oil", "salt"]
+        self.repo.products = [
+            Product(f"S{i}", " ".join(rng.choice(words) for _ in range(rng.randint(1, 3))), "D", 1, 1.0, None, True)
+            for i in range(200)
+        ]
+        for query in ["cofee", "grean tea", "ric oil", "o", "salt olive milk"]:
+            for min_score in [0.2, 0.5]:
+                self.assertEqual(self.service.fuzzy_search_products(query, 15, min_score),
+                                 self.scan.fuzzy_search_products(query, 15, min_score))
+
+    def test_overlap_counts_pruning(self):
+        index = TrigramIndex(fuzzy_fields, word_trigrams)
+        index.on_reset(self.repo.get_all_products())
+        grams = word_trigrams("coffee beans")
+        full = index.overlap_counts(grams)
+        pruned = index.overlap_counts(grams, 5)
+        self.assertEqual(pruned, {sku: n for sku, n in full.items() if n >= 5})
+        self.assertEqual(full["P1"], len(grams))
+
+
+if __name__ == "__main__":
+    unittest.main()
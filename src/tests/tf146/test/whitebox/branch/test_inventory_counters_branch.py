@@ -0,0 +1,102 @@
+# File: src/tests/tf146/test/whitebox/branch/test_inventory_counters_branch.py
+#
+# White-Box (Branch) tests for InventoryCounters kept by ProductRepo.
+# Branches: add (new / duplicate SKU), change (same / different state, active toggle),
+# remove (known / unknown), reset on load + batch rollback, verify() clean vs drifted,
+# DashboardChartService counters path == single-pass path.
+
+import os
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+from Service.dashboard_chart_service import DashboardChartService
+
+
+class TestBranch_InventoryCounters(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = ProductRepo(os.path.join(self.tmpdir.name, "products.txt"))
+        self.repo.products = [
+            Product("A", "A", "D", 0, 1.0, None, True),
+            Product("B", "B", "D", 5, 2.0, "Food", True),
+            Product("C", "C", "D", 6, 1.0, "Food", True),
+            Product("D", "D", "D", 21, 0.5, "Drinks", True),
+            Product("E", "E", "D", 2, 3.0, "X", False),
+        ]
+        self.counters = self.repo.get_counters()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _same_as_scan(self):
+        self.assertEqual(self.repo.verify_counters(), {})
+        for threshold in [0, 1, 5, 6, 20, 100]:
+            fast = DashboardChartService(self.repo).get_dashboard_stats(threshold)
+            slow = DashboardChartService(self.repo, use_numpy=False, use_counters=False).get_dashboard_stats(threshold)
+            self.assertEqual(fast, slow)
+
+    def test_initial_counts(self):
+        self.assertEqual(self.counters.total_products, 5)
+        self.assertEqual(self.counters.total_units, 34)
+        self.assertEqual(self.counters.status_counts(5), {"in_stock": 2, "low_stock": 1, "out_of_stock": 1})
+        self.assertEqual(self.counters.summary_counts(5), (1, 1))
+        self._same_as_scan()
+
+    def test_add_and_duplicate_sku(self):
+        self.repo.add_product(Product("F", "F", "D", 3, 1.0, "Food", True))
+        self.assertEqual(self.counters.categories["Food"], 3)
+        self.repo.add_product(Product("F", "F2", "D", 99, 1.0, "Food", True))
+        self.assertEqual(self.counters.total_products, 6)
+        self._same_as_scan()
+
+    def test_update_and_active_toggle(self):
+        self.repo.update_product("B", "B", "D", 0, 2.0, "Drinks")
+        self.assertEqual(self.counters.status_counts(5)["out_of_stock"], 2)
+
+        product = self.repo.find_by_sku("E")
+        product.active = True
+        self.repo.save_product(product)
+        self.assertEqual(self.counters.active_products, 5)
+        self._same_as_scan()
+
+    def test_save_without_change_keeps_counts(self):
+        self.repo.save_product(self.repo.find_by_sku("C"))
+        self.assertEqual(self.counters.total_products, 5)
+        self._same_as_scan()
+
+    def test_remove_known_and_unknown(self):
+        self.repo.remove_by_sku("D")
+        self.repo.remove_by_sku("NOPE")
+        self.assertEqual(self.counters.total_products, 4)
+        self.assertNotIn("Drinks", self.counters.categories)
+        self._same_as_scan()
+
+    def test_load_resets(self):
+        self.repo.save_products()
+        self.repo.products = []
+        self.assertEqual(self.counters.total_products, 0)
+        self.repo.load_products()
+        self.assertEqual(self.counters.total_products, 5)
+        self._same_as_scan()
+
+    def test_batch_rollback_restores_counts(self):
+        with self.assertRaises(RuntimeError):
+            with self.repo.batch():
+                self.repo.update_product("A", "A", "D", 50, 1.0, None)
+                self.repo.remove_by_sku("B")
+                raise RuntimeError("boom")
+        self.assertEqual(self.counters.total_units, 34)
+        self._same_as_scan()
+
+    def test_verify_reports_drift(self):
+        # in-place edit that never went through the repo
+        self.repo.find_by_sku("D").quantity = 1
+        drift = self.repo.verify_counters()
+        self.assertIn("total_units", drift)
+        self.assertEqual(drift["total_units"], (34, 14))
+
+
+if __name__ == "__main__":
+    unittest.main()
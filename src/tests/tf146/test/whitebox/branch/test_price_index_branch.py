@@ -0,0 +1,101 @@
+# File: src/tests/tf146/test/whitebox/branch/test_price_index_branch.py
+#
+# White-Box (Branch) tests for the "price" / "name" sorted indexes and pre-sorted listings.
+# Branches: price range bounds, price kept in step with updates, filter_products price
+# filters (valid / invalid ignored), pre-sorted walk used (big result) vs plain sort
+# (small result / duplicate SKU / broken price), ties kept in catalogue order,
+# query_products walking the order index (asc / desc, paging) == scan.
+
+import os
+import random
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+from Service.product_service import ProductService
+
+
+class _PlainRepo:
+    def __init__(self, repo):
+        self.repo = repo
+
+    def get_all_products(self):
+        return self.repo.get_all_products()
+
+
+class TestBranch_PriceIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = ProductRepo(os.path.join(self.tmpdir.name, "products.txt"))
+        rng = random.Random(16)
+        self.repo.products = [
+            Product(f"P{i:03d}", rng.choice(["apple", "Apple", "pear", "fig"]), "D",
+                    rng.randint(0, 5), rng.choice([1.0, 2.5, 5.0, 7.25, 20.0, 30.0]),
+                    rng.choice(["Food", "Drinks"]), rng.random() > 0.2)
+            for i in range(120)
+        ]
+        self.service = ProductService(self.repo, None)
+        self.scan = ProductService(_PlainRepo(self.repo), None)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _skus(self, products):
+        return [p.sku for p in products]
+
+    def test_price_range(self):
+        index = self.repo.get_sorted_index("price")
+        expected = sorted(p.sku for p in self.repo.get_all_products() if 5 <= p.price <= 20)
+        self.assertEqual(sorted(index.range(5, 20)), expected)
+        self.assertEqual(index.count_range(5, 20), len(expected))
+        self.assertEqual(index.count_range(21, 29), 0)
+
+    def test_price_follows_update(self):
+        self.repo.update_product("P000", "apple", "D", 1, 99.0, "Food")
+        self.assertEqual(self.repo.get_sorted_index("price").range(low=50), ["P000"])
+
+    def test_filter_products_price_range(self):
+        results = self.service.filter_products("food", min_price="5", max_price=20)
+        self.assertTrue(results)
+        for p in results:
+            self.assertTrue(5 <= p.price <= 20 and p.category == "Food")
+        self.assertEqual(self._skus(self.service.filter_products(max_price="cheap")),
+                         self._skus(self.service.filter_products()))
+
+    def test_presorted_matches_plain_sort(self):
+        for sort_by in ["name", "quantity", "price"]:
+            for category in [None, "food"]:
+                self.assertEqual(self._skus(self.service.filter_products(category, sort_by=sort_by)),
+                                 self._skus(self.scan.filter_products(category, sort_by=sort_by)))
+
+    def test_presorted_used_only_when_it_pays(self):
+        everything = list(self.repo.get_all_products())
+        self.assertIsNotNone(self.service._presorted(everything, "price"))
+        self.assertIsNone(self.service._presorted(everything[:5], "price"))
+        self.assertIsNone(self.service._presorted(everything + everything[:1], "price"))
+
+    def test_broken_price_falls_back(self):
+        self.repo.find_by_sku("P001").price = "n/a"
+        self.repo.save_products()
+        self.assertIsNone(self.service._order_index("price"))
+        self.assertIsNotNone(self.service._order_index("name"))
+
+    def test_query_walk_matches_scan(self):
+        for order_by in ["sku", "name", "quantity", "price"]:
+            for descending in [False, True]:
+                for limit, offset in [(None, 0), (7, 0), (7, 50)]:
+                    self.assertEqual(
+                        self._skus(self.service.query_products(active=True, order_by=order_by,
+                                                               descending=descending, limit=limit, offset=offset)),
+                        self._skus(self.scan.query_products(active=True, order_by=order_by,
+                                                            descending=descending, limit=limit, offset=offset)))
+
+    def test_query_price_plan(self):
+        self.assertEqual(self.service.explain_query(min_price=25, category="food")["index"], "price")
+        self.assertEqual(self._skus(self.service.query_products(min_price=25, max_price=40, category="food")),
+                         self._skus(self.scan.query_products(min_price=25, max_price=40, category="food")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# File: src/tests/tf146/test/whitebox/branch/test_product_columns_branch.py
+#
+# White-Box (Branch) tests for the packed column view kept by ProductRepo.
+# Branches: build on first use, add/change/remove (swap-last + last row), duplicate SKU,
+# bad quantity/price text, dashboard services using the columns.
+
+import os
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+from Repo.product_columns import ProductColumns, columns_for
+from Service.dashboard_chart_service import DashboardChartService
+from Service.product_service import ProductService
+
+
+class TestBranch_ProductColumns(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.products_file = os.path.join(self.tmpdir.name, "products.txt")
+        with open(self.products_file, "w") as f:
+            f.write("A,ProdA,Desc,0,1.5,,ACTIVE\n")
+            f.write("B,ProdB,Desc,3,2.0,Food,ACTIVE\n")
+            f.write("C,ProdC,Desc,10,1.0,Food,ACTIVE\n")
+            f.write("D,ProdD,Desc,25,4.0,Drinks,ACTIVE\n")
+            f.write("E,ProdE,Desc,5,1.0,Snacks,INACTIVE\n")
+        self.repo = ProductRepo(filename=self.products_file)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assertMatchesProducts(self, columns):
+        # every column row agrees with the Product object it came from
+        self.assertEqual(len(self.repo.get_all_products()), len(columns))
+        for p in self.repo.get_all_products():
+            row = columns.rows[p.sku]
+            self.assertEqual(p.sku, columns.skus[row])
+            self.assertEqual(int(p.quantity), columns.quantities[row])
+            self.assertEqual(float(p.price), columns.prices[row])
+            self.assertEqual(1 if p.active else 0, columns.active[row])
+            self.assertEqual(p.category or "", columns.category_names[columns.category_codes[row]])
+
+    def test_columns_built_on_first_use(self):
+        columns = self.repo.get_columns()
+        self.assertIs(columns, self.repo.get_columns())
+        self.assertIs(columns, columns_for(self.repo))
+        self.assertMatchesProducts(columns)
+        self.assertEqual(43, columns.total_units())
+        self.assertEqual({"": 1, "Food": 2, "Drinks": 1}, columns.category_counts())
+
+    def test_columns_follow_repo_changes(self):
+        columns = self.repo.get_columns()
+        self.repo.add_product(Product("F", "ProdF", "D", 7, 3.0, "Food", True))
+        self.repo.update_product("B", "ProdB", "D", 8, 2.0, "Drinks")
+        p = self.repo.find_by_sku("D")
+        p.active = False
+        self.repo.save_product(p)
+        self.repo.remove_by_sku("A")   # middle row -> last row swapped in
+        self.repo.remove_by_sku("F")   # last row
+        self.assertMatchesProducts(columns)
+
+        self.repo.load_products()
+        self.assertMatchesProducts(columns)
+
+    def test_bad_numbers_default_to_zero(self):
+        columns = ProductColumns()
+        columns.on_add(Product("X", "N", "D", "abc", None, None, True))
+        columns.on_add(Product("X", "Dup", "D", 9, 1.0, None, True))  # duplicate ignored
+        self.assertEqual([0], list(columns.quantities))
+        self.assertEqual([0.0], list(columns.prices))
+        columns.on_remove(Product("NOPE", "N", "D", 1, 1.0, None))
+        columns.on_change(Product("Y", "N", "D", 2, 1.0, None))      # unknown -> added
+        self.assertEqual(2, len(columns))
+
+    def test_total_value(self):
+        columns = self.repo.get_columns()
+        self.assertAlmostEqual(0 + 6.0 + 10.0 + 100.0 + 5.0, columns.total_value())
+        self.assertAlmostEqual(116.0, columns.total_value(active_only=True))
+
+    def test_services_match_plain_loops(self):
+        chart = DashboardChartService(self.repo)
+        self.assertEqual({"in_stock": 2, "low_stock": 1, "out_of_stock": 1},
+                         chart.get_inventory_status_counts(threshold=5))
+        self.assertEqual({"0": 1, "1-5": 1, "6-20": 1, "21+": 1}, chart.get_stock_bucket_counts())
+        self.assertEqual({"Uncategorised": 1, "Food": 2, "Drinks": 1}, chart.get_category_counts())
+
+        summary = ProductService(self.repo, None).get_dashboard_summary(threshold=5)
+        self.assertEqual(5, summary["total_products"])
+        self.assertEqual(43, summary["total_units"])
+        self.assertEqual(1, summary["out_of_stock_count"])
+        self.assertEqual(1, summary["low_stock_count"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+# File: src/tests/tf146/test/whitebox/branch/test_product_indexes_branch.py
+#
+# White-Box (Branch) tests for ProductIndexes (category -> SKUs, ACTIVE / INACTIVE sets)
+# and the ProductService paths that use them.
+# Branches: None vs text category, category change / same key, active toggle, remove
+# (empty category dropped), duplicate SKU ignored, indexed vs scan results (same order).
+
+import os
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+from Service.product_service import ProductService
+
+
+class _PlainRepo:
+    # no indexes -> ProductService falls back to scanning
+    def __init__(self, products):
+        self.products = products
+
+    def get_all_products(self):
+        return self.products
+
+
+class TestBranch_ProductIndexes(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = ProductRepo(os.path.join(self.tmpdir.name, "products.txt"))
+        self.repo.products = [
+            Product("A", "Apple", "D", 3, 1.0, "Food", True),
+            Product("B", "Beer", "D", 10, 2.0, " drinks ", True),
+            Product("C", "Cake", "D", 1, 1.5, "food ", False),
+            Product("D", "Donut", "D", 0, 0.5, None, True),
+            Product("E", "Egg", "D", 2, 0.2, "FOOD", True),
+        ]
+        self.indexes = self.repo.get_indexes()
+        self.service = ProductService(self.repo, None)
+        self.service.write_audit = lambda msg: None
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _skus(self, products):
+        return [p.sku for p in products]
+
+    def _same_as_scan(self):
+        plain = ProductService(_PlainRepo(list(self.repo.get_all_products())), None)
+        for category in ["food", " Drinks", "none", None]:
+            for max_qty in [None, 2]:
+                self.assertEqual(
+                    self._skus(self.service.filter_products(category, max_qty)),
+                    self._skus(plain.filter_products(category, max_qty)))
+        for threshold in [0, 2, 5]:
+            self.assertEqual(self._skus(self.service.get_low_stock_products(threshold)),
+                             self._skus(plain.get_low_stock_products(threshold)))
+
+    def test_initial_index(self):
+        self.assertEqual(self.indexes.category_skus(" Food"), {"A", "C", "E"})
+        self.assertEqual(self.indexes.category_skus("drinks"), {"B"})
+        self.assertEqual(self.indexes.inactive_skus(), {"C"})
+        self.assertNotIn(None, self.indexes.by_category)
+        self._same_as_scan()
+
+    def test_filter_keeps_catalogue_order(self):
+        self.assertEqual(self._skus(self.service.filter_products("food")), ["A", "C", "E"])
+
+    def test_category_change_moves_sku(self):
+        self.repo.update_product("B", "Beer", "D", 10, 2.0, "Food")
+        self.assertEqual(self.indexes.category_skus("food"), {"A", "B", "C", "E"})
+        self.assertNotIn("drinks", self.indexes.by_category)
+        self._same_as_scan()
+
+    def test_quantity_change_keeps_index(self):
+        self.repo.update_product("A", "Apple", "D", 99, 1.0, "Food")
+        self.assertEqual(self.indexes.category_skus("food"), {"A", "C", "E"})
+        self._same_as_scan()
+
+    def test_active_toggle(self):
+        self.service.deactivate_product("A")
+        self.service.reactivate_product("C")
+        self.assertEqual(self.indexes.inactive_skus(), {"A"})
+        self.assertIn("C", self.indexes.active_skus())
+        self._same_as_scan()
+
+    def test_remove_and_add(self):
+        self.repo.remove_by_sku("B")
+        self.assertEqual(self.indexes.category_skus("drinks"), set())
+        self.repo.add_product(Product("F", "Fig", "D", 1, 1.0, "Food", True))
+        self.repo.add_product(Product("F", "Fig 2", "D", 1, 1.0, "Other", True))
+        self.assertEqual(self.indexes.category_skus("other"), set())
+        self.assertEqual(self._skus(self.service.filter_products("food")), ["A", "C", "E", "F"])
+
+    def test_products_for_skus_skips_unknown(self):
+        self.assertEqual(self._skus(self.repo.products_for_skus({"E", "NOPE", "A"})), ["A", "E"])
+
+
+if __name__ == "__main__":
+    unittest.main()
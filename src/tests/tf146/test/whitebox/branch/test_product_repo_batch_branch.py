@@ -0,0 +1,126 @@
+# File: src/tests/tf146/test/whitebox/branch/test_product_repo_batch_branch.py
+#
+# White-Box (Branch) tests for ProductRepo.batch().
+# Branches: snapshot vs journal flush, rollback on error (only products the batch reached),
+# nested batch, empty batch.
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+
+
+class TestBranch_ProductRepoBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.products_file = os.path.join(self.tmpdir.name, "products.txt")
+        with open(self.products_file, "w") as f:
+            f.write("A,ProdA,Desc,1,1.0,Food,ACTIVE\n")
+            f.write("B,ProdB,Desc,2,2.0,Food,ACTIVE\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_snapshot_mode_writes_once(self):
+        repo = ProductRepo(self.products_file)
+        with patch.object(repo, "_write_snapshot", wraps=repo._write_snapshot) as write:
+            with repo.batch():
+                for i in range(50):
+                    p = repo.find_by_sku("A")
+                    p.quantity += 1
+                    repo.save_product(p)
+                repo.add_product(Product("C", "ProdC", "Desc", 3, 3.0, None, True))
+                self.assertEqual(0, write.call_count)
+            self.assertEqual(1, write.call_count)
+
+        reloaded = ProductRepo(self.products_file)
+        self.assertEqual(51, reloaded.get_product_quantity("A"))
+        self.assertIsNotNone(reloaded.find_by_sku("C"))
+
+    def test_journal_mode_appends_one_record_per_sku(self):
+        repo = ProductRepo(self.products_file, journal=True)
+        with repo.batch():
+            for i in range(10):
+                p = repo.find_by_sku("A")
+                p.quantity += 1
+                repo.save_product(p)
+            repo.remove_by_sku("B")
+            repo.add_product(Product("B", "NewB", "Desc", 5, 2.0, None, True))
+
+        with open(repo.journal_filename) as f:
+            records = f.read().splitlines()
+        self.assertEqual(["U,A,ProdA,Desc,11,1.0,Food,ACTIVE", "D,B", "U,B,NewB,Desc,5,2.0,,ACTIVE"], records)
+
+        reloaded = ProductRepo(self.products_file)
+        self.assertEqual(["A", "B"], [p.sku for p in reloaded.get_all_products()])
+        self.assertEqual("NewB", reloaded.find_by_sku("B").name)
+
+    def test_error_rolls_back_memory_and_writes_nothing(self):
+        repo = ProductRepo(self.products_file, journal=True)
+        with open(self.products_file) as f:
+            before = f.read()
+
+        with self.assertRaises(RuntimeError):
+            with repo.batch():
+                p = repo.find_by_sku("A")
+                p.quantity = 999
+                p.active = False
+                repo.save_product(p)
+                repo.remove_by_sku("B")
+                raise RuntimeError("boom")
+
+        self.assertEqual(1, repo.get_product_quantity("A"))
+        self.assertTrue(repo.product_active("A"))
+        self.assertEqual("ProdB", repo.find_by_sku("B").name)
+        self.assertEqual(1, repo.position_of("B"))
+        with open(self.products_file) as f:
+            self.assertEqual(before, f.read())
+        self.assertFalse(os.path.exists(repo.journal_filename))
+
+    def test_rollback_state_saved_only_for_products_the_batch_reaches(self):
+        repo = ProductRepo(self.products_file)
+        b = repo.find_by_sku("B")
+        with self.assertRaises(RuntimeError):
+            with repo.batch():
+                repo.update_product("A", "N", "D", 4, 1.0, None)
+                self.assertEqual([repo.find_by_sku("A")], [p for p, _state in repo._batch["saved"].values()])
+                b.quantity = 50   # changed behind the batch's back (not handed out by it)
+                raise RuntimeError("boom")
+
+        self.assertEqual("ProdA", repo.find_by_sku("A").name)
+        self.assertEqual(50, repo.get_product_quantity("B"))
+
+    def test_rollback_restores_products_changed_through_get_all_products(self):
+        repo = ProductRepo(self.products_file)
+        with self.assertRaises(RuntimeError):
+            with repo.batch():
+                for p in repo.get_all_products():
+                    p.quantity = 0
+                repo.save_products()
+                raise RuntimeError("boom")
+
+        self.assertEqual([1, 2], [p.quantity for p in repo.get_all_products()])
+
+    def test_nested_batch_flushes_with_outer(self):
+        repo = ProductRepo(self.products_file)
+        with patch.object(repo, "_write_snapshot", wraps=repo._write_snapshot) as write:
+            with repo.batch():
+                with repo.batch():
+                    repo.update_product("A", "N", "D", 4, 1.0, None)
+                self.assertEqual(0, write.call_count)
+                repo.save_products()
+            self.assertEqual(1, write.call_count)
+
+    def test_empty_batch_writes_nothing(self):
+        repo = ProductRepo(self.products_file)
+        with patch.object(repo, "_write_snapshot") as write:
+            with repo.batch():
+                repo.find_by_sku("A")
+        write.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
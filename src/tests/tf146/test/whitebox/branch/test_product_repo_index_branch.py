@@ -0,0 +1,82 @@
+# File: src/tests/tf146/test/whitebox/branch/test_product_repo_index_branch.py
+#
+# White-Box (Branch) tests for the SKU index inside ProductRepo.
+# Real ProductRepo + temporary text files so src/data/* is never touched.
+
+import os
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+
+
+class TestBranch_ProductRepoSkuIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.products_file = os.path.join(self.tmpdir.name, "products.txt")
+        with open(self.products_file, "w") as f:
+            f.write("A,ProdA,Desc,1,1.0,Food,ACTIVE\n")
+            f.write("B,ProdB,Desc,2,2.0,Food,ACTIVE\n")
+            f.write("C,ProdC,Desc,3,3.0,,INACTIVE\n")
+        self.repo = ProductRepo(filename=self.products_file)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assertIndexConsistent(self):
+        products = self.repo.get_all_products()
+        for i in range(len(products)):
+            self.assertIs(products[i], self.repo.find_by_sku(products[i].sku))
+            self.assertEqual(i, self.repo.position_of(products[i].sku))
+
+    def test_load_builds_index(self):
+        self.assertEqual("ProdB", self.repo.find_by_sku("B").name)
+        self.assertIsNone(self.repo.find_by_sku("MISSING"))
+        self.assertIndexConsistent()
+
+    def test_add_product_indexed(self):
+        self.repo.add_product(Product("D", "ProdD", "Desc", 4, 4.0, None, True))
+        self.assertEqual(3, self.repo.position_of("D"))
+        self.assertIndexConsistent()
+
+    def test_remove_shifts_positions(self):
+        self.assertTrue(self.repo.remove_by_sku("A"))
+        self.assertFalse(self.repo.remove_by_sku("A"))
+        self.assertIsNone(self.repo.find_by_sku("A"))
+        self.assertEqual(0, self.repo.position_of("B"))
+        self.assertIndexConsistent()
+
+    def test_save_product_replaces_in_place(self):
+        replacement = Product("B", "NewB", "Desc", 9, 2.0, "Food", True)
+        self.assertTrue(self.repo.save_product(replacement))
+        self.assertIs(replacement, self.repo.find_by_sku("B"))
+        self.assertIs(replacement, self.repo.get_all_products()[1])
+        self.assertFalse(self.repo.save_product(Product("Z", "Z", "D", 1, 1.0, None)))
+
+    def test_update_product_keeps_index(self):
+        self.assertTrue(self.repo.update_product("C", "NewC", "D", 5, 5.0, "Cat"))
+        self.assertEqual("NewC", self.repo.find_by_sku("C").name)
+        self.assertEqual(5, self.repo.get_product_quantity("C"))
+        self.assertIndexConsistent()
+
+    def test_replacing_products_list_rebuilds_index(self):
+        self.repo.products = []
+        self.assertIsNone(self.repo.find_by_sku("A"))
+        self.repo.add_product(Product("A", "Again", "D", 1, 1.0, None))
+        self.assertEqual(0, self.repo.position_of("A"))
+
+    def test_duplicate_sku_first_occurrence_wins(self):
+        with open(self.products_file, "a") as f:
+            f.write("A,Duplicate,Desc,7,1.0,,ACTIVE\n")
+        self.repo.load_products()
+        self.assertEqual("ProdA", self.repo.find_by_sku("A").name)
+
+        # removing the first copy exposes the later one
+        self.repo.remove_by_sku("A")
+        self.assertEqual("Duplicate", self.repo.find_by_sku("A").name)
+        self.assertEqual(2, self.repo.position_of("A"))
+
+
+if __name__ == "__main__":
+    unittest.main()
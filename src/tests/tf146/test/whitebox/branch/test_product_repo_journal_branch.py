@@ -0,0 +1,113 @@
+# File: src/tests/tf146/test/whitebox/branch/test_product_repo_journal_branch.py
+#
+# White-Box (Branch) tests for ProductRepo journal mode.
+# Branches: append vs full rewrite, replay upsert/delete, torn record, compaction,
+# duplicate SKU add.
+
+import os
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+from Service.stock_service import StockService
+import Service.stock_service as stock_service_module
+
+
+class TestBranch_ProductRepoJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.products_file = os.path.join(self.tmpdir.name, "products.txt")
+        with open(self.products_file, "w") as f:
+            f.write("A,ProdA,Desc,1,1.0,Food,ACTIVE\n")
+            f.write("B,ProdB,Desc,2,2.0,Food,ACTIVE\n")
+
+        self.old_audit = stock_service_module.AUDIT_FILE
+        stock_service_module.AUDIT_FILE = os.path.join(self.tmpdir.name, "audit.txt")
+
+    def tearDown(self):
+        stock_service_module.AUDIT_FILE = self.old_audit
+        self.tmpdir.cleanup()
+
+    def _read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_journal_mode_appends_instead_of_rewriting(self):
+        repo = ProductRepo(self.products_file, journal=True)
+        before = self._read(self.products_file)
+
+        StockService(repo).record_stock_increase("A", 4)
+
+        self.assertEqual(before, self._read(self.products_file))
+        self.assertEqual("U,A,ProdA,Desc,5,1.0,Food,ACTIVE\n", self._read(repo.journal_filename))
+
+    def test_load_replays_journal_over_snapshot(self):
+        repo = ProductRepo(self.products_file, journal=True)
+        repo.add_product(Product("C", "ProdC", "Desc", 3, 3.0, None, True))
+        repo.update_product("A", "NewA", "Desc", 9, 1.5, "Food")
+        repo.remove_by_sku("B")
+
+        reloaded = ProductRepo(self.products_file)
+        self.assertEqual(["A", "C"], [p.sku for p in reloaded.get_all_products()])
+        self.assertEqual("NewA", reloaded.find_by_sku("A").name)
+        self.assertEqual(9, reloaded.get_product_quantity("A"))
+        self.assertIsNone(reloaded.find_by_sku("B"))
+
+    def test_torn_and_bad_records_are_ignored(self):
+        repo = ProductRepo(self.products_file, journal=True)
+        with open(repo.journal_filename, "w") as f:
+            f.write("U,A,ProdA,Desc,7,1.0,Food,ACTIVE\n")
+            f.write("U,B,ProdB,Desc,notanumber,2.0,Food,ACTIVE\n")
+            f.write("D,NOPE\n")
+            f.write("U,B,ProdB,Desc,99,2.0")  # no newline -> cut off mid-write
+
+        repo.load_products()
+        self.assertEqual(7, repo.get_product_quantity("A"))
+        self.assertEqual(2, repo.get_product_quantity("B"))
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        repo = ProductRepo(self.products_file, journal=True, compact_threshold=60)
+        service = StockService(repo)
+        service.record_stock_increase("A", 1)
+        self.assertTrue(os.path.getsize(repo.journal_filename) > 0)
+
+        service.record_stock_increase("A", 1)  # pushes journal past the threshold
+
+        self.assertEqual(0, os.path.getsize(repo.journal_filename))
+        self.assertIn("A,ProdA,Desc,3,1.0,Food,ACTIVE", self._read(self.products_file))
+        self.assertEqual(3, ProductRepo(self.products_file).get_product_quantity("A"))
+
+    def _rows(self, repo):
+        return [(p.sku, p.name) for p in repo.get_all_products()]
+
+    def test_duplicate_add_keeps_both_rows_after_reload(self):
+        for journal in (False, True):
+            with self.subTest(journal=journal):
+                filename = os.path.join(self.tmpdir.name, "journal.txt" if journal else "snapshot.txt")
+                with open(filename, "w") as f:
+                    f.write(self._read(self.products_file))
+                repo = ProductRepo(filename, journal=journal)
+                repo.add_product(Product("A", "SecondA", "Desc", 5, 1.0, "Food", True))
+                with repo.batch():
+                    repo.add_product(Product("B", "SecondB", "Desc", 6, 1.0, "Food", True))
+                    repo.update_product("B", "NewB", "Desc", 7, 2.0, "Food")
+
+                expected = [("A", "ProdA"), ("B", "NewB"), ("A", "SecondA"), ("B", "SecondB")]
+                self.assertEqual(expected, self._rows(repo))
+                self.assertEqual(expected, self._rows(ProductRepo(filename, journal=journal)))
+                self.assertEqual("ProdA", repo.find_by_sku("A").name)
+
+    def test_full_save_clears_journal(self):
+        repo = ProductRepo(self.products_file, journal=True)
+        repo.update_product("B", "ProdB", "Desc", 8, 2.0, "Food")
+
+        plain = ProductRepo(self.products_file)
+        plain.save_products()
+
+        self.assertEqual(0, os.path.getsize(repo.journal_filename))
+        self.assertEqual(8, ProductRepo(self.products_file).get_product_quantity("B"))
+
+
+if __name__ == "__main__":
+    unittest.main()
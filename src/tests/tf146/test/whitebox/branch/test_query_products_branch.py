@@ -0,0 +1,155 @@
+# File: src/tests/tf146/test/whitebox/branch/test_query_products_branch.py
+#
+# White-Box (Branch) tests for ProductService.query_products and its planner.
+# Branches: no filters (full scan), each index picked when it's the most selective
+# (category / active / quantity / active_quantity / text / supplier), short text not
+# indexable, invalid numbers / order_by / paging, order_by with and without limit,
+# descending, offset, supplier without links repo, indexed result == scan result.
+
+import os
+import random
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+from Service.product_service import ProductService
+
+
+class _PlainRepo:
+    def __init__(self, repo):
+        self.repo = repo
+
+    def get_all_products(self):
+        return self.repo.get_all_products()
+
+
+class _Links:
+    def __init__(self, links):
+        self.links = links
+
+    def get_products_for_supplier(self, supplier_id):
+        return [sku for s_id, sku in self.links if s_id == supplier_id]
+
+
+class TestBranch_QueryProducts(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = ProductRepo(os.path.join(self.tmpdir.name, "products.txt"))
+        rng = random.Random(15)
+        products = []
+        for i in range(300):
+            products.append(Product(
+                f"P{i:03d}",
+                rng.choice(["Coffee", "Tea", "Milk", "Bread"]) + f" {i}",
+                rng.choice(["fresh", "organic", "value pack"]),
+                rng.randint(0, 50),
+                round(rng.uniform(0.5, 20), 2),
+                rng.choice([None, "Food", " food", "Drinks", "Bakery"]),
+                rng.random() > 0.1,
+            ))
+        products[0].category = "Rare"
+        self.repo.products = products
+        links = _Links([("SUP1", "P010"), ("SUP1", "P020"), ("SUP2", "P030"), ("SUP1", "MISSING")])
+        self.service = ProductService(self.repo, None, links)
+        self.scan = ProductService(_PlainRepo(self.repo), None, links)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _skus(self, products):
+        return [p.sku for p in products]
+
+    def test_plan_choices(self):
+        self.assertEqual(self.service.explain_query()["index"], "full_scan")
+        self.assertEqual(self.service.explain_query(category="rare", active=True),
+                         {"index": "category", "estimated_rows": 1})
+        self.assertEqual(self.service.explain_query(active=False)["index"], "active")
+        self.assertEqual(self.service.explain_query(max_qty=0)["index"], "quantity")
+        self.assertEqual(self.service.explain_query(active=True, max_qty=0)["index"], "active_quantity")
+        self.assertEqual(self.service.explain_query(text="coffee 12", category="food")["index"], "text")
+        self.assertEqual(self.service.explain_query(text="te", category="rare")["index"], "category")
+        self.assertEqual(self.service.explain_query(supplier_id="SUP1", category="food"),
+                         {"index": "supplier", "estimated_rows": 3})
+        self.assertEqual(self.scan.explain_query(category="rare")["index"], "full_scan")
+
+    def test_chosen_index_fetches_its_own_rows(self):
+        # the planner's pick must fetch that index's candidates, not another option's
+        cases = [
+            ({"supplier_id": "SUP1", "category": "food", "active": True}, "supplier", 3),
+            ({"category": "rare", "active": True}, "category", 1),
+            ({"active": False, "category": "food"}, "active", None),
+        ]
+        for filters, index, rows in cases:
+            name, estimate, fetch = self.service._plan_query(self.service._query_criteria(**filters))
+            self.assertEqual(name, index)
+            fetched = fetch()
+            self.assertEqual(len(fetched), estimate)
+            if rows is not None:
+                self.assertEqual(len(fetched), rows)
+
+    def test_indexed_matches_scan(self):
+        rng = random.Random(16)
+        for _ in range(60):
+            filters = {}
+            if rng.random() < 0.4:
+                filters["category"] = rng.choice(["food", "Drinks ", "bakery", "nope"])
+            if rng.random() < 0.4:
+                filters["active"] = rng.choice([True, False])
+            if rng.random() < 0.4:
+                filters["min_qty"] = rng.randint(0, 30)
+            if rng.random() < 0.4:
+                filters["max_qty"] = rng.randint(0, 50)
+            if rng.random() < 0.3:
+                filters["min_price"] = rng.uniform(0, 10)
+            if rng.random() < 0.3:
+                filters["max_price"] = rng.uniform(5, 20)
+            if rng.random() < 0.3:
+                filters["text"] = rng.choice(["coffee", "ea", "organic", "1", "milk 2"])
+            if rng.random() < 0.2:
+                filters["supplier_id"] = rng.choice(["SUP1", "SUP2", "SUP3"])
+            order_by = rng.choice([None, "sku", "name", "quantity", "price"])
+            descending = rng.random() < 0.5
+            limit = rng.choice([None, 0, 1, 5, 20])
+            offset = rng.choice([0, 0, 3])
+
+            self.assertEqual(
+                self._skus(self.service.query_products(order_by=order_by, descending=descending,
+                                                       limit=limit, offset=offset, **filters)),
+                self._skus(self.scan.query_products(order_by=order_by, descending=descending,
+                                                    limit=limit, offset=offset, **filters)),
+                (filters, order_by, descending, limit, offset))
+
+    def test_heap_top_k_equals_full_sort(self):
+        everything = self.service.query_products(order_by="price", descending=True)
+        self.assertEqual(self._skus(self.service.query_products(order_by="price", descending=True,
+                                                                limit=10, offset=5)),
+                         self._skus(everything[5:15]))
+        prices = [float(p.price) for p in everything]
+        self.assertEqual(prices, sorted(prices, reverse=True))
+
+    def test_unordered_paging_is_catalogue_order(self):
+        self.assertEqual(self._skus(self.service.query_products(limit=3, offset=2)), ["P002", "P003", "P004"])
+
+    def test_results_follow_updates(self):
+        self.repo.update_product("P005", "Coffee 5", "fresh", 1000, 1.0, "Rare")
+        self.assertEqual(self._skus(self.service.query_products(category="RARE", min_qty=999)), ["P005"])
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            self.service.query_products(min_qty="x")
+        with self.assertRaises(ValueError):
+            self.service.query_products(max_price="cheap")
+        with self.assertRaises(ValueError):
+            self.service.query_products(order_by="colour")
+        with self.assertRaises(ValueError):
+            self.service.query_products(limit=-1)
+        with self.assertRaises(ValueError):
+            ProductService(self.repo, None).query_products(supplier_id="SUP1")
+
+    def test_blank_strings_are_ignored(self):
+        self.assertEqual(len(self.service.query_products(category=" ", min_qty="", text="  ")), 300)
+
+
+if __name__ == "__main__":
+    unittest.main()
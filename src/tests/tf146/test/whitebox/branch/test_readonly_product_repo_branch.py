@@ -0,0 +1,147 @@
+# File: src/tests/tf146/test/whitebox/branch/test_readonly_product_repo_branch.py
+#
+# White-Box (Branch) tests for the memory-mapped catalogue + ReadOnlyProductRepo.
+# Branches: catalogue written by the writer / built by the reader when missing or stale,
+# damaged header / payload rebuilt, same-size rewrite of products.txt rebuilt, SKU binary search hit / miss / duplicate SKU, journal overlay
+# (update in place, delete, re-add after delete, new product), refresh picks up writer
+# changes, prefix lookups, every write raises.
+
+import os
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.mmap_catalogue import MappedCatalogue, build_catalogue, catalogue_state
+from Repo.product_repo import ProductRepo
+from Repo.readonly_product_repo import ReadOnlyProductRepo
+
+
+class TestBranch_ReadOnlyProductRepo(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "products.txt")
+        with open(self.filename, "w") as f:
+            f.write("B2,Bolt,Steel,40,0.1,Hardware,ACTIVE\n")
+            f.write("A1,Apple,Red,5,0.5,,INACTIVE\n")
+            f.write("C3,Crème,Dairy,0,2.25,Food,ACTIVE\n")
+        self.readers = []
+
+    def tearDown(self):
+        for reader in self.readers:
+            reader.close()
+        self.tmpdir.cleanup()
+
+    def _reader(self):
+        reader = ReadOnlyProductRepo(self.filename)
+        self.readers.append(reader)
+        return reader
+
+    def _state(self, products):
+        return [vars(p) for p in products]
+
+    def test_matches_writer(self):
+        writer = ProductRepo(self.filename, mapped_catalogue=True)
+        self.assertIsNotNone(catalogue_state(self.filename + ".cat"))
+        reader = self._reader()
+        self.assertEqual(self._state(reader.get_all_products()), self._state(writer.get_all_products()))
+        self.assertEqual(reader.get_product_quantity("B2"), 40)
+        self.assertIs(reader.product_active("A1"), False)
+        self.assertIsNone(reader.find_by_sku("A1").category)
+        self.assertEqual(reader.find_by_sku("C3").name, "Crème")
+        self.assertIsNone(reader.find_by_sku("Z9"))
+        self.assertIsNone(reader.get_product_quantity("Z9"))
+        self.assertIs(reader.product_active("Z9"), False)
+
+    def test_reader_builds_missing_catalogue(self):
+        reader = self._reader()
+        self.assertTrue(os.path.exists(self.filename + ".cat"))
+        self.assertEqual([p.sku for p in reader.get_all_products()], ["B2", "A1", "C3"])
+
+    def test_damaged_catalogue_rebuilt(self):
+        with open(self.filename + ".cat", "wb") as f:
+            f.write(b"PRCM" + b"\0" * 10)
+        reader = self._reader()
+        self.assertEqual(reader.get_product_quantity("C3"), 0)
+
+    def test_damaged_payload_rebuilt(self):
+        ProductRepo(self.filename, mapped_catalogue=True)
+        with open(self.filename + ".cat", "r+b") as f:
+            f.seek(-3, os.SEEK_END)
+            f.write(b"XYZ")
+        self.assertIsNone(MappedCatalogue.open(self.filename + ".cat"))
+        reader = self._reader()
+        self.assertEqual(reader.find_by_sku("C3").name, "Crème")
+        self.assertIsNotNone(MappedCatalogue.open(self.filename + ".cat"))
+
+    def test_same_size_rewrite_rebuilt(self):
+        # another writer within the same mtime tick: new bytes, same size + mtime + inode
+        ProductRepo(self.filename, mapped_catalogue=True)
+        st = os.stat(self.filename)
+        with open(self.filename) as f:
+            text = f.read().replace("Bolt", "Nail")
+        with open(self.filename, "w") as f:
+            f.write(text)
+        os.utime(self.filename, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(self._reader().find_by_sku("B2").name, "Nail")
+
+    def test_no_temp_files_left(self):
+        writer = ProductRepo(self.filename, mapped_catalogue=True)
+        writer.add_product(Product("E5", "Egg", "Box", 12, 1.5, None, True))
+        self._reader()
+        self.assertEqual(sorted(os.listdir(self.tmpdir.name)), ["products.txt", "products.txt.cat"])
+
+    def test_journal_overlay(self):
+        writer = ProductRepo(self.filename, journal=True, mapped_catalogue=True)
+        writer.update_product("B2", "Bolt", "Steel", 39, 0.1, "Hardware")
+        writer.remove_by_sku("A1")
+        writer.add_product(Product("D4", "Drill", "Tool", 2, 30.0, None, True))
+        writer.remove_by_sku("C3")
+        writer.add_product(Product("C3", "Cream", "Dairy", 1, 2.0, "Food", True))
+
+        reader = self._reader()
+        self.assertEqual(self._state(reader.get_all_products()), self._state(writer.get_all_products()))
+        self.assertEqual(reader.get_product_quantity("B2"), 39)
+        self.assertIsNone(reader.find_by_sku("A1"))
+        self.assertEqual(reader.find_by_sku("C3").name, "Cream")
+
+    def test_refresh_follows_writer(self):
+        writer = ProductRepo(self.filename, journal=True, mapped_catalogue=True)
+        reader = self._reader()
+        writer.add_product(Product("E5", "Egg", "Box", 12, 1.5, None, True))
+        self.assertIsNone(reader.find_by_sku("E5"))
+        reader.refresh()
+        self.assertEqual(reader.get_product_quantity("E5"), 12)
+
+        writer.compact()  # new products.txt + catalogue, empty journal
+        self.assertEqual(self._state(reader.get_all_products()), self._state(writer.get_all_products()))
+
+    def test_prefix_lookups(self):
+        writer = ProductRepo(self.filename, journal=True, mapped_catalogue=True)
+        writer.add_product(Product("A0", "Axe", "Tool", 1, 9.0, None, True))
+        writer.remove_by_sku("A1")
+        reader = self._reader()
+        self.assertEqual(reader.skus_with_prefix("A"), ["A0"])
+        self.assertEqual(reader.complete_sku("", 2), ["A0", "B2"])
+        self.assertEqual(reader.complete_sku("B", 0), [])
+
+    def test_duplicate_sku_first_wins(self):
+        products = [Product("X", "first", "D", 1, 1.0, None, True),
+                    Product("X", "second", "D", 2, 1.0, None, True),
+                    Product("W", "w", "D", 3, 1.0, None, True)]
+        catalogue = MappedCatalogue(build_catalogue(products, (0, 0, 0, None)))
+        self.assertEqual(catalogue.find("X"), 0)
+        self.assertIsNone(catalogue.find("Y"))
+        self.assertEqual(catalogue.prefix(""), [2, 0, 1])
+
+    def test_writes_rejected(self):
+        reader = self._reader()
+        product = reader.find_by_sku("B2")
+        for call in [lambda: reader.add_product(product), lambda: reader.remove_by_sku("B2"),
+                     lambda: reader.update_product("B2", "n", "d", 1, 1.0, None),
+                     lambda: reader.save_product(product), reader.save_products]:
+            with self.assertRaises(ValueError):
+                call()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+# File: src/tests/tf146/test/whitebox/branch/test_repo_registry_branch.py
+#
+# White-Box (Branch) tests for RepoRegistry and the services that fall back to it.
+# Branches: repo created on first use / reused after, per-file keys, storage engine taken
+# from $STOCK_STORAGE unless given, services given repos vs falling back to the default
+# registry, no registry installed (plain repos of their own, no side files), one catalogue
+# shared between StockService and PurchaseOrderService.
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import Repo.repo_registry as repo_registry
+from Repo.repo_registry import RepoRegistry, installed_registry, set_default_registry
+from Repo.stock_repo import STORAGE_ENV, MemoryStockRepo
+from Service.purchase_order_service import PurchaseOrderService
+from Service.reservation_service import ReservationService
+from Service.stock_service import StockService
+
+
+class TestBranch_RepoRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmpdir.name
+        with open(os.path.join(self.data_dir, "products.txt"), "w") as f:
+            f.write("SKU1,Bolt,Steel,10,0.5,Hardware,ACTIVE\n")
+        self.previous = repo_registry._default_registry
+        self.registry = RepoRegistry(self.data_dir, product_options={})
+
+    def tearDown(self):
+        set_default_registry(self.previous)
+        self.tmpdir.cleanup()
+
+    def test_one_instance_per_file(self):
+        products = self.registry.product_repo()
+        self.assertIs(self.registry.product_repo(), products)
+        self.assertEqual(products.filename, os.path.join(self.data_dir, "products.txt"))
+        self.assertIsNot(self.registry.product_repo("other.txt"), products)
+
+        self.assertIs(self.registry.user_repo(), self.registry.user_repo())
+        self.assertIs(self.registry.reservation_repo(), self.registry.reservation_repo())
+        self.assertIs(self.registry.purchase_order_repo(), self.registry.purchase_order_repo())
+        self.assertEqual(self.registry.budget_repo().filename, os.path.join(self.data_dir, "budgets.txt"))
+
+    def test_storage_engine(self):
+        with mock.patch.dict(os.environ, {STORAGE_ENV: "memory"}):
+            self.assertIsInstance(self.registry.product_repo().storage, MemoryStockRepo)
+
+        engine = MemoryStockRepo()
+        registry = RepoRegistry(self.data_dir, product_options={"storage": engine})
+        with mock.patch.dict(os.environ, {STORAGE_ENV: "sqlite"}):
+            self.assertIs(registry.product_repo().storage, engine)
+
+    def test_services_share_the_catalogue(self):
+        set_default_registry(self.registry)
+        self.assertIs(installed_registry(), self.registry)
+
+        po_service = PurchaseOrderService()
+        stock_service = StockService(self.registry.product_repo())
+        stock_service.write_audit = lambda msg: None
+        self.assertIs(po_service.product_repo, stock_service.product_repo)
+        self.assertIs(po_service.repo, self.registry.purchase_order_repo())
+
+        stock_service.record_stock_increase("SKU1", 5)
+        self.assertEqual(po_service.product_repo.find_by_sku("SKU1").quantity, 15)
+
+        reservations = ReservationService(self.registry.product_repo())
+        self.assertIs(reservations.reservation_repo, self.registry.reservation_repo())
+
+    def test_services_given_repos(self):
+        set_default_registry(self.registry)
+        product_repo = object()
+        po_repo = object()
+        reservation_repo = object()
+        po_service = PurchaseOrderService(product_repo, po_repo)
+        self.assertIs(po_service.product_repo, product_repo)
+        self.assertIs(po_service.repo, po_repo)
+        self.assertIs(ReservationService(product_repo, reservation_repo).reservation_repo, reservation_repo)
+        self.assertEqual(self.registry._repos, {})  # nothing opened for them
+
+    def test_no_registry_installed(self):
+        set_default_registry(None)
+        first = PurchaseOrderService()
+        second = PurchaseOrderService()
+        self.assertIsNot(first.product_repo, second.product_repo)
+        self.assertIsNot(first.repo, second.repo)
+        self.assertFalse(first.product_repo.binary_snapshot)
+        self.assertFalse(first.product_repo.mapped_catalogue)
+        self.assertFalse(first.product_repo.journal)
+        self.assertIsNot(ReservationService(first.product_repo).reservation_repo,
+                         ReservationService(first.product_repo).reservation_repo)
+        self.assertIsNone(installed_registry())  # the fallbacks don't install one
+
+    def test_installed_registry_is_the_one_set(self):
+        set_default_registry(None)
+        self.assertIsNone(installed_registry())   # never created behind the caller's back
+        set_default_registry(self.registry)
+        self.assertIs(installed_registry(), self.registry)
+
+        registry = RepoRegistry()
+        self.assertEqual(registry.data_dir, "src/data")
+        self.assertEqual(registry.product_options, {})  # main.py passes PRODUCT_OPTIONS itself
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+# File: src/tests/tf146/test/whitebox/branch/test_sku_complete_branch.py
+#
+# White-Box (Branch) tests for ProductRepo.complete_sku / skus_with_prefix / suggest_skus
+# (sorted "sku" index + bisect).
+# Branches: empty prefix, limit hit / not hit / <= 0, no match, prefix at end of list,
+# add / remove kept in step, suggest falls back to shorter prefixes, nothing at all.
+
+import os
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+
+
+class TestBranch_SkuComplete(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = ProductRepo(os.path.join(self.tmpdir.name, "products.txt"))
+        self.repo.products = [
+            Product(sku, "N", "D", 1, 1.0, None, True)
+            for sku in ["ELEC-010", "FOOD-001", "ELEC-002", "ELEC-001", "ELECTRA", "ZED"]
+        ]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_complete_sorted_with_limit(self):
+        self.assertEqual(self.repo.complete_sku("ELEC-"), ["ELEC-001", "ELEC-002", "ELEC-010"])
+        self.assertEqual(self.repo.complete_sku("ELEC", 2), ["ELEC-001", "ELEC-002"])
+        self.assertEqual(self.repo.complete_sku("ELEC", 0), [])
+
+    def test_empty_prefix_and_no_match(self):
+        self.assertEqual(len(self.repo.complete_sku("", 100)), 6)
+        self.assertEqual(self.repo.complete_sku("ELEX"), [])
+        self.assertEqual(self.repo.complete_sku("ZZ"), [])
+        self.assertEqual(self.repo.complete_sku("ZED"), ["ZED"])
+
+    def test_prefix_range(self):
+        self.assertEqual(self.repo.skus_with_prefix("ELEC"), ["ELEC-001", "ELEC-002", "ELEC-010", "ELECTRA"])
+        self.assertEqual(self.repo.skus_with_prefix("elec"), [])
+
+    def test_follows_add_and_remove(self):
+        self.repo.add_product(Product("ELEC-005", "N", "D", 1, 1.0, None, True))
+        self.repo.remove_by_sku("ELEC-001")
+        self.assertEqual(self.repo.skus_with_prefix("ELEC-"), ["ELEC-002", "ELEC-005", "ELEC-010"])
+
+    def test_suggest_skus(self):
+        # typo in the last characters -> completions of the longest prefix that still matches
+        self.assertEqual(self.repo.suggest_skus("ELEC-09"), ["ELEC-001", "ELEC-002", "ELEC-010"])
+        self.assertEqual(self.repo.suggest_skus(" FOOD-9 "), ["FOOD-001"])
+        self.assertEqual(self.repo.suggest_skus("QQQ"), [])
+        self.assertEqual(self.repo.suggest_skus(""), [])
+        self.assertEqual(len(self.repo.suggest_skus("E", limit=2)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
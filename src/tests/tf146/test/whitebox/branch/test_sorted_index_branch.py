@@ -0,0 +1,105 @@
+# File: src/tests/tf146/test/whitebox/branch/test_sorted_index_branch.py
+#
+# White-Box (Branch) tests for SortedIndex ("active_quantity") and the low-stock queries using it.
+# Branches: range low/high None vs bound, ties by SKU, change key / same key, active toggle
+# (leave / rejoin index), broken qty skipped, remove, lowest-N (n <= 0, n > size), fallback scan.
+
+import os
+import tempfile
+import unittest
+
+from model.product import Product
+from Repo.product_repo import ProductRepo
+from Repo.sorted_index import SortedIndex, quantity_key
+from Service.product_service import ProductService
+
+
+class _PlainRepo:
+    def __init__(self, products):
+        self.products = products
+
+    def get_all_products(self):
+        return self.products
+
+
+class TestBranch_SortedIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = ProductRepo(os.path.join(self.tmpdir.name, "products.txt"))
+        self.repo.products = [
+            Product("A", "A", "D", 3, 1.0, None, True),
+            Product("B", "B", "D", 10, 1.0, None, True),
+            Product("C", "C", "D", 1, 1.0, None, False),
+            Product("D", "D", "D", 0, 1.0, None, True),
+            Product("E", "E", "D", 3, 1.0, None, True),
+        ]
+        self.index = self.repo.get_sorted_index("active_quantity")
+        self.service = ProductService(self.repo, None)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _skus(self, products):
+        return [p.sku for p in products]
+
+    def test_range_bounds(self):
+        self.assertEqual(self.index.range(), ["D", "A", "E", "B"])
+        self.assertEqual(self.index.range(high=3), ["D", "A", "E"])
+        self.assertEqual(self.index.range(low=3, high=3), ["A", "E"])
+        self.assertEqual(self.index.range(low=4), ["B"])
+        self.assertEqual(self.index.range(high=-1), [])
+
+    def test_smallest_and_largest(self):
+        self.assertEqual(self.index.smallest(2), ["D", "A"])
+        self.assertEqual(self.index.smallest(0), [])
+        self.assertEqual(self.index.smallest(99), ["D", "A", "E", "B"])
+        self.assertEqual(self.index.largest(1), ["B"])
+        self.assertEqual(self.index.largest(0), [])
+
+    def test_stock_change_moves_entry(self):
+        self.repo.update_product("B", "B", "D", 2, 1.0, None)
+        self.repo.update_product("A", "A", "D", 3, 2.0, None)  # same key
+        self.assertEqual(self.index.range(), ["D", "B", "A", "E"])
+        self.assertEqual(len(self.index), 4)
+
+    def test_active_toggle(self):
+        c = self.repo.find_by_sku("C")
+        c.active = True
+        self.repo.save_product(c)
+        self.assertEqual(self.index.range(high=1), ["D", "C"])
+
+        d = self.repo.find_by_sku("D")
+        d.active = False
+        self.repo.save_product(d)
+        self.assertEqual(self.index.range(high=1), ["C"])
+
+    def test_remove(self):
+        self.repo.remove_by_sku("A")
+        self.repo.remove_by_sku("C")
+        self.assertEqual(self.index.range(), ["D", "E", "B"])
+
+    def test_broken_quantity_not_indexed(self):
+        index = SortedIndex(quantity_key)
+        index.on_reset([Product("X", "X", "D", "oops", 1.0, None), Product("Y", "Y", "D", "4", 1.0, None)])
+        self.assertEqual(index.range(), ["Y"])
+
+    def test_low_stock_matches_scan(self):
+        plain = ProductService(_PlainRepo(list(self.repo.get_all_products())), None)
+        for threshold in [0, 1, 3, 10, 50]:
+            self.assertEqual(self._skus(self.service.get_low_stock_products(threshold)),
+                             self._skus(plain.get_low_stock_products(threshold)))
+        # catalogue order, not quantity order
+        self.assertEqual(self._skus(self.service.get_low_stock_products(3)), ["A", "D", "E"])
+
+    def test_lowest_stock_products(self):
+        plain = ProductService(_PlainRepo(list(self.repo.get_all_products())), None)
+        for n in [0, 1, 3, 10]:
+            self.assertEqual(self._skus(self.service.get_lowest_stock_products(n)),
+                             self._skus(plain.get_lowest_stock_products(n)))
+        self.assertEqual(self._skus(self.service.get_lowest_stock_products(2)), ["D", "A"])
+        self.assertIsNone(self.service.get_lowest_stock_products(-1))
+        self.assertIsNone(self.service.get_lowest_stock_products("x"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,255 @@
+# File: src/tests/tf146/test/whitebox/branch/test_sqlite_repos_branch.py
+#
+# White-Box (Branch) tests for the SQLite repos and the text -> SQLite migration.
+# Branches: WAL on a file database, first-of-duplicate-SKU visibility, found / not found on
+# every single-row update, batch commit vs rollback, prefix walk stopping at the first
+# non-match, reservation cancel only touching ACTIVE rows, empty budget table, migration of
+# every data file (journal included) and of a missing file.
+
+import os
+import tempfile
+import unittest
+
+from model.product import Product
+from model.purchase_order import PurchaseOrder, PurchaseOrderLine
+from model.reservation import Reservation
+from model.return_item import ReturnItem
+from model.stock_history_entry import StockHistoryEntry
+from model.user import User
+from Repo.product_repo import ProductRepo
+from Repo.sqlite_db import connect
+from Repo.sqlite_migrate import migrate
+from Repo.sqlite_repos import (SqliteBudgetRepo, SqliteFavouriteRepo, SqliteProductRepo,
+                               SqlitePurchaseOrderRepo, SqliteReservationRepo, SqliteReturnRepo,
+                               SqliteStockHistoryRepo, SqliteSupplierProductRepo, SqliteUserRepo)
+
+
+class TestBranch_SqliteRepos(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, "inventory.db")
+        self.conn = connect(self.db_file)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def test_wal_mode(self):
+        self.assertEqual(self.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_products(self):
+        repo = SqliteProductRepo(self.conn)
+        repo.add_product(Product("B2", "Bolt", "Steel", 40, 0.1, "Hardware", True))
+        repo.add_product(Product("A1", "Apple", "Red", 5, 0.5, None, False))
+        repo.add_product(Product("A1", "Dup", "Red", 9, 0.5, None, True))
+        repo.add_product(Product("AB", "Abacus", "Wood", 1, 3.0, None, True))
+
+        self.assertEqual([p.sku for p in repo.get_all_products()], ["B2", "A1", "A1", "AB"])
+        self.assertEqual(repo.find_by_sku("A1").name, "Apple")
+        self.assertIsNone(repo.find_by_sku("Z9"))
+        self.assertIs(repo.product_active("A1"), False)
+        self.assertIs(repo.product_active("Z9"), False)
+        self.assertEqual(repo.get_product_quantity("B2"), 40)
+        self.assertIsNone(repo.get_product_quantity("Z9"))
+        self.assertEqual(repo.position_of("AB"), 3)
+        self.assertIsNone(repo.position_of("Z9"))
+        self.assertEqual([p.sku for p in repo.products_for_skus({"AB", "B2", "Z9"})], ["B2", "AB"])
+        self.assertEqual([p.name for p in repo.products_for_skus(["A1"])], ["Apple"])   # first row only
+        self.assertLess(repo.catalogue_key("B2"), repo.catalogue_key("AB"))
+        self.assertIsNone(repo.catalogue_key("Z9"))
+        self.assertIsNone(repo.load_products())
+
+        self.assertEqual(repo.complete_sku("A"), ["A1", "AB"])
+        self.assertEqual(repo.complete_sku("A", 1), ["A1"])
+        self.assertEqual(repo.complete_sku("A", 0), [])
+        self.assertEqual(repo.skus_with_prefix("B"), ["B2"])
+        self.assertEqual(repo.suggest_skus("AX"), ["A1", "AB"])
+        self.assertEqual(repo.suggest_skus(""), [])
+
+        p = repo.find_by_sku("B2")
+        p.quantity -= 5
+        p.active = False
+        self.assertTrue(repo.save_product(p))
+        self.assertEqual(vars(repo.find_by_sku("B2")), vars(p))
+        self.assertFalse(repo.save_product(Product("Z9", "n", "d", 1, 1.0, None)))
+
+        self.assertTrue(repo.update_product("AB", "Abacus", "Oak", 2, 3.5, "Toys"))
+        self.assertEqual(repo.find_by_sku("AB").category, "Toys")
+        self.assertFalse(repo.update_product("Z9", "n", "d", 1, 1.0, None))
+
+        # removing the first A1 exposes the duplicate
+        self.assertTrue(repo.remove_by_sku("A1"))
+        self.assertEqual(repo.find_by_sku("A1").name, "Dup")
+        self.assertFalse(repo.remove_by_sku("Z9"))
+
+    def test_products_for_many_skus_chunked(self):
+        repo = SqliteProductRepo(self.conn)
+        repo.products = [Product("S%04d" % i, "n", "d", i, 1.0, None, True) for i in range(1200, 0, -1)]
+        wanted = {"S%04d" % i for i in range(1, 1201, 2)} | {"NOPE"}
+        skus = [p.sku for p in repo.products_for_skus(wanted)]
+        self.assertEqual(skus, ["S%04d" % i for i in range(1199, 0, -2)])
+
+    def test_product_batch(self):
+        repo = SqliteProductRepo(self.conn)
+        repo.products = [Product("A1", "Apple", "Red", 5, 0.5, None, True)]
+
+        with self.assertRaises(RuntimeError):
+            with repo.batch():
+                repo.update_product("A1", "Apple", "Red", 0, 0.5, None)
+                raise RuntimeError("boom")
+        self.assertEqual(repo.get_product_quantity("A1"), 5)
+
+        with repo.batch():
+            with repo.batch():
+                repo.update_product("A1", "Apple", "Red", 7, 0.5, None)
+        other = SqliteProductRepo(self.db_file)
+        self.assertEqual(other.get_product_quantity("A1"), 7)
+        other.close()
+
+    def test_reservations(self):
+        repo = SqliteReservationRepo(self.conn)
+        repo.save_reservation(Reservation("R1", "O1", "A1", 2, 2.0, "ao311", "2026-01-01 10:00:00"))
+        repo.save_reservation(Reservation("R2", "O2", "A1", 3, None, "ao311", "2026-01-01 11:00:00"))
+        repo.save_reservation(Reservation("R3", "O3", "B2", 4, 1.0, "ao311", "2026-01-01 12:00:00"))
+
+        self.assertEqual(repo.get_active_reserved_quantity("A1"), 5)
+        self.assertEqual(repo.get_active_reserved_quantity("Z9"), 0)
+        self.assertTrue(repo.cancel_reservation("R1"))
+        self.assertFalse(repo.cancel_reservation("R1"))
+        self.assertEqual(repo.get_active_reserved_quantity("A1"), 3)
+
+        r2 = repo.get_all_reservations()[1]
+        self.assertEqual((r2.reservation_id, r2.quantity, r2.price, r2.status), ("R2", 3, "None", "ACTIVE"))
+
+    def test_purchase_orders(self):
+        repo = SqlitePurchaseOrderRepo(self.conn)
+        repo.save_purchase_order(PurchaseOrder("PO1", "2027-01-01", "ao311"), [PurchaseOrderLine("PO1", "A1", 3)])
+        self.assertEqual(repo.get_po_status("PO1"), "CREATED")
+        self.assertIsNone(repo.get_po_status("PO9"))
+        self.assertTrue(repo.update_po_status("PO1", "APPROVED"))
+        self.assertFalse(repo.update_po_status("PO9", "APPROVED"))
+        orders = repo.get_purchase_orders()
+        self.assertEqual([(o.po_id, o.status, o.supplier_id) for o in orders], [("PO1", "APPROVED", None)])
+        lines = self.conn.execute("SELECT po_id, sku, quantity FROM purchase_order_lines").fetchall()
+        self.assertEqual(lines, [("PO1", "A1", 3)])
+
+    def test_users(self):
+        repo = SqliteUserRepo(self.conn)
+        repo.save_user(User("ann", "h", "staff"))
+        with self.assertRaises(Exception):
+            repo.save_user(User("ann", "h2"))
+        self.assertEqual(repo.get_user("ann").role, "STAFF")
+        self.assertIsNone(repo.get_user("bob"))
+        self.assertTrue(repo.update_role("ann", " manager "))
+        self.assertFalse(repo.update_role("bob", "ADMIN"))
+        with self.assertRaises(ValueError):
+            repo.update_role("ann", "boss")
+        repo.save_all_users([User("bob", "h", "ADMIN")])
+        self.assertEqual([(u.username, u.role) for u in repo.load_users()], [("bob", "ADMIN")])
+
+    def test_favourites_and_links(self):
+        favourites = SqliteFavouriteRepo(self.conn)
+        favourites.add_favourite("ann", "A1")
+        favourites.add_favourite("ann", "A1")
+        favourites.add_favourite("ann", "B2")
+        favourites.add_favourite("bob", "A1")
+        self.assertEqual(favourites.get_favourites("ann"), ["A1", "B2"])
+        self.assertTrue(favourites.is_favourite("bob", "A1"))
+        favourites.remove_favourite("ann", "A1")
+        self.assertEqual(favourites.load_all(), [("ann", "B2"), ("bob", "A1")])
+
+        links = SqliteSupplierProductRepo(self.conn)
+        self.assertTrue(links.add_link("SUP1", "A1"))
+        self.assertFalse(links.add_link("SUP1", "A1"))
+        links.add_link("SUP2", "A1")
+        self.assertEqual(links.get_suppliers_for_product("A1"), ["SUP1", "SUP2"])
+        self.assertEqual(links.get_products_for_supplier("SUP1"), ["A1"])
+        self.assertTrue(links.remove_link("SUP1", "A1"))
+        self.assertFalse(links.remove_link("SUP1", "A1"))
+        links.save_all_links([("SUP3", "B2")])
+        self.assertEqual(links.load_all_links(), [("SUP3", "B2")])
+
+    def test_budget_history_returns(self):
+        budget = SqliteBudgetRepo(self.conn)
+        self.assertEqual(budget.load_budget_record(), (None, None, None))
+        budget.save_budget_record("2026-01", None)
+        self.assertEqual(budget.load_budget_record(), ("2026-01", None, 0.0))
+        budget.save_budget_record("2026-02", 500, 20)
+        self.assertEqual(budget.load_budget_record(), ("2026-02", 500.0, 20.0))
+
+        history = SqliteStockHistoryRepo(self.conn)
+        history.add_entry(StockHistoryEntry("A1", 5, 10, "IN", "2026-01-01 10:00:00"))
+        history.add_entry(StockHistoryEntry("B2", -1, 3, "OUT", "2026-01-01 11:00:00"))
+        self.assertEqual([e.to_line() for e in history.get_by_sku("B2")], ["B2,-1,3,OUT,2026-01-01 11:00:00"])
+        self.assertEqual(len(history.get_all()), 2)
+
+        SqliteReturnRepo(self.conn).save_return(ReturnItem(1, "A1", 2, "sealed", "REJECTED", "a|b"))
+        self.assertEqual(self.conn.execute("SELECT * FROM returns").fetchall(),
+                         [("1", "A1", 2, "sealed", "REJECTED", "a|b")])
+
+
+class TestBranch_SqliteMigrate(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self.tmpdir.name, "data")
+        os.mkdir(self.data_dir)
+        self.db_file = os.path.join(self.tmpdir.name, "inventory.db")
+        files = {
+            "products.txt": "B2,Bolt,Steel,40,0.1,Hardware,ACTIVE\nA1,Apple,Red,5,0.5,,INACTIVE\n",
+            "reservations.txt": "R1|O1|A1|2|ao311|2026-01-01 10:00:00|ACTIVE|2.0\nbad line\n",
+            "purchase_orders.txt": "PO1|2027-01-01|ao311|CREATED|HEADER\nPO1|A1|3\n",
+            "users.txt": "ann:h:admin\nbob:h\n",
+            "favourites.txt": "ann,A1\n",
+            "supplier_products.txt": "SUP1,B2\n",
+            "budgets.txt": "2026-01|6000.0|1520.0\n",
+            "stock_history.txt": "A1,5,10,IN,2026-01-01 10:00:00\n",
+            "returns.txt": "1|A1|1|sealed|REJECTED|Product is inactive\n",
+        }
+        for name, text in files.items():
+            with open(os.path.join(self.data_dir, name), "w") as f:
+                f.write(text)
+
+        # a change still sitting in the journal
+        text_repo = ProductRepo(os.path.join(self.data_dir, "products.txt"), journal=True)
+        text_repo.add_product(Product("C3", "Cable", "Red", 7, 2.5, None, True))
+        self.expected_products = [vars(p) for p in text_repo.get_all_products()]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_migrate_all_files(self):
+        counts = migrate(self.data_dir, self.db_file)
+        self.assertEqual(counts, {"products": 3, "reservations": 1, "purchase_orders": 1,
+                                  "purchase_order_lines": 1, "users": 2, "favourites": 1,
+                                  "supplier_products": 1, "budgets": 1, "stock_history": 1, "returns": 1})
+
+        conn = connect(self.db_file)
+        try:
+            self.assertEqual([vars(p) for p in SqliteProductRepo(conn).get_all_products()], self.expected_products)
+            self.assertEqual(SqliteReservationRepo(conn).get_active_reserved_quantity("A1"), 2)
+            self.assertEqual(SqlitePurchaseOrderRepo(conn).get_po_status("PO1"), "CREATED")
+            self.assertEqual(SqliteUserRepo(conn).get_user("bob").role, "STAFF")
+            self.assertEqual(SqliteBudgetRepo(conn).load_budget_record(), ("2026-01", 6000.0, 1520.0))
+            self.assertEqual(SqliteStockHistoryRepo(conn).get_by_sku("A1")[0].new_quantity, 10)
+        finally:
+            conn.close()
+
+    def test_rerun_replaces_and_missing_file_empties(self):
+        migrate(self.data_dir, self.db_file)
+        os.remove(os.path.join(self.data_dir, "favourites.txt"))
+        counts = migrate(self.data_dir, self.db_file)
+        self.assertEqual(counts["products"], 3)
+        self.assertEqual(counts["favourites"], 0)
+        self.assertFalse(os.path.exists(os.path.join(self.data_dir, "favourites.txt")))
+
+        conn = connect(self.db_file)
+        try:
+            repo = SqliteProductRepo(conn)
+            self.assertEqual(repo.position_of("C3"), 2)
+            self.assertEqual(SqliteFavouriteRepo(conn).load_all(), [])
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
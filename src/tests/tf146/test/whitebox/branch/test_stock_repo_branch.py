@@ -0,0 +1,224 @@
+# File: src/tests/tf146/test/whitebox/branch/test_stock_repo_branch.py
+#
+# White-Box (Branch) tests for the storage engines behind ProductRepo(storage=...).
+# Branches: every engine (text / memory / binary / sqlite) for add, update, save, remove
+# (found and not found), batch commit and rollback, full save_products; upsert insert vs
+# replace; binary snapshot written and reused; engine chosen from $STOCK_STORAGE (unset,
+# known, unknown); changes made through another ProductRepo (file / database engines) seen
+# by refresh(), kept by our next write, a stale whole-catalogue save refused, memory engine
+# never changed; the benchmark runs every engine.
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from model.product import Product
+from Repo.binary_snapshot import read_snapshot
+from Repo.product_repo import ProductRepo
+from Repo.stock_repo import (STORAGE_ENGINES, STORAGE_ENV, MemoryStockRepo, StockRepo, TextStockRepo,
+                             configured_storage, open_storage)
+from Repo.storage_benchmark import benchmark
+
+
+class TestBranch_StockRepoEngines(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "products.txt")
+        self.db_file = os.path.join(self.tmpdir.name, "inventory.db")
+        with open(self.filename, "w") as f:
+            f.write("B2,Bolt,Steel,40,0.1,Hardware,ACTIVE\n")
+            f.write("A1,Apple,Red,5,0.5,,INACTIVE\n")
+        self.engines = []
+
+    def tearDown(self):
+        for engine in self.engines:
+            engine.close()
+        self.tmpdir.cleanup()
+
+    def _open(self, name, memory=None):
+        if memory is not None:
+            return memory  # nothing persisted: "reopening" reuses the same store
+        engine = open_storage(name, self.filename, self.db_file)
+        self.engines.append(engine)
+        return engine
+
+    def _state(self, repo):
+        return [vars(p) for p in repo.get_all_products()]
+
+    def _seed_sqlite(self):
+        engine = self._open("sqlite")
+        engine.save_products(ProductRepo(self.filename).get_all_products())
+
+    def _exercise(self, name):
+        if name == "sqlite":
+            self._seed_sqlite()
+        engine = self._open(name)
+        memory = engine if name == "memory" else None
+        repo = ProductRepo(self.filename, storage=engine)
+        self.assertEqual([p.sku for p in repo.get_all_products()], ["B2", "A1"])
+
+        repo.add_product(Product("C3", "Cable", "Red", 7, 2.5, None, True))
+        repo.update_product("B2", "Bolt", "Zinc", 39, 0.2, "Hardware")
+        p = repo.find_by_sku("A1")
+        p.active = True
+        repo.save_product(p)
+        self.assertFalse(repo.remove_by_sku("Z9"))
+        self.assertTrue(repo.remove_by_sku("C3"))
+        repo.add_product(Product("D4", "Drill", "Tool", 2, 30.0, "Tools", True))
+
+        with repo.batch():
+            for sku in ("B2", "D4"):
+                p = repo.find_by_sku(sku)
+                p.quantity += 1
+                repo.save_product(p)
+
+        with self.assertRaises(RuntimeError):
+            with repo.batch():
+                repo.update_product("D4", "Drill", "Tool", 0, 30.0, "Tools")
+                raise RuntimeError("boom")
+
+        expected = self._state(repo)
+        self.assertEqual([(p["sku"], p["quantity"]) for p in expected], [("B2", 40), ("A1", 5), ("D4", 3)])
+        reopened = ProductRepo(self.filename, storage=self._open(name, memory))
+        self.assertEqual(self._state(reopened), expected)
+
+        repo.products = repo.get_all_products()[::-1]
+        repo.save_products()
+        reopened = ProductRepo(self.filename, storage=self._open(name, memory))
+        self.assertEqual([p.sku for p in reopened.get_all_products()], ["D4", "A1", "B2"])
+
+    def test_text_engine(self):
+        self._exercise("text")
+
+    def test_memory_engine(self):
+        self._exercise("memory")
+
+    def test_binary_engine(self):
+        self._exercise("binary")
+
+    def test_sqlite_engine(self):
+        self._exercise("sqlite")
+
+    def test_engine_single_product_calls(self):
+        engine = MemoryStockRepo()
+        self.assertIsNone(engine.get_product("A1"))
+        self.assertFalse(engine.update_product(Product("A1", "a", "d", 1, 1.0, None)))
+        self.assertFalse(engine.delete_product("A1"))
+        engine.save_product(Product("A1", "a", "d", 1, 1.0, None))
+        engine.save_product(Product("A1", "b", "d", 2, 1.0, None))
+        self.assertEqual([p.name for p in engine.load_products()], ["b"])
+
+        text = TextStockRepo(self.filename)
+        self.assertEqual(text.get_product("A1").quantity, 5)
+        with text.batch():
+            text.save_product(Product("E5", "Egg", "Box", 12, 1.5, None))
+            self.assertTrue(text.delete_product("B2"))
+            with open(self.filename) as f:
+                self.assertIn("B2,", f.read())  # nothing written until the batch ends
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), "A1,Apple,Red,5,0.5,,INACTIVE\nE5,Egg,Box,12,1.5,,ACTIVE\n")
+
+    def test_memory_positions_with_duplicates(self):
+        engine = MemoryStockRepo([Product(sku, sku.lower(), "d", n, 1.0, None)
+                                  for n, sku in enumerate(["A1", "B2", "A1", "C3"])])
+        self.assertEqual(engine.get_product("A1").quantity, 0)
+        self.assertTrue(engine.delete_product("A1"))
+        self.assertEqual(engine.get_product("A1").quantity, 2)   # the later duplicate shows
+        self.assertTrue(engine.delete_product("B2"))
+        engine.save_product(Product("C3", "c", "d", 9, 1.0, None))
+        self.assertEqual([(p.sku, p.quantity) for p in engine.load_products()], [("A1", 2), ("C3", 9)])
+        with self.assertRaises(TypeError):
+            StockRepo(None)  # abstract
+
+    def test_text_engine_reads_the_file_only_when_it_changed(self):
+        text = TextStockRepo(self.filename)
+        text.load_products()
+        with mock.patch("Repo.stock_repo.parse_product_line") as parse:
+            text.save_product(Product("E5", "Egg", "Box", 12, 1.5, None))
+            parse.assert_not_called()
+
+        with open(self.filename, "a") as f:
+            f.write("F6,Fig,Dried,3,2.0,,ACTIVE\n")  # another writer
+        self.assertEqual(text.get_product("F6").quantity, 3)
+
+        with self.assertRaises(RuntimeError):
+            with text.batch():
+                text.delete_product("F6")
+                raise RuntimeError("boom")
+        self.assertEqual(text.get_product("F6").quantity, 3)  # rolled-back change not kept
+        with open(self.filename) as f:
+            self.assertEqual([line.split(",")[0] for line in f], ["B2", "A1", "E5", "F6"])
+
+    def _exercise_other_writer(self, name):
+        if name == "sqlite":
+            self._seed_sqlite()
+        repo = ProductRepo(self.filename, storage=self._open(name), reload_interval=None)
+        other = ProductRepo(self.filename, storage=self._open(name), reload_interval=None)
+        index = repo.get_sorted_index("quantity")
+
+        other.update_product("A1", "Apple", "Red", 50, 0.5, None)
+        self.assertTrue(repo.refresh())
+        self.assertEqual(repo.find_by_sku("A1").quantity, 50)
+        self.assertEqual([sku for _key, sku in index.items()], ["B2", "A1"])
+        self.assertFalse(repo.refresh())
+
+        other.update_product("A1", "Apple", "Red", 60, 0.5, None)
+        repo.update_product("B2", "Bolt", "Steel", 7, 0.1, "Hardware")   # reloads before writing
+        self.assertEqual(repo.find_by_sku("A1").quantity, 60)
+        other.refresh()
+        self.assertEqual({p.sku: p.quantity for p in other.get_all_products()}, {"A1": 60, "B2": 7})
+
+        other.remove_by_sku("B2")
+        with self.assertRaises(ValueError):
+            repo.save_products()   # would put B2 back
+        reopened = ProductRepo(self.filename, storage=self._open(name))
+        self.assertEqual([(p.sku, p.quantity) for p in reopened.get_all_products()], [("A1", 60)])
+
+    def test_other_writer_text_engine(self):
+        self._exercise_other_writer("text")
+
+    def test_other_writer_binary_engine(self):
+        self._exercise_other_writer("binary")
+
+    def test_other_writer_sqlite_engine(self):
+        self._exercise_other_writer("sqlite")
+
+    def test_memory_engine_never_changed(self):
+        engine = MemoryStockRepo(ProductRepo(self.filename).get_all_products())
+        repo = ProductRepo(self.filename, storage=engine, reload_interval=0)
+        engine.save_product(Product("A1", "Apple", "Red", 9, 0.5, None))
+        self.assertFalse(engine.changed())
+        self.assertFalse(repo.refresh())
+
+    def test_binary_snapshot_kept_in_step(self):
+        engine = self._open("binary")
+        repo = ProductRepo(self.filename, storage=engine)
+        snapshot = read_snapshot(self.filename + ".bin", self.filename)
+        self.assertEqual([vars(p) for p in snapshot], self._state(repo))
+
+        repo.update_product("A1", "Apple", "Green", 6, 0.5, None)
+        snapshot = read_snapshot(self.filename + ".bin", self.filename)
+        self.assertEqual(snapshot[1].description, "Green")
+
+    def test_configured_storage(self):
+        with mock.patch.dict(os.environ, {STORAGE_ENV: ""}):
+            self.assertIsNone(configured_storage(self.filename, self.db_file))
+        with mock.patch.dict(os.environ, {STORAGE_ENV: " Memory "}):
+            engine = configured_storage(self.filename, self.db_file)
+            self.assertEqual([p.sku for p in engine.load_products()], ["B2", "A1"])
+        with mock.patch.dict(os.environ, {STORAGE_ENV: "floppy"}):
+            with self.assertRaises(ValueError):
+                configured_storage(self.filename, self.db_file)
+
+    def test_benchmark_every_engine(self):
+        results = benchmark(self.filename, updates=2)
+        self.assertEqual(sorted(results), sorted(STORAGE_ENGINES))
+        for times in results.values():
+            self.assertEqual(sorted(times), ["batch", "load", "update"])
+        with open(self.filename) as f:
+            self.assertEqual(f.read().count("\n"), 2)  # the real file is untouched
+
+
+if __name__ == "__main__":
+    unittest.main()